@@ -8,6 +8,101 @@ class Settings(BaseSettings):
     database: str = "mysql"
     charset: str = "utf8mb4"
 
+    # 存储后端：mysql / sqlite / memory / parquet
+    backend: str = "mysql"
+    sqlite_path: str = "datagn.sqlite3"
+    parquet_dir: str = "parquet"
+
+    # 列式取数：每批行数；dtype_backend='pyarrow' 时返回 ArrowDtype 列
+    fetch_batch_size: int = 50000
+    dtype_backend: str | None = None
+
+    # 中间结果落盘（Parquet，按日期分区保留历史）；关闭后不落盘
+    artifact_enabled: bool = True
+    artifact_dir: str = "artifacts"
+    artifact_compression: str = "zstd"
+
+    # 本地状态目录：跨天复用的聚合、快照、阶段检查点等（dao.frame_store / dao.checkpoint）
+    state_dir: str = ".state"
+
+    # 结果表发布模式（dao.publish）：append / replace / exchange
+    publish_mode: str = "replace"
+    # exchange 模式下分区名，value 为分区列取值，如 p20250727
+    partition_name_template: str = "p{value}"
+
+    # 查询结果缓存（dao.query_cache），默认关闭；TTL 单位秒，可按表覆盖
+    query_cache_enabled: bool = False
+    query_cache_size: int = 64
+    query_cache_dir: str = ".cache/query"
+    query_cache_default_ttl: int = 600
+    query_cache_ttl: dict[str, int] = {}
+
+    # 接口文件扫描（service.FileProfileService），默认关闭；文件按 glob 查找，{date} 为 YYYYMMDD
+    profile_enabled: bool = False
+    profile_file_root: str = "files"
+    profile_file_pattern: str = "{date}/{file_name}.*"
+    profile_delimiter: str = "|"
+    profile_encoding: str = "utf-8"
+    profile_chunk_bytes: int = 32 * 1024 * 1024
+    profile_workers: int = 4
+    # 接口协议字段表：interface_id, field_name, field_order, field_format（格式正则，可空）, is_primary_key（可选）
+    protocol_field_table: str = "data_fabric_meta_data_field"
+    # 主键唯一率（utils.sketches）：去重数不超过该值时精确计数，否则用 HyperLogLog 估算；草图按天落盘
+    uniqueness_exact_limit: int = 100000
+    sketch_precision: int = 14
+
+    # 记录数核对（service.ReconcileService），默认关闭：文件行数 vs 入库表当天分区 COUNT(*)
+    reconcile_enabled: bool = False
+    warehouse_table_template: str = "{file_name}"
+    reconcile_partition_col: str = "data_date"
+    reconcile_partition_format: str = "%Y%m%d"
+    # 抽样字段准确性（service.SamplingService），默认关闭：每接口每天抽样条数、主键 IN 查询每批个数
+    sampling_enabled: bool = False
+    sample_size: int = 200
+    sample_lookup_batch: int = 500
+    # 环节耗时与到达时间（service.LatencyService），默认关闭
+    # 作业运行表：job_id, data_date, start_time, end_time，每次运行一行（重跑多行）
+    latency_enabled: bool = False
+    task_run_table: str = "data_interface_task_run"
+    # protocol_upload_time 是数据日期后第几天的约定到达时刻
+    arrival_day_offset: int = 1
+    # 耗时 / 延迟分位数草图（utils.sketches.DDSketch）相对误差；草图按天落盘
+    latency_relative_accuracy: float = 0.01
+    # 趋势表计算引擎（service.MetricTrendService）：pandas 读全量明细在本地聚合；
+    # sql 在库内按窗口 GROUP BY（dao.pushdown，MySQL 8.0+ / SQLite），只取回聚合行，其它后端回退 pandas
+    metric_engine: str = "pandas"
+    # 明细环节展开 / 透视、趋势表窗口均值、业务级汇总的计算后端（utils.compute）：pandas | polars（需安装 polars）
+    compute_backend: str = "pandas"
+    # 后台写入队列（dao.write_behind）：待写帧数上限（背压）、写入 worker 数、每批最多行数
+    write_behind_queue: int = 4
+    write_behind_workers: int = 2
+    write_behind_batch_rows: int = 50000
+    # 增量发布（dao.delta）：趋势表、业务级别表同一分区重跑时只写新增 / 变化行，默认关闭
+    # 上次发布的行指纹索引在 state_dir/publish_index
+    delta_publish: bool = False
+    # 批量计数：每条 UNION ALL 语句包含的表数、同时执行的语句数
+    count_batch_size: int = 50
+    count_concurrency: int = 8
+
+    # 明细表综合得分的环节权重（utils.common.composite_score），键为环节英文名，未配置的环节权重为 1
+    stage_weights: dict[str, float] = {}
+
+    # 维度取值（utils.dimensions）：编码表 = 配置取值 ∪ 数据中出现的取值；骨架补全也按这里的取值
+    dimension_values: dict[str, list[str]] = {
+        "biz_name": ["-", "大音", "掌经", "一经"],
+        "level": ["P0", "P1", "P2", "P3", "P4", "P5"],
+        "pt": ["云平台", "省经", "一经"],
+        "statistic_cycle": ["1", "2", "3"],
+    }
+
+    # 区间回刷（utils.scheduler）：同时运行的 (日期, 阶段) 节点数，断点记录在 state_dir/backfill
+    backfill_concurrency: int = 2
+
+    # 质量表对比期（utils.compare.LAGS）：day 日环比（stability_ratio / timeliness_ratio，现有表结构）；
+    # week / month / year 另输出 <指标>_wow_ratio / _mom_ratio / _yoy_ratio，开启前须先给
+    # data_fabric_interface_quality 加列，如 ALTER TABLE ... ADD COLUMN stability_wow_ratio VARCHAR(16)
+    quality_lags: list[str] = ["day"]
+
     @property
     def url(self) -> str:
         return f"mysql+aiomysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}?charset={self.charset}"
@@ -71,4 +166,15 @@ data_fabric_interface_detail_cols = [
     'interface_id_op'
 ]
 
+# 声明式列类型：列式取数时直接解码为定型列，未声明的列（如 create_time）自动推断
+data_fabric_interface_detail_schema = {
+    col: ('int64' if col in ('protocol_field_count', 'file_field_count',
+                             'file_record_count', 'warehousing_record_count') else 'string')
+    for col in data_fabric_interface_detail_cols if col != 'create_time'
+}
+
+table_schemas = {
+    'data_fabric_interface_detail': data_fabric_interface_detail_schema,
+}
+
 settings = Settings()
\ No newline at end of file
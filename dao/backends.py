@@ -0,0 +1,607 @@
+# dao/backends.py
+"""
+存储后端：仓储类只依赖 RepoBackend 协议，不再直接持有 MySQL 引擎。
+
+| 后端         | 说明
+| ----------- | ---------------------------------------------
+| mysql       | 生产库，aiomysql 异步引擎
+| sqlite      | aiosqlite 异步引擎，本地调试 / 基准测试
+| memory      | 进程内 DataFrame 字典，单元调试最快
+| parquet     | 目录下每张表一个子目录，离线重跑归档数据
+
+任意 SQL（read_query / execute_query）只有 SQL 后端提供，不在 RepoBackend 协议中；
+需要时先用 supports_sql(backend) 判断，内存 / Parquet 后端走 select / query。
+"""
+import asyncio
+import json
+import re
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Mapping, Protocol, Sequence
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.settings import settings, table_schemas
+from dao.fetch import fetch_frame
+from dao.queries import Query
+from dao.query_cache import QueryCache
+
+_IDENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _ident(name: str) -> str:
+    """表名/列名只允许标识符，杜绝拼接注入"""
+    if not _IDENT.match(name):
+        raise ValueError(f"非法标识符: {name!r}")
+    return name
+
+
+def _is_multi(value: Any) -> bool:
+    return isinstance(value, (list, tuple, set, frozenset))
+
+
+def apply_where(df: pd.DataFrame, where: Mapping[str, Any] | None) -> pd.DataFrame:
+    """内存侧过滤：与 SQL 一样忽略 '20250727' / 20250727 这类类型差异"""
+    if not where or df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for col, value in where.items():
+        values = [str(v) for v in value] if _is_multi(value) else [str(value)]
+        mask &= df[col].astype(str).isin(values)
+    return df[mask]
+
+
+def _content_signature(df: pd.DataFrame) -> str:
+    """内存 / Parquet 后端的内容指纹：行数 + 各行哈希之和（与行序无关）"""
+    return f"{len(df)}|{int(pd.util.hash_pandas_object(df.astype(str), index=False).sum())}"
+
+
+@lru_cache(maxsize=256)
+def _select_statement(table: str, columns: tuple[str, ...] | None,
+                      shape: tuple[tuple[str, bool], ...], distinct: bool):
+    """按 (表, 列, 条件列及是否 IN) 生成一次语句对象，之后同形状的查询直接复用"""
+    cols = ', '.join(_ident(c) for c in columns) if columns else '*'
+    sql = f"SELECT {'DISTINCT ' if distinct else ''}{cols} FROM {_ident(table)}"
+    if shape:
+        sql += " WHERE " + " AND ".join(
+            f"{_ident(col)} IN :p{i}" if multi else f"{_ident(col)} = :p{i}" for i, (col, multi) in enumerate(shape))
+    stmt = text(sql)
+    expanding = [f"p{i}" for i, (_, multi) in enumerate(shape) if multi]
+    if expanding:
+        stmt = stmt.bindparams(*[bindparam(n, expanding=True) for n in expanding])
+    return stmt
+
+
+class RepoBackend(Protocol):
+    """仓储层访问存储的最小协议"""
+
+    async def select(self, table: str, columns: Sequence[str] | None = None,
+                     where: Mapping[str, Any] | None = None,
+                     distinct: bool = False) -> pd.DataFrame: ...
+
+    async def query(self, query: Query, **params: Any) -> pd.DataFrame: ...
+
+    async def insert(self, table: str, df: pd.DataFrame) -> None: ...
+
+    async def upsert(self, table: str, df: pd.DataFrame, keys: Sequence[str]) -> int: ...
+
+    async def count_rows(self, targets: Sequence[tuple[str, Mapping[str, Any]]]) -> list[int | None]: ...
+
+    async def signature(self, tables: Sequence[str]) -> dict[str, str | None]: ...
+
+    async def partition_signature(self, table: str, partition: Mapping[str, Any]) -> str | None: ...
+
+    def publication(self, table: str, partition: Mapping[str, Any], mode: str | None = None): ...
+
+    async def publish(self, table: str, df: pd.DataFrame, partition: Mapping[str, Any] | None,
+                      mode: str | None = None) -> int: ...
+
+    async def dispose(self) -> None: ...
+
+
+class SqlQueryBackend(RepoBackend, Protocol):
+    """在 RepoBackend 之上还能执行任意 SQL 的后端（目前只有 SqlBackend）"""
+
+    dialect: str
+
+    async def read_query(self, sql: str, params: Mapping[str, Any] | None = None,
+                         schema: Mapping[str, str] | None = None) -> pd.DataFrame: ...
+
+    async def execute_query(self, stmt, params: Mapping[str, Any] | None = None,
+                            schema: Mapping[str, str] | None = None) -> pd.DataFrame: ...
+
+
+def supports_sql(backend: RepoBackend) -> bool:
+    """后端能否执行任意 SQL（read_query / execute_query）"""
+    return isinstance(backend, SqlBackend)
+
+
+class SharedReads:
+    """
+    一次运行内（如区间回刷的全部节点）共享声明式查询的结果：同一 (查询, 参数) 只读一次，
+    并发的相同读取等待同一次加载，各调用方拿到副本；写某表时作废读过该表的结果。
+    只存在进程内存中，运行结束即释放，不跨进程、不落盘（跨进程的结果缓存见 dao.query_cache）
+    """
+
+    def __init__(self):
+        self._loads: dict[tuple[Query, str], asyncio.Future] = {}
+        self.hits = self.misses = 0
+
+    async def get(self, query: Query, where: Mapping[str, Any], load) -> pd.DataFrame:
+        key = (query, json.dumps(where, sort_keys=True, default=str))
+        fut = self._loads.get(key)
+        if fut is None:
+            self.misses += 1
+            fut = self._loads[key] = asyncio.ensure_future(load())
+        else:
+            self.hits += 1
+        try:
+            df = await asyncio.shield(fut)
+        except Exception:
+            if self._loads.get(key) is fut:
+                del self._loads[key]
+            raise
+        return df.copy()
+
+    def invalidate(self, table: str) -> None:
+        for key in [k for k in self._loads if k[0].table == table]:
+            del self._loads[key]
+
+
+class _PublishMixin(ABC):
+    """分区幂等发布，详见 dao.publish；声明式查询（dao.queries）统一落到 select"""
+
+    # share_reads 期间的共享读结果
+    shared: SharedReads | None = None
+
+    @abstractmethod
+    async def select(self, table: str, columns: Sequence[str] | None = None,
+                     where: Mapping[str, Any] | None = None,
+                     distinct: bool = False) -> pd.DataFrame: ...
+
+    async def query(self, query: Query, **params: Any) -> pd.DataFrame:
+        where = query.where(params)
+        if self.shared is None:
+            return await self.select(query.table, query.columns, where, query.distinct)
+        return await self.shared.get(
+            query, where, lambda: self.select(query.table, query.columns, where, query.distinct))
+
+    @contextmanager
+    def share_reads(self):
+        """
+        期间经 query 的读取共享结果（SharedReads），各后端通用；已开启时沿用外层
+        用法：with backend.share_reads() as shared: ...（shared.hits / misses 为命中 / 实际读取次数）
+        """
+        if self.shared is not None:
+            yield self.shared
+            return
+        self.shared = SharedReads()
+        try:
+            yield self.shared
+        finally:
+            self.shared = None
+
+    def invalidate(self, table: str) -> None:
+        """写表后作废共享读结果中读过该表的部分"""
+        if self.shared is not None:
+            self.shared.invalidate(table)
+
+    @abstractmethod
+    def publication(self, table: str, partition: Mapping[str, Any], mode: str | None = None):
+        """返回 dao.publish 中对应的发布对象（async with 使用）"""
+
+    async def publish(self, table: str, df: pd.DataFrame, partition: Mapping[str, Any] | None,
+                      mode: str | None = None) -> int:
+        if partition is None:
+            # 空结果集保持旧分区不变（见 dao.publish）
+            return 0
+        async with self.publication(table, partition, mode) as pub:
+            await pub.add(df)
+        return pub.rows
+
+
+class SqlBackend(_PublishMixin):
+    """SQLAlchemy 异步引擎（MySQL / SQLite）"""
+
+    def __init__(self, url: str | None = None, cache: QueryCache | None = None):
+        self.url = url or settings.url
+        self.engine = create_async_engine(self.url, pool_pre_ping=True)
+        # 可选的查询结果缓存；写表时按表失效
+        self.cache = cache
+        self.dialect = self.engine.dialect.name
+        # SQLite 单条语句绑定变量上限 32766，multi 插入时需按列数缩小批次
+        self.max_params = 32766 if self.dialect == 'sqlite' else None
+
+    def _chunksize(self, df: pd.DataFrame) -> int:
+        if self.max_params is None:
+            return 10000
+        return max(1, min(10000, self.max_params // max(1, len(df.columns))))
+
+    @staticmethod
+    def build_select(table: str, columns: Sequence[str] | None = None,
+                     where: Mapping[str, Any] | None = None,
+                     distinct: bool = False):
+        """语句按形状缓存（_select_statement），每次只重新组装绑定参数"""
+        where = where or {}
+        shape = tuple((col, _is_multi(value)) for col, value in where.items())
+        stmt = _select_statement(table, tuple(columns) if columns else None, shape, distinct)
+        params = {f"p{i}": list(value) if multi else value
+                  for i, ((_, multi), value) in enumerate(zip(shape, where.values()))}
+        return stmt, params
+
+    async def select(self, table, columns=None, where=None, distinct=False) -> pd.DataFrame:
+        stmt, params = self.build_select(table, columns, where, distinct)
+        return await self.execute_query(stmt, params, schema=table_schemas.get(table))
+
+    async def read_query(self, sql: str, params=None, schema=None) -> pd.DataFrame:
+        return await self.execute_query(text(sql), params, schema=schema)
+
+    async def execute_query(self, stmt, params=None, schema=None) -> pd.DataFrame:
+        """流式游标 + 列式解码，见 dao.fetch；开启缓存时先查缓存"""
+        if self.cache is not None:
+            sql = str(stmt)
+            cached = self.cache.get(sql, params)
+            if cached is not None:
+                return cached
+            started = time.time()
+        async with self.engine.connect() as conn:
+            df = await fetch_frame(conn, stmt, params, schema=schema)
+        if self.cache is not None:
+            self.cache.put(sql, params, df, started=started)
+        return df
+
+    def invalidate(self, table: str) -> None:
+        """写表后使读过该表的缓存失效（发布用的临时表除外）"""
+        if '__stg_' in table:
+            return
+        super().invalidate(table)
+        if self.cache is not None:
+            self.cache.invalidate(table)
+
+    async def insert(self, table: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        chunksize = self._chunksize(df)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: df.to_sql(
+                    table,
+                    sync_conn,
+                    index=False,
+                    if_exists="append",
+                    method="multi",
+                    chunksize=chunksize,
+                    dtype=None
+                )
+            )
+        self.invalidate(table)
+
+    async def upsert(self, table: str, df: pd.DataFrame, keys: Sequence[str]) -> int:
+        """
+        MySQL 走 ON DUPLICATE KEY UPDATE；其它方言在同一事务内按主键先删后插
+        """
+        if df.empty:
+            return 0
+        cols = [_ident(c) for c in df.columns]
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        binds = ','.join(f":{c}" for c in cols)
+        async with self.engine.begin() as conn:
+            if self.dialect == 'mysql':
+                updates = ','.join(f"{c}=VALUES({c})" for c in cols)
+                sql = f"INSERT INTO {_ident(table)} ({','.join(cols)}) VALUES ({binds}) ON DUPLICATE KEY UPDATE {updates}"
+                await conn.execute(text(sql), records)
+            else:
+                cond = ' AND '.join(f"{_ident(k)} = :{k}" for k in keys)
+                await conn.execute(text(f"DELETE FROM {_ident(table)} WHERE {cond}"),
+                                   [{k: r[k] for k in keys} for r in records])
+                await conn.execute(text(f"INSERT INTO {_ident(table)} ({','.join(cols)}) VALUES ({binds})"), records)
+        self.invalidate(table)
+        return len(records)
+
+    async def count_rows(self, targets, batch_size: int | None = None,
+                         concurrency: int | None = None) -> list[int | None]:
+        """
+        批量 COUNT(*)：(表, 分区条件) 按批 UNION ALL 成一条语句，批间经信号量在共享连接池上并发；
+        某批失败（如表不存在）时逐条重试，仍失败的目标记 None
+        """
+        batch_size = batch_size or settings.count_batch_size
+        sem = asyncio.Semaphore(concurrency or settings.count_concurrency)
+        results: list[int | None] = [None] * len(targets)
+
+        async def run(idx: list[int]) -> None:
+            parts, params = [], {}
+            try:
+                for k, i in enumerate(idx):
+                    table, where = targets[i]
+                    sql = f"SELECT {k} AS k, COUNT(*) AS n FROM {_ident(table)}"
+                    if where:
+                        conds = []
+                        for j, (col, value) in enumerate(where.items()):
+                            conds.append(f"{_ident(col)} = :w{k}_{j}")
+                            params[f"w{k}_{j}"] = value
+                        sql += " WHERE " + " AND ".join(conds)
+                    parts.append(sql)
+                async with sem, self.engine.connect() as conn:
+                    rows = (await conn.execute(text(" UNION ALL ".join(parts)), params)).all()
+            except Exception as e:
+                if len(idx) == 1:
+                    print(f"⚠️ 计数失败 {targets[idx[0]][0]}：{str(e).splitlines()[0]}")
+                    return
+                await asyncio.gather(*(run([i]) for i in idx))
+                return
+            for k, n in rows:
+                results[idx[int(k)]] = int(n)
+
+        batches = [list(range(i, min(i + batch_size, len(targets)))) for i in range(0, len(targets), batch_size)]
+        await asyncio.gather(*(run(b) for b in batches))
+        return results
+
+    async def signature(self, tables: Sequence[str]) -> dict[str, str | None]:
+        """
+        表级变更指纹（判断阶段输入是否变化，见 dao.checkpoint），表不存在记 None
+        - MySQL：information_schema 的 UPDATE_TIME / TABLE_ROWS / DATA_LENGTH，会话内关闭统计缓存
+        - SQLite：COUNT(*) 与 MAX(rowid)，分区 DELETE + INSERT 后 rowid 只增不减
+        """
+        tables = list(dict.fromkeys(tables))
+        out: dict[str, str | None] = {t: None for t in tables}
+        if not tables:
+            return out
+        async with self.engine.connect() as conn:
+            if self.dialect == 'mysql':
+                try:
+                    # 8.0 默认缓存表统计 24 小时，不关掉会看不到刚发生的写入
+                    await conn.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+                except Exception:
+                    pass    # 5.7 没有该变量，统计本就实时
+                stmt = text(
+                    "SELECT TABLE_NAME, UPDATE_TIME, TABLE_ROWS, DATA_LENGTH FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :names"
+                ).bindparams(bindparam('names', expanding=True))
+                for name, updated, rows, length in (await conn.execute(stmt, {'names': tables})).all():
+                    out[name] = f"{updated}|{rows}|{length}"
+            else:
+                for table in tables:
+                    try:
+                        n, last = (await conn.execute(text(f"SELECT COUNT(*), MAX(rowid) FROM {_ident(table)}"))).one()
+                    except Exception:
+                        continue
+                    out[table] = f"{n}|{last}"
+        return out
+
+    async def partition_signature(self, table, partition) -> str | None:
+        """
+        单个分区的变更指纹，表不存在记 None
+        - MySQL：按 settings.partition_name_template 找到的物理分区取 information_schema.PARTITIONS 统计；
+          表未分区时退回整表指纹（任一分区写入都会变，宁可多失效）
+        - SQLite：分区内 COUNT(*) 与 MIN / MAX(rowid)
+        """
+        if self.dialect == 'mysql':
+            if len(partition) == 1:
+                name = settings.partition_name_template.format(value=next(iter(partition.values())))
+                stmt = text(
+                    "SELECT UPDATE_TIME, TABLE_ROWS, DATA_LENGTH FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME = :p")
+                async with self.engine.connect() as conn:
+                    try:
+                        await conn.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+                    except Exception:
+                        pass
+                    row = (await conn.execute(stmt, {'t': table, 'p': name})).first()
+                if row is not None:
+                    return f"{name}|{row[0]}|{row[1]}|{row[2]}"
+            return (await self.signature([table]))[table]
+        cond = ' AND '.join(f"{_ident(c)} = :w{i}" for i, c in enumerate(partition))
+        params = {f"w{i}": v for i, v in enumerate(partition.values())}
+        async with self.engine.connect() as conn:
+            try:
+                n, first, last = (await conn.execute(text(
+                    f"SELECT COUNT(*), MIN(rowid), MAX(rowid) FROM {_ident(table)} WHERE {cond}"), params)).one()
+            except Exception:
+                return None
+        return f"{n}|{first}|{last}"
+
+    def publication(self, table, partition, mode=None):
+        from dao.publish import SqlPublication
+        return SqlPublication(self, table, partition, mode)
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+
+class MemoryBackend(_PublishMixin):
+    """进程内 DataFrame 仓库：tables[表名] = DataFrame"""
+
+    def __init__(self, tables: Mapping[str, pd.DataFrame] | None = None):
+        self.tables: dict[str, pd.DataFrame] = dict(tables or {})
+
+    def _table(self, table: str) -> pd.DataFrame:
+        if table not in self.tables:
+            raise KeyError(f"内存后端不存在表 {table}")
+        return self.tables[table]
+
+    async def select(self, table, columns=None, where=None, distinct=False) -> pd.DataFrame:
+        df = apply_where(self._table(table), where)
+        if columns:
+            df = df[list(columns)]
+        if distinct:
+            df = df.drop_duplicates()
+        return df.reset_index(drop=True).copy()
+
+    async def insert(self, table: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        old = self.tables.get(table)
+        self.tables[table] = df.copy() if old is None else pd.concat([old, df], ignore_index=True)
+        self.invalidate(table)
+
+    async def upsert(self, table: str, df: pd.DataFrame, keys: Sequence[str]) -> int:
+        if df.empty:
+            return 0
+        old = self.tables.get(table)
+        merged = df if old is None else pd.concat([old, df], ignore_index=True)
+        self.tables[table] = merged.drop_duplicates(subset=list(keys), keep='last').reset_index(drop=True)
+        self.invalidate(table)
+        return len(df)
+
+    async def count_rows(self, targets) -> list[int | None]:
+        return [len(apply_where(self.tables[t], w)) if t in self.tables else None for t, w in targets]
+
+    async def signature(self, tables) -> dict[str, str | None]:
+        out = {}
+        for table in tables:
+            df = self.tables.get(table)
+            out[table] = None if df is None else _content_signature(df)
+        return out
+
+    async def partition_signature(self, table, partition) -> str | None:
+        df = self.tables.get(table)
+        return None if df is None else _content_signature(apply_where(df, partition))
+
+    def read_all(self, table: str) -> pd.DataFrame | None:
+        return self.tables.get(table)
+
+    def replace_all(self, table: str, df: pd.DataFrame) -> None:
+        self.tables[table] = df.reset_index(drop=True)
+        self.invalidate(table)
+
+    def publication(self, table, partition, mode=None):
+        from dao.publish import FramePublication
+        return FramePublication(self, table, partition, mode)
+
+    async def dispose(self) -> None:
+        return None
+
+
+class ParquetBackend(_PublishMixin):
+    """
+    Parquet 目录：root/<表名>/part-*.parquet
+    追加写只新增分片文件，读取时按文件名顺序拼接
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root or settings.parquet_dir)
+
+    def _dir(self, table: str) -> Path:
+        return self.root / _ident(table)
+
+    def _parts(self, table: str) -> list[Path]:
+        path = self._dir(table)
+        if not path.exists():
+            raise KeyError(f"Parquet 后端不存在表 {table}: {path}")
+        return sorted(path.glob('part-*.parquet'))
+
+    def _read(self, table: str, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        kw = {'dtype_backend': 'pyarrow'} if settings.dtype_backend == 'pyarrow' else {}
+        frames = [pd.read_parquet(p, columns=list(columns) if columns else None, **kw) for p in self._parts(table)]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns else None)
+        return pd.concat(frames, ignore_index=True)
+
+    def _write_part(self, table: str, df: pd.DataFrame) -> None:
+        path = self._dir(table)
+        path.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        df.to_parquet(path / name, index=False, compression='zstd')
+
+    async def select(self, table, columns=None, where=None, distinct=False) -> pd.DataFrame:
+        need = None
+        if columns:
+            need = list(dict.fromkeys([*columns, *(where or {})]))
+        df = apply_where(self._read(table, need), where)
+        if columns:
+            df = df[list(columns)]
+        if distinct:
+            df = df.drop_duplicates()
+        return df.reset_index(drop=True)
+
+    async def insert(self, table: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        self._write_part(table, df)
+        self.invalidate(table)
+
+    async def upsert(self, table: str, df: pd.DataFrame, keys: Sequence[str]) -> int:
+        if df.empty:
+            return 0
+        old = self.read_all(table)
+        merged = df if old is None else pd.concat([old, df], ignore_index=True)
+        self.replace_all(table, merged.drop_duplicates(subset=list(keys), keep='last'))
+        return len(df)
+
+    async def count_rows(self, targets) -> list[int | None]:
+        out = []
+        for table, where in targets:
+            if not self._dir(table).exists():
+                out.append(None)
+                continue
+            out.append(len(apply_where(self._read(table, list(where or {}) or None), where)))
+        return out
+
+    async def signature(self, tables) -> dict[str, str | None]:
+        """分片文件名、大小、修改时间；分片只增删不原地改写"""
+        out = {}
+        for table in tables:
+            if not self._dir(table).exists():
+                out[table] = None
+                continue
+            out[table] = ';'.join(f"{p.name}:{p.stat().st_size}:{p.stat().st_mtime_ns}" for p in self._parts(table))
+        return out
+
+    async def partition_signature(self, table, partition) -> str | None:
+        """分片不按分区存放，只能读出分区内容求指纹"""
+        if not self._dir(table).exists():
+            return None
+        return _content_signature(apply_where(self._read(table), partition))
+
+    def read_all(self, table: str) -> pd.DataFrame | None:
+        return self._read(table) if self._dir(table).exists() else None
+
+    def replace_all(self, table: str, df: pd.DataFrame) -> None:
+        """先写新分片再删旧分片，中途失败最多多出一份数据而不会丢数据"""
+        old_parts = self._parts(table) if self._dir(table).exists() else []
+        if not df.empty:
+            self._write_part(table, df)
+        for p in old_parts:
+            p.unlink()
+        self.invalidate(table)
+
+    def publication(self, table, partition, mode=None):
+        from dao.publish import FramePublication
+        return FramePublication(self, table, partition, mode)
+
+    async def dispose(self) -> None:
+        return None
+
+
+_MEMORY = MemoryBackend()
+_SQL: dict[str, SqlBackend] = {}
+
+
+def create_backend(kind: str | None = None) -> RepoBackend:
+    """
+    按 settings.backend 选择后端；同一进程内相同配置共享一个实例（连接池 / 内存表）
+    """
+    kind = (kind or settings.backend).lower()
+    if kind == 'memory':
+        return _MEMORY
+    if kind == 'parquet':
+        return ParquetBackend(settings.parquet_dir)
+    if kind in ('mysql', 'sqlite'):
+        url = settings.url if kind == 'mysql' else f"sqlite+aiosqlite:///{settings.sqlite_path}"
+        if url not in _SQL:
+            _SQL[url] = SqlBackend(url, cache=QueryCache() if settings.query_cache_enabled else None)
+        return _SQL[url]
+    raise ValueError(f"未知后端类型: {kind}")
+
+
+async def dispose_all() -> None:
+    """释放 create_backend 创建的全部连接池（异常退出时避免 aiosqlite 线程挂住进程）"""
+    for backend in _SQL.values():
+        await backend.dispose()
@@ -1,38 +1,31 @@
-# dao/metric_repo.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import text
+# dao/business_repo.py
 import pandas as pd
 from config.settings import settings
+from dao import queries
+from dao.backends import RepoBackend, create_backend
+from dao.delta import publish_delta
+from dao.frame_store import FrameStore
+from dao.publish import partition_of
 
 class BusinessLevelRepo:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url)
+    def __init__(self, backend: RepoBackend | None = None, published: FrameStore | None = None):
+        self.backend = backend or create_backend()
+        # 增量发布的行指纹索引（settings.delta_publish）
+        self.published = published or FrameStore("publish_index")
 
     async def load_data(self, date_str: str) -> pd.DataFrame:
         """数据治理平台-运营驾驶舱趋势表"""
-        sql = f"""
-            SELECT *
-            FROM data_fabric_metric_trend
-            WHERE create_time = '{date_str}'
-        """
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.backend.query(queries.METRIC_TREND_BY_DAY, create_time=date_str)
 
 
     async def write_data(self, df: pd.DataFrame) -> None:
         """
-        将指标 DataFrame 异步写入 data_fabric_interface_business_level 表。
+        将指标 DataFrame 异步写入 data_fabric_interface_business_level 表（按 create_time 分区幂等发布，
+        开启增量时只写变化行，未变化的行沿用上次的 interface_business_level_id）。
         """
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df.to_sql(
-                    "data_fabric_interface_business_level",
-                    sync_conn,
-                    index=False,
-                    if_exists="append",
-                    method="multi",
-                    chunksize=10000,
-                    dtype=None
-                )
-            )
+        partition = partition_of(df, ['create_time'])
+        if settings.delta_publish:
+            await publish_delta(self.backend, "data_fabric_interface_business_level", df, partition,
+                                'interface_business_level_id', self.published)
+        else:
+            await self.backend.publish("data_fabric_interface_business_level", df, partition)
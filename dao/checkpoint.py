@@ -0,0 +1,76 @@
+# dao/checkpoint.py
+"""
+阶段检查点：阶段写库成功后，把输出落成 state_dir/checkpoint/<阶段>_<日期>.parquet，
+旁边的 .json 记录日期、行数和输入指纹。json 最后写，有 json 才算完成。
+
+输入指纹 = 各输入表的变更指纹（backend.signature）+ 按日期过滤的输入的行数 + 配置，
+重跑时指纹不变的阶段直接读检查点，不重新取数计算，也不重复写库。
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Mapping, Sequence
+
+import pandas as pd
+
+from config.settings import settings
+from dao.frame_store import FrameStore
+from utils.artifacts import arrow_safe
+
+# 阶段输入：(表名, 过滤条件)；条件为 None 表示整表
+Inputs = Sequence[tuple[str, Mapping[str, Any] | None]]
+
+
+async def fingerprint(backend, inputs: Inputs, extra: Mapping[str, Any] | None = None) -> str:
+    tables = sorted({t for t, _ in inputs})
+    filtered = [(t, dict(w)) for t, w in inputs if w]
+    payload = {
+        'tables': await backend.signature(tables),
+        'counts': dict(zip((f"{t}{sorted(w.items())}" for t, w in filtered),
+                           await backend.count_rows(filtered))) if filtered else {},
+        # 口径相关的配置变化同样使检查点失效（连接信息不参与）
+        'settings': settings.model_dump(mode='json', exclude={'host', 'port', 'user', 'password'}),
+        'extra': dict(extra or {}),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    def __init__(self, frames: FrameStore | None = None):
+        self.frames = frames or FrameStore("checkpoint")
+
+    @staticmethod
+    def key(stage: str, date_str: str) -> str:
+        return f"{stage}_{date_str.replace('-', '')}"
+
+    def _meta_path(self, stage: str, date_str: str):
+        return self.frames.root / f"{self.key(stage, date_str)}.json"
+
+    def meta(self, stage: str, date_str: str) -> dict | None:
+        path = self._meta_path(stage, date_str)
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def load(self, stage: str, date_str: str, fp: str) -> pd.DataFrame | None:
+        """指纹一致时返回检查点输出，否则 None"""
+        meta = self.meta(stage, date_str)
+        if meta is None or meta.get('fingerprint') != fp:
+            return None
+        return self.frames.get(self.key(stage, date_str))
+
+    def save(self, stage: str, date_str: str, fp: str, df: pd.DataFrame) -> None:
+        key = self.key(stage, date_str)
+        try:
+            self.frames.put(key, df)
+        except (TypeError, ValueError):
+            # object 列混有数字和字符串时 Arrow 推断失败，统一转成字符串
+            self.frames.put(key, arrow_safe(df))
+        path = self._meta_path(stage, date_str)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({'stage': stage, 'date': date_str, 'rows': len(df), 'fingerprint': fp,
+                                   'created': time.strftime('%Y-%m-%d %H:%M:%S')}, ensure_ascii=False))
+        os.replace(tmp, path)
+
+    def invalidate(self, stage: str, date_str: str) -> None:
+        self._meta_path(stage, date_str).unlink(missing_ok=True)
+        self.frames.delete(self.key(stage, date_str))
@@ -0,0 +1,160 @@
+# dao/delta.py
+"""
+增量发布：同一分区重跑时，大部分行与上次发布的完全相同，只有主键（按时间戳生成）不同。
+逐行对除主键外的全部列计算 64 位指纹（utils.hashing.hash_rows），与上次发布后落盘的指纹索引
+（state_dir/publish_index/<表>_<分区值>.parquet：key 指纹, id 主键）比对：
+
+- 指纹在索引中出现过的行视为未变化：沿用上次发布的主键（carry forward），不写库
+- 新出现的指纹写入，索引中没有被匹配到的旧行按主键撤回（dao.publish 的 delta 模式，一个事务内完成）
+- 完全相同的行出现多次时按出现次序区分，指纹与旧行一一对应
+
+写库量与实际变化行数成正比。索引缺失，或与库中分区行数不一致（手工改过表、关闭增量期间发布过）时，
+本次回退为整分区替换并重建索引。
+"""
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+from dao.frame_store import FrameStore
+from dao.publish import DELTA
+from dao.write_behind import WriteBehind
+from utils.hashing import hash_rows, sorted_lookup
+
+
+class RowDelta:
+    """一个分区的逐段比对状态：split 每段结果，结束后取撤回的旧主键与新索引"""
+
+    def __init__(self, published: pd.DataFrame | None, id_col: str):
+        self.id_col = id_col
+        self.published = published
+        if published is not None:
+            self._ref_keys = published['key'].to_numpy(dtype=np.uint64)
+            self._ref_ids = published['id'].astype(str).to_numpy(dtype=object)
+            self._matched = np.zeros(len(published), dtype=bool)
+        self._occurrences = pd.Series(dtype='int64')
+        self._keys: list[np.ndarray] = []
+        self._ids: list[np.ndarray] = []
+        self.carried = 0
+
+    def _row_keys(self, df: pd.DataFrame) -> np.ndarray:
+        h = pd.Series(hash_rows(df, sorted(c for c in df.columns if c != self.id_col)))
+        # 同一指纹在之前各段中已出现的次数 + 段内序号
+        occ = h.groupby(h.to_numpy()).cumcount().to_numpy() \
+            + h.map(self._occurrences).fillna(0).to_numpy(dtype='int64')
+        self._occurrences = self._occurrences.add(h.value_counts(), fill_value=0).astype('int64')
+        return pd.util.hash_pandas_object(pd.DataFrame({'h': h.to_numpy(), 'n': occ}),
+                                          index=False).to_numpy(dtype=np.uint64)
+
+    def split(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        :return: 需要写库的行（新增或变化）
+        未变化的行在 df 上原地改回上次发布的主键，调用方持有的结果与库中一致
+        """
+        if df.empty:
+            return df
+        keys = self._row_keys(df)
+        if self.published is not None and len(self._ref_keys):
+            found, pos = sorted_lookup(self._ref_keys, keys)
+            if found.any():
+                ids = df[self.id_col].astype(str).to_numpy(dtype=object)
+                ids[found] = self._ref_ids[pos[found]]
+                df[self.id_col] = ids
+                self._matched[pos[found]] = True
+                self.carried += int(found.sum())
+            changed = df[~found]
+        else:
+            changed = df
+        self._keys.append(keys)
+        self._ids.append(df[self.id_col].astype(str).to_numpy(dtype=object))
+        return changed
+
+    @property
+    def empty(self) -> bool:
+        """本次一行结果也没有"""
+        return not self._keys
+
+    def retracted(self) -> list[str]:
+        """上次发布、本次没有再出现的行的主键"""
+        if self.published is None:
+            return []
+        return self._ref_ids[~self._matched].tolist()
+
+    def index(self) -> pd.DataFrame:
+        """本次发布后的指纹索引"""
+        if not self._keys:
+            return pd.DataFrame({'key': np.array([], dtype=np.uint64), 'id': pd.Series([], dtype=object)})
+        return pd.DataFrame({'key': np.concatenate(self._keys), 'id': np.concatenate(self._ids)})
+
+
+class DeltaIndex:
+    """上次发布的指纹索引，按 (表, 分区值) 落盘"""
+
+    def __init__(self, frames: FrameStore | None = None):
+        self.frames = frames or FrameStore("publish_index")
+
+    @staticmethod
+    def key(table: str, partition: Mapping[str, Any]) -> str:
+        return '_'.join([table, *(str(v) for v in partition.values())])
+
+    async def load(self, backend, table: str, partition: Mapping[str, Any]) -> pd.DataFrame | None:
+        """库中分区行数与索引一致时返回索引，否则 None（本次整分区替换）"""
+        published = self.frames.get(self.key(table, partition))
+        if published is None:
+            return None
+        [rows] = await backend.count_rows([(table, dict(partition))])
+        if rows != len(published):
+            print(f"⚠️ {table} {dict(partition)} 库中 {rows} 行与发布索引 {len(published)} 行不一致，整分区重写")
+            return None
+        return published
+
+    def save(self, table: str, partition: Mapping[str, Any], index: pd.DataFrame) -> None:
+        self.frames.put(self.key(table, partition), index)
+
+
+class DeltaWriter(WriteBehind):
+    """
+    增量版后台写入队列：put 的每段先与索引比对，只把新增 / 变化行送进队列；
+    关闭时撤回消失的旧行并提交，成功后更新索引
+    """
+
+    def __init__(self, backend, table: str, partition: Mapping[str, Any], id_col: str,
+                 frames: FrameStore | None = None, **kwargs):
+        super().__init__(backend, table, partition, **kwargs)
+        self.id_col = id_col
+        self.index = DeltaIndex(frames)
+        self.delta: RowDelta | None = None
+
+    async def __aenter__(self) -> 'DeltaWriter':
+        published = await self.index.load(self.backend, self.table, self.partition)
+        self.delta = RowDelta(published, self.id_col)
+        if published is not None:
+            self.mode = DELTA
+        return await super().__aenter__()
+
+    async def put(self, df: pd.DataFrame) -> None:
+        await super().put(self.delta.split(df))
+
+    async def close(self) -> int:
+        if self._closed:
+            return self.rows
+        # 本次没有任何结果时与整分区发布一致：旧分区保持不变，不撤回，索引也不动
+        retracted = [] if self.delta.empty else self.delta.retracted()
+        if self.mode == DELTA:
+            self._pub.retract(self.id_col, retracted)
+        rows = await super().close()
+        if not self.delta.empty and (self.mode == DELTA or rows):
+            self.index.save(self.table, self.partition, self.delta.index())
+        print(f"增量发布 {self.table} {self.partition}：写入 {rows} 行，沿用 {self.delta.carried} 行，"
+              f"撤回 {len(retracted)} 行")
+        return rows
+
+
+async def publish_delta(backend, table: str, df: pd.DataFrame, partition: Mapping[str, Any] | None,
+                        id_col: str, frames: FrameStore | None = None) -> int:
+    """一次性增量发布整张结果集（与 backend.publish 对应）"""
+    if partition is None:
+        return 0
+    async with DeltaWriter(backend, table, partition, id_col, frames) as writer:
+        await writer.put(df)
+    return writer.rows
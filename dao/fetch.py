@@ -0,0 +1,135 @@
+# dao/fetch.py
+"""
+列式取数：按批次把结果集直接解码成 Arrow 列（无 pyarrow 时退化为定型 NumPy 数组），
+避免 fetchall() 先物化整表 Row 对象、pandas 再拷贝一遍成 object 列。
+"""
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - 无 pyarrow 时走 NumPy 路径
+    pa = None
+
+# 声明式列类型（字符串） -> Arrow / NumPy 类型
+_ARROW_TYPES = {
+    'string': lambda: pa.string(),
+    'int64': lambda: pa.int64(),
+    'float64': lambda: pa.float64(),
+    'bool': lambda: pa.bool_(),
+    'timestamp': lambda: pa.timestamp('us'),
+}
+_NUMPY_TYPES = {
+    'string': object,
+    'int64': np.float64,   # 可能含 NULL，与 pandas 默认行为一致用 float 承载
+    'float64': np.float64,
+    'bool': object,
+    'timestamp': 'datetime64[us]',
+}
+
+
+def _arrow_column(values: Sequence[Any], type_name: str | None):
+    typ = _ARROW_TYPES[type_name]() if type_name is not None else None
+    try:
+        return pa.array(values, type=typ, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    try:
+        # 库里类型与声明不一致（如数字存成 int），先推断再转换
+        arr = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 同一批里字符串与数字混存（SQLite 动态类型、MySQL 隐式转换写入），按字符串承载
+        arr = pa.array([None if pd.isna(v) else str(v) for v in values], type=pa.string())
+    return arr if typ is None else arr.cast(typ, safe=False)
+
+
+def _unify(chunks: list) -> 'pa.ChunkedArray':
+    """未声明类型的列各批推断结果可能不同（全 NULL 批次为 null 类型），统一到同一类型"""
+    types = {c.type for c in chunks if c.type != pa.null()}
+    if not types:
+        return pa.chunked_array(chunks, type=pa.null())
+    if len(types) == 1:
+        typ = types.pop()
+    elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        typ = pa.float64()
+    else:
+        typ = pa.string()
+    return pa.chunked_array([c.cast(typ, safe=False) if c.type != typ else c for c in chunks], type=typ)
+
+
+class ColumnBuilder:
+    """逐批接收行元组，批内按列转置后立即解码，批次的 Row 对象随即可释放"""
+
+    def __init__(self, keys: Sequence[str], schema: Mapping[str, str] | None = None):
+        self.keys = list(keys)
+        self.schema = dict(schema or {})
+        self.columns: list[list] = [[] for _ in self.keys]
+
+    def add(self, batch: Sequence[Sequence[Any]]) -> None:
+        if not batch:
+            return
+        for i, values in enumerate(zip(*batch)):
+            type_name = self.schema.get(self.keys[i])
+            if pa is not None:
+                self.columns[i].append(_arrow_column(values, type_name))
+            else:
+                self.columns[i].append(np.asarray(values, dtype=_NUMPY_TYPES.get(type_name, object)))
+
+    def to_frame(self, dtype_backend: str | None = None) -> pd.DataFrame:
+        """
+        :param dtype_backend: None 返回 NumPy 类型列；'pyarrow' 返回 ArrowDtype 列
+        """
+        dtype_backend = dtype_backend if dtype_backend is not None else settings.dtype_backend
+        keys, schema = self.keys, self.schema
+
+        if pa is not None:
+            arrays = []
+            for k, chunks in zip(keys, self.columns):
+                if chunks:
+                    arrays.append(_unify(chunks))
+                else:
+                    arrays.append(pa.chunked_array([], type=_ARROW_TYPES[schema[k]]() if k in schema else pa.null()))
+            table = pa.Table.from_arrays(arrays, names=keys)
+            if dtype_backend == 'pyarrow':
+                return table.to_pandas(types_mapper=pd.ArrowDtype)
+            return table.to_pandas()
+
+        data = {k: (np.concatenate(chunks) if chunks
+                    else np.array([], dtype=_NUMPY_TYPES.get(schema.get(k), object)))
+                for k, chunks in zip(keys, self.columns)}
+        df = pd.DataFrame(data, columns=keys)
+        if dtype_backend == 'pyarrow':
+            df = df.convert_dtypes(dtype_backend='pyarrow')
+        return df
+
+
+def frame_from_batches(keys: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]],
+                       schema: Mapping[str, str] | None = None,
+                       dtype_backend: str | None = None) -> pd.DataFrame:
+    """
+    :param keys: 结果集列名
+    :param batches: 逐批的行元组
+    :param schema: 列名 -> 'string' / 'int64' / 'float64' / 'bool' / 'timestamp'，未声明列自动推断
+    """
+    builder = ColumnBuilder(keys, schema)
+    for batch in batches:
+        builder.add(batch)
+    return builder.to_frame(dtype_backend)
+
+
+async def fetch_frame(conn, stmt, params: Mapping[str, Any] | None = None,
+                      schema: Mapping[str, str] | None = None,
+                      dtype_backend: str | None = None,
+                      batch_size: int | None = None) -> pd.DataFrame:
+    """
+    以流式游标执行语句，按 batch_size 分批解码为列式 DataFrame
+    """
+    res = await conn.stream(stmt, params or {})
+    builder = ColumnBuilder(res.keys(), schema)
+    async for part in res.partitions(batch_size or settings.fetch_batch_size):
+        builder.add(part)
+    return builder.to_frame(dtype_backend)
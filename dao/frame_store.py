@@ -0,0 +1,41 @@
+# dao/frame_store.py
+"""
+本地小型键值存储：settings.state_dir/<命名空间>/<键>.parquet
+用于跨天复用的聚合结果、快照、草图等，不适合放进业务库的中间状态。
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import settings
+
+
+class FrameStore:
+    def __init__(self, namespace: str, root: str | Path | None = None):
+        self.root = Path(root or settings.state_dir) / namespace
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}.parquet"
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """键不存在返回 None，由调用方决定回退策略"""
+        path = self.path(key)
+        return pd.read_parquet(path) if path.exists() else None
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path(key))
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def keys(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.stem for p in self.root.glob("*.parquet"))
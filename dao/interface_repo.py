@@ -1,51 +1,58 @@
 import pandas as pd
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from config.settings import settings, data_fabric_interface_detail_cols
+from config.settings import data_fabric_interface_detail_cols, settings
+from dao import queries
+from dao.backends import RepoBackend, create_backend, supports_sql
+from dao.frame_store import FrameStore
+from dao.publish import partition_of
 
 class InterfaceRepo:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url, pool_pre_ping=True)
+    def __init__(self, backend: RepoBackend | None = None, sketches: FrameStore | None = None,
+                 latency: FrameStore | None = None):
+        self.backend = backend or create_backend()
+        # 按天保存各接口主键去重草图（interface_id, records, precision, registers, exact）
+        self.sketches = sketches or FrameStore("pk_sketch")
+        # 按天保存 (接口, 平台, 环节) 耗时 / 到达延迟分位数草图
+        self.latency = latency or FrameStore("latency_sketch")
 
     async def load_meta_data_interface(self) -> pd.DataFrame:
         """数据治理平台-接口资源表"""
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text("SELECT * FROM data_fabric_meta_data_interface"))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.backend.query(queries.META_DATA_INTERFACE)
 
     async def load_register(self) -> pd.DataFrame:
         """数智运维平台-接口总表"""
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text("SELECT * FROM data_interface_task_register"))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.backend.query(queries.TASK_REGISTER)
 
     async def load_error(self, date_str: str) -> pd.DataFrame:
         """数智运维平台-故障表"""
-        sql = f"SELECT DISTINCT job_id FROM data_interface_task_error WHERE data_date='{date_str}'"
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.backend.query(queries.TASK_ERROR_JOBS, data_date=date_str)
 
     async def load_delay(self, date_str: str) -> pd.DataFrame:
         """数智运维平台-延迟表"""
-        sql = f"SELECT DISTINCT job_id FROM data_interface_task_delay WHERE data_date='{date_str}'"
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.backend.query(queries.TASK_DELAY_JOBS, data_date=date_str)
+
+    async def load_task_runs(self, date_str: str) -> pd.DataFrame:
+        """数智运维平台-作业运行表（表名见 settings.task_run_table）"""
+        return await self.backend.query(queries.TASK_RUNS.on(settings.task_run_table), data_date=date_str)
+
+    async def load_protocol_fields(self) -> pd.DataFrame:
+        """数据治理平台-接口协议字段表（表名见 settings.protocol_field_table）"""
+        return await self.backend.query(queries.PROTOCOL_FIELDS.on(settings.protocol_field_table))
+
+    async def count_tables(self, targets: list[tuple[str, dict]]) -> list[int | None]:
+        """入库表按分区批量计数，表不存在等失败记 None"""
+        return await self.backend.count_rows(targets)
+
+    def save_pk_sketches(self, date_str: str, df: pd.DataFrame) -> None:
+        self.sketches.put(date_str, df)
+
+    def save_latency_sketches(self, date_str: str, df: pd.DataFrame) -> None:
+        self.latency.put(date_str, df)
 
     async def write_detail(self, df: pd.DataFrame):
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df[df['interface_id'].notna()]
-                .to_sql("data_fabric_interface_detail",
-                        sync_conn,
-                        index=False,
-                        if_exists="append",
-                        method="multi",
-                        chunksize=10000,
-                        dtype=None)
-            )
+        """按 data_date 分区幂等发布，重跑同一天不会重复"""
+        await self.backend.publish("data_fabric_interface_detail", df[df['interface_id'].notna()],
+                                   partition_of(df, ['data_date']))
 
     async def upsert_detail(self, df: pd.DataFrame) -> tuple[int, int]:
         """
@@ -55,34 +62,22 @@ class InterfaceRepo:
         total = len(df)
 
         # 去重主键
-        df = df.drop_duplicates(subset=['storage_interface_id', 'pt', 'create_time'])
+        keys = ['storage_interface_id', 'pt', 'create_time']
+        df = df.drop_duplicates(subset=keys)
 
         # 列顺序必须与表字段一致
-        cols = data_fabric_interface_detail_cols
-        df = df[cols]
+        df = df[data_fabric_interface_detail_cols]
 
         if df.empty:
             return 0, 0
 
-        async with self.engine.begin() as conn:
-            # 构造批量 UPSERT
-            placeholders = ",".join(["%s"] * len(cols))
-            updates = ",".join([f"{col}=VALUES({col})" for col in cols])
-
-            values = [tuple(row[col] for col in cols) for row in df.itertuples(index=False)]
-
-            sql = f"""
-                INSERT INTO data_fabric_interface_detail
-                ({','.join(cols)})
-                VALUES ({placeholders})
-                ON DUPLICATE KEY UPDATE {updates}
-            """
-
-            await conn.execute(text(sql), *values)
+        ok = await self.backend.upsert("data_fabric_interface_detail", df, keys)
+        return ok, total - ok
 
     # 新增
-    async def read_query(self, sql: str) -> pd.DataFrame:
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
-
+    async def read_query(self, sql: str, schema: dict[str, str] | None = None,
+                         params: dict | None = None) -> pd.DataFrame:
+        """取值一律通过 params 绑定（:name 占位），不要拼进 sql"""
+        if not supports_sql(self.backend):
+            raise TypeError(f"后端 {type(self.backend).__name__} 不支持任意 SQL，请改用 select / query")
+        return await self.backend.read_query(sql, params=params, schema=schema)
@@ -1,45 +1,92 @@
 # dao/metric_repo.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import text
 import pandas as pd
 from config.settings import settings
+from dao import pushdown, queries
+from dao.backends import RepoBackend, create_backend, supports_sql
+from dao.delta import DeltaWriter, publish_delta
+from dao.publish import partition_of
+from dao.frame_store import FrameStore
+from dao.write_behind import WriteBehind
 
 class MetricRepo:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url)
+    def __init__(self, backend: RepoBackend | None = None, sketches: FrameStore | None = None,
+                 latency: FrameStore | None = None, published: FrameStore | None = None):
+        self.backend = backend or create_backend()
+        # 明细阶段落盘的主键去重草图、环节耗时 / 延迟草图，周 / 月窗口合并使用
+        self.sketches = sketches or FrameStore("pk_sketch")
+        self.latency = latency or FrameStore("latency_sketch")
+        # 增量发布的行指纹索引（settings.delta_publish）
+        self.published = published or FrameStore("publish_index")
 
     async def load_data(self, date_str: str) -> pd.DataFrame:
         """数据治理平台-运营驾驶舱明细表"""
-        # sql = f"SELECT * FROM data_fabric_interface_detail WHERE create_time='{date_str}'"
-        sql = f"SELECT * FROM data_fabric_interface_detail"
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+        # return await self.backend.select("data_fabric_interface_detail", where={'create_time': date_str})
+        return await self.backend.query(queries.INTERFACE_DETAIL)
 
 
+    @property
+    def pushdown(self) -> bool:
+        """后端能否在库内聚合趋势表（dao.pushdown）"""
+        return supports_sql(self.backend) and pushdown.supports(self.backend.dialect)
+
+    async def load_dimensions(self) -> pd.DataFrame:
+        """明细表的接口平台维度列（库内聚合时环节耗时汇总用）"""
+        return await self.backend.query(queries.INTERFACE_DETAIL_DIMS)
+
+    async def aggregate_detail(self, metrics: list[str], day: str | None = None, start: str | None = None,
+                               end: str | None = None, interfaces: list[str] | None = None) -> pd.DataFrame:
+        """
+        明细表库内分组求和（dao.pushdown.trend_statement）
+        :param day: 录入日期 YYYYMMDD（当天窗口）；否则按数据日期 start ~ end（YYYY-MM-DD）
+        :param interfaces: 只统计这些接口，并多按 interface_id 分组
+        """
+        stmt = pushdown.trend_statement(self.backend.dialect, tuple(metrics), day is not None, interfaces is not None)
+        params = {'day': day} if day is not None else {'start': start, 'end': end}
+        if interfaces is not None:
+            params['interfaces'] = list(interfaces)
+        return await self.backend.execute_query(stmt, params)
+
+    def load_pk_sketches(self, dates: list[str]) -> pd.DataFrame:
+        """若干天（YYYYMMDD）的主键草图，追加 date 列；没有落盘的日期跳过"""
+        frames = [df.assign(date=d) for d in dates if (df := self.sketches.get(d)) is not None]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def load_latency_sketches(self, dates: list[str]) -> pd.DataFrame:
+        """若干天（YYYYMMDD）的耗时 / 延迟草图，追加 date 列；没有落盘的日期跳过"""
+        frames = [df.assign(date=d) for d in dates if (df := self.latency.get(d)) is not None]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
     async def write_metric(self, df: pd.DataFrame) -> None:
         """
-        将指标 DataFrame 异步写入 metric_trend 表。
+        将指标 DataFrame 异步写入 metric_trend 表（按 create_time 分区幂等发布，开启增量时只写变化行）。
+        """
+        partition = partition_of(df, ['create_time'])
+        if settings.delta_publish:
+            await publish_delta(self.backend, "data_fabric_metric_trend", df, partition, 'metric_trend_id',
+                                self.published)
+        else:
+            await self.backend.publish("data_fabric_metric_trend", df, partition)
+
+    async def write_latency(self, df: pd.DataFrame) -> None:
+        """
+        环节耗时 / 到达延迟汇总写入 data_fabric_metric_latency（按 create_time 分区幂等发布）。
+        表不存在时首次发布按结果集建表
         """
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df.to_sql(
-                    "data_fabric_metric_trend",
-                    sync_conn,
-                    index=False,
-                    if_exists="append",
-                    method="multi",
-                    chunksize=10000,
-                    dtype=None
-                )
-            )
+        await self.backend.publish("data_fabric_metric_latency", df, partition_of(df, ['create_time']))
 
+    def metric_writer(self, create_time: str) -> WriteBehind:
+        """
+        趋势表后台写入队列：日 / 周 / 月结果算完一段写一段，退出 async with 时提交 create_time 分区
+        开启增量发布时未变化的行沿用上次的 metric_trend_id，不写库
+        """
+        partition = {'create_time': create_time}
+        if settings.delta_publish:
+            return DeltaWriter(self.backend, "data_fabric_metric_trend", partition, 'metric_trend_id',
+                               self.published)
+        return WriteBehind(self.backend, "data_fabric_metric_trend", partition)
 
     async def load_metric(self, date_str: str) -> pd.DataFrame:
         """
         可选：按日期读取指标表（示例）。
         """
-        sql = f"SELECT * FROM metric_trend WHERE create_time='{date_str}'"
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
\ No newline at end of file
+        return await self.backend.query(queries.METRIC_TREND_BY_DAY, create_time=date_str)
@@ -1,37 +1,29 @@
-import asyncio
 import pandas as pd
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import text
 
-from config.settings import settings
+from dao.backends import RepoBackend, create_backend, supports_sql
+from dao.publish import partition_of
 
 
 class MysqlClient:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url, pool_pre_ping=True)
+    def __init__(self, backend: RepoBackend | None = None):
+        self.backend = backend or create_backend()
 
-    async def read_query(self, sql: str) -> pd.DataFrame:
-        async with self.engine.connect() as conn:
-            res = await conn.execute(text(sql))
-            return pd.DataFrame(res.fetchall(), columns=res.keys())
+    async def read_query(self, sql: str, schema: dict[str, str] | None = None,
+                         params: dict | None = None) -> pd.DataFrame:
+        """schema 声明列类型，结果按批直接解码为定型列；取值通过 params 绑定（:name 占位）"""
+        if not supports_sql(self.backend):
+            raise TypeError(f"后端 {type(self.backend).__name__} 不支持任意 SQL，请改用 select / query")
+        return await self.backend.read_query(sql, params=params, schema=schema)
 
     async def read_table(self, table: str) -> pd.DataFrame:
-        return await self.read_query(f"SELECT * FROM {table}")
+        return await self.backend.select(table)
 
 
-    async def write_data(self, df: pd.DataFrame, table_name: str) -> None:
+    async def write_data(self, df: pd.DataFrame, table_name: str, partition_cols: list[str] | None = None) -> None:
         """
-        将指标 DataFrame 异步写入数据表。
+        将指标 DataFrame 异步写入数据表；给出 partition_cols 时按分区幂等发布。
         """
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df.to_sql(
-                    table_name,
-                    sync_conn,
-                    index=False,
-                    if_exists="append",
-                    method="multi",
-                    chunksize=10000,
-                    dtype=None
-                )
-            )
+        if partition_cols:
+            await self.backend.publish(table_name, df, partition_of(df, partition_cols))
+        else:
+            await self.backend.insert(table_name, df)
@@ -0,0 +1,258 @@
+# dao/publish.py
+"""
+分区幂等发布：同一 create_time / data_date 重跑时整体替换当天分区，而不是继续 append。
+
+| 模式       | 说明
+| --------- | ---------------------------------------------------------
+| append    | 旧行为，直接追加（重跑会重复）
+| replace   | 先写临时表，再在一个事务内 DELETE 当天分区 + INSERT ... SELECT
+| exchange  | MySQL 分区表：临时表整体 EXCHANGE PARTITION，无分区或失败时回退 replace
+| delta     | 只写新增 / 变化行，提交时在一个事务内按主键撤回旧行再插入；仅供 dao.delta 显式使用
+
+空结果集（一行也没有写入）一律保持旧分区不变：publish 不打开发布，WriteBehind 关闭时放弃，
+commit 也不删除分区。上游缺数时不会清空驾驶舱已有数据；确需清空分区请显式删除。
+
+用法：
+    async with backend.publication(table, {'create_time': '20250727'}) as pub:
+        await pub.add(df_part1)
+        await pub.add(df_part2)     # 退出时提交；异常时丢弃临时表
+"""
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Mapping
+
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from config.settings import settings
+from dao.backends import _ident, apply_where
+
+PUBLISH_MODES = ('append', 'replace', 'exchange')
+# 增量模式不能作为 settings.publish_mode：没有撤回信息时等同于追加
+DELTA = 'delta'
+# 按主键撤回时每条 DELETE 的 IN 列表长度
+_RETRACT_CHUNK = 1000
+
+
+def partition_of(df: pd.DataFrame, cols: list[str]) -> dict[str, Any] | None:
+    """从结果集中取分区值，要求每个分区列只有一个取值；空结果集返回 None"""
+    if df.empty:
+        return None
+    part = {}
+    for col in cols:
+        values = df[col].dropna().unique()
+        if len(values) != 1:
+            raise ValueError(f"分区列 {col} 应只有一个取值，实际: {list(values)[:5]}")
+        part[col] = values[0]
+    return part
+
+
+class _BasePublication(ABC):
+    """发布对象：add 分批写入，commit 提交当天分区；后端须实现 add / commit，缺少时实例化即报错"""
+
+    def __init__(self, table: str, partition: Mapping[str, Any], mode: str | None = None):
+        self.table = _ident(table)
+        self.partition = {_ident(k): v for k, v in partition.items()}
+        self.mode = mode or settings.publish_mode
+        if self.mode not in PUBLISH_MODES and mode != DELTA:
+            raise ValueError(f"未知发布模式: {self.mode}")
+        self.rows = 0
+        self.retract_col: str | None = None
+        self.retracted: list = []
+        self._done = False
+
+    @abstractmethod
+    async def add(self, df: pd.DataFrame) -> None:
+        """追加一批行（空批忽略）"""
+
+    def retract(self, column: str, values) -> None:
+        """增量模式：提交时按 column 撤回分区内这些旧行"""
+        if self.mode != DELTA:
+            raise ValueError(f"发布模式 {self.mode} 不支持按行撤回")
+        self.retract_col = _ident(column)
+        self.retracted.extend(values)
+
+    @abstractmethod
+    async def commit(self) -> int:
+        """提交当天分区，返回写入行数；本次无数据时保持旧分区不变"""
+
+    async def abort(self) -> None:
+        self._done = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._done:
+            return
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.abort()
+
+
+class SqlPublication(_BasePublication):
+    """临时表 <表名>__stg_<随机串> 承接分批写入，提交时一次替换当天分区"""
+
+    def __init__(self, backend, table, partition, mode=None):
+        super().__init__(table, partition, mode)
+        if self.mode == 'exchange' and backend.dialect != 'mysql':
+            self.mode = 'replace'
+        self.backend = backend
+        self.stg = f"{self.table}__stg_{uuid.uuid4().hex[:8]}"
+        self.columns: list[str] | None = None
+        self._staged = False
+        self._target_exists: bool | None = None
+
+    def _q(self, name: str) -> str:
+        return self.backend.engine.dialect.identifier_preparer.quote(_ident(name))
+
+    def _where(self) -> tuple[str, dict]:
+        cond = ' AND '.join(f"{self._q(c)} = :w_{c}" for c in self.partition)
+        return cond, {f"w_{c}": v for c, v in self.partition.items()}
+
+    async def _create_staging(self, conn) -> None:
+        self._target_exists = await conn.run_sync(lambda c: inspect(c).has_table(self.table))
+        if not self._target_exists:
+            # 目标表尚不存在：临时表由 to_sql 按 DataFrame 建表，提交时直接改名
+            return
+        if self.backend.dialect == 'mysql':
+            await conn.execute(text(f"CREATE TABLE {self._q(self.stg)} LIKE {self._q(self.table)}"))
+            if self.mode == 'exchange':
+                try:
+                    await conn.execute(text(f"ALTER TABLE {self._q(self.stg)} REMOVE PARTITIONING"))
+                except Exception:
+                    # 目标表未分区，无法交换
+                    self.mode = 'replace'
+        else:
+            await conn.execute(text(
+                f"CREATE TABLE {self._q(self.stg)} AS SELECT * FROM {self._q(self.table)} WHERE 1 = 0"))
+
+    async def add(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        if self.mode == 'append':
+            await self.backend.insert(self.table, df)
+            self.rows += len(df)
+            return
+        if self.columns is None:
+            self.columns = [str(c) for c in df.columns]
+        async with self.backend.engine.begin() as conn:
+            if not self._staged:
+                await self._create_staging(conn)
+                self._staged = True
+        await self.backend.insert(self.stg, df[self.columns])
+        self.rows += len(df)
+
+    async def commit(self) -> int:
+        self._done = True
+        if self.mode == 'append':
+            return self.rows
+        engine = self.backend.engine
+        if self.mode == DELTA:
+            return await self._commit_delta()
+        if not self._staged:
+            # 本次无数据：保持旧分区不变
+            return 0
+
+        try:
+            if not self._target_exists:
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"ALTER TABLE {self._q(self.stg)} RENAME TO {self._q(self.table)}"))
+                return self.rows
+            if self.mode == 'exchange' and await self._exchange():
+                return self.rows
+            cols = ', '.join(self._q(c) for c in self.columns)
+            cond, params = self._where()
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DELETE FROM {self._q(self.table)} WHERE {cond}"), params)
+                await conn.execute(text(
+                    f"INSERT INTO {self._q(self.table)} ({cols}) SELECT {cols} FROM {self._q(self.stg)}"))
+            return self.rows
+        finally:
+            self.backend.invalidate(self.table)
+            await self._drop_staging()
+
+    async def _commit_delta(self) -> int:
+        try:
+            if self._staged and not self._target_exists:
+                async with self.backend.engine.begin() as conn:
+                    await conn.execute(text(f"ALTER TABLE {self._q(self.stg)} RENAME TO {self._q(self.table)}"))
+                return self.rows
+            cond, params = self._where()
+            async with self.backend.engine.begin() as conn:
+                if self.retracted:
+                    delete = text(f"DELETE FROM {self._q(self.table)} WHERE {cond} "
+                                  f"AND {self._q(self.retract_col)} IN :ids").bindparams(bindparam('ids', expanding=True))
+                    for i in range(0, len(self.retracted), _RETRACT_CHUNK):
+                        await conn.execute(delete, {**params, 'ids': self.retracted[i:i + _RETRACT_CHUNK]})
+                if self._staged:
+                    cols = ', '.join(self._q(c) for c in self.columns)
+                    await conn.execute(text(
+                        f"INSERT INTO {self._q(self.table)} ({cols}) SELECT {cols} FROM {self._q(self.stg)}"))
+            return self.rows
+        finally:
+            self.backend.invalidate(self.table)
+            if self._staged:
+                await self._drop_staging()
+
+    async def _exchange(self) -> bool:
+        if len(self.partition) != 1:
+            return False
+        value = str(next(iter(self.partition.values())))
+        name = _ident(settings.partition_name_template.format(value=value))
+        try:
+            async with self.backend.engine.begin() as conn:
+                await conn.execute(text(
+                    f"ALTER TABLE {self._q(self.table)} EXCHANGE PARTITION {self._q(name)} "
+                    f"WITH TABLE {self._q(self.stg)} WITHOUT VALIDATION"))
+            return True
+        except Exception as e:
+            print(f"⚠️ 分区交换失败，回退为 DELETE+INSERT：{e}")
+            return False
+
+    async def _drop_staging(self) -> None:
+        async with self.backend.engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {self._q(self.stg)}"))
+
+    async def abort(self) -> None:
+        await super().abort()
+        if self._staged:
+            await self._drop_staging()
+
+
+class FramePublication(_BasePublication):
+    """内存 / Parquet 后端：分批缓存在内存，提交时整体替换分区"""
+
+    def __init__(self, backend, table, partition, mode=None):
+        super().__init__(table, partition, mode)
+        if self.mode == 'exchange':
+            self.mode = 'replace'
+        self.backend = backend
+        self.frames: list[pd.DataFrame] = []
+
+    async def add(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        if self.mode == 'append':
+            await self.backend.insert(self.table, df)
+        else:
+            self.frames.append(df)
+        self.rows += len(df)
+
+    async def commit(self) -> int:
+        self._done = True
+        if self.mode == 'append' or (self.mode != DELTA and not self.frames):
+            # 追加已直接写入；本次无数据时保持旧分区不变
+            return self.rows
+        old = self.backend.read_all(self.table)
+        keep = old
+        if old is not None and not old.empty:
+            drop = apply_where(old, self.partition)
+            if self.mode == DELTA:
+                drop = drop[drop[self.retract_col].isin(self.retracted)] if self.retracted else drop.iloc[:0]
+            keep = old[~old.index.isin(drop.index)]
+        frames = [f for f in [keep, *self.frames] if f is not None and not f.empty]
+        new = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        self.backend.replace_all(self.table, new)
+        return self.rows
@@ -0,0 +1,72 @@
+# dao/pushdown.py
+"""
+趋势表库内聚合（settings.metric_engine = 'sql'）：日 / 周 / 月窗口直接在明细表上 GROUP BY，
+百分比字符串在库内解析，只取回 (部门, 录入日期, 业务, 等级) 粒度的各指标和与非空个数。
+
+口径与 pandas 引擎一致：
+- 百分比：去掉 % 后能解析为数字的参与均值，'-' / 空值等不计入（MySQL CAST('-' AS DECIMAL) 会得到 0，须先判断）
+- 业务：biz_name 按“,”“，”“、”拆分后展开（MySQL JSON_TABLE，SQLite json_each），空值不参与统计
+- 部门空值记 'None'、等级空值记 ''，与 pandas 侧 astype(str) / fillna('') 相同
+- 返回和与个数而不是均值：录入日期格式不一致时由调用方再合并，窗口主键唯一率也在调用方替换
+"""
+from functools import lru_cache
+
+from sqlalchemy import bindparam, text
+
+from dao.backends import _ident
+
+DETAIL_TABLE = 'data_fabric_interface_detail'
+GROUP_COLS = ('department', 'create_time', 'biz_name_split', 'level')
+
+# 方言 -> (百分比解析, biz_name 拆成 JSON 数组字符串后展开的表函数, 拆出的业务列, 转字符串)
+_DIALECTS = {
+    'mysql': (
+        "CASE WHEN d.{col} REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)%*$' "
+        "THEN CAST(REPLACE(d.{col}, '%', '') AS DECIMAL(20, 6)) END",
+        "JSON_TABLE(CONCAT('[\"', REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(d.biz_name, '\\\\', '\\\\\\\\'), "
+        "'\"', '\\\\\"'), ',', '\",\"'), '，', '\",\"'), '、', '\",\"'), '\"]'), "
+        "'$[*]' COLUMNS (biz_name_split VARCHAR(255) PATH '$')) b",
+        "b.biz_name_split",
+        "CAST(d.interface_id AS CHAR)",
+    ),
+    'sqlite': (
+        "CASE WHEN TRIM(REPLACE(d.{col}, '%', ''), '0123456789.+-') = '' "
+        "AND REPLACE(d.{col}, '%', '') GLOB '*[0-9]*' "
+        "THEN CAST(REPLACE(d.{col}, '%', '') AS REAL) END",
+        "json_each('[\"' || REPLACE(REPLACE(REPLACE(REPLACE(REPLACE("
+        "d.biz_name, '\\', '\\\\'), '\"', '\\\"'), ',', '\",\"'), '，', '\",\"'), '、', '\",\"') || '\"]') b",
+        "b.value",
+        "CAST(d.interface_id AS TEXT)",
+    ),
+}
+
+
+def supports(dialect: str) -> bool:
+    return dialect in _DIALECTS
+
+
+@lru_cache(maxsize=32)
+def trend_statement(dialect: str, metrics: tuple[str, ...], by_day: bool, interfaces: bool = False):
+    """
+    :param by_day: True 为当天窗口（create_time = :day），否则按数据日期区间（data_date BETWEEN :start AND :end）
+    :param interfaces: True 时只统计 interface_id IN :interfaces 的行，并多按 interface_id 分组、返回行数 n
+    :return: 列 department, create_time, biz_name_split, level[, interface_id][, n], s_<指标>, c_<指标>
+    """
+    pct, split, biz, as_text = _DIALECTS[dialect]
+    keys = ["COALESCE(d.department, 'None') AS department", "d.create_time AS create_time",
+            f"{biz} AS biz_name_split", "COALESCE(d.level, '') AS level"]
+    if interfaces:
+        keys += [f"{as_text} AS interface_id", "COUNT(*) AS n"]
+    values = [f"SUM({pct.format(col=_ident(m))}) AS s_{m}, COUNT({pct.format(col=_ident(m))}) AS c_{m}"
+              for m in metrics]
+    cond = ["d.biz_name IS NOT NULL", "d.biz_name <> ''", "d.create_time IS NOT NULL",
+            "d.create_time = :day" if by_day else "d.data_date BETWEEN :start AND :end"]
+    if interfaces:
+        cond.append(f"{as_text} IN :interfaces")
+    groups = len(GROUP_COLS) + (1 if interfaces else 0)
+    stmt = text(
+        f"SELECT {', '.join(keys + values)} FROM {DETAIL_TABLE} d CROSS JOIN {split} "
+        f"WHERE {' AND '.join(cond)} GROUP BY {', '.join(str(i + 1) for i in range(groups))}")
+    if interfaces:
+        stmt = stmt.bindparams(bindparam('interfaces', expanding=True))
+    return stmt
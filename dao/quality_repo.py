@@ -1,41 +1,55 @@
-# dao/quality_scale_repo.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import text
+# dao/quality_repo.py
 import pandas as pd
-from config.settings import settings
+from dao import queries
+from dao.backends import RepoBackend, create_backend
+from dao.publish import partition_of
+from dao.frame_store import FrameStore
 
 class QualityRepo:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url)
+    def __init__(self, backend: RepoBackend | None = None, aggregates: FrameStore | None = None):
+        self.backend = backend or create_backend()
+        # 按天保存 (department, statistic_cycle) 聚合，次日算环比直接查
+        self.aggregates = aggregates or FrameStore("quality_daily_agg")
 
     async def load_business_level(self, yesterday: str, today: str) -> pd.DataFrame:
         """
         取两天的数据，字段重命名后直接返回
         """
-        sql = text("""
-            SELECT *
-            FROM   data_fabric_interface_business_level_tmp
-            WHERE  create_time IN (:yesterday, :today)
-        """)
-        async with self.engine.connect() as conn:
-            res = await conn.execute(sql, {"yesterday": yesterday, "today": today})
-            df = pd.DataFrame(res.fetchall(), columns=res.keys())
+        return await self.load_business_level_days([yesterday, today])
+
+    async def load_business_level_days(self, dates: list[str]) -> pd.DataFrame:
+        """
+        取指定若干天的数据
+        """
+        df = await self.backend.query(queries.BUSINESS_LEVEL_TMP_BY_DAYS, create_time=list(dates))
         # 把日期列转 datetime，便于对齐
         df["create_time"] = pd.to_datetime(df["create_time"])
         return df
 
+    async def source_signature(self, date_str: str) -> str | None:
+        """业务级别表（tmp）当天分区的变更指纹，分区重新发布后即变化"""
+        return await self.backend.partition_signature(queries.BUSINESS_LEVEL_TMP_BY_DAYS.table,
+                                                      {'create_time': date_str})
+
+    def load_daily_aggregate(self, date_str: str, signature: str | None) -> pd.DataFrame | None:
+        """
+        某天的 (department, statistic_cycle) 聚合；未落盘、或落盘后源分区已变化（指纹不同）时返回 None
+        """
+        df = self.aggregates.get(date_str)
+        if df is None or signature is None or 'source_signature' not in df \
+                or (df['source_signature'] != signature).any():
+            return None
+        return df.drop(columns=['source_signature'])
+
+    def save_daily_aggregate(self, date_str: str, df: pd.DataFrame, signature: str | None) -> None:
+        """连同源分区指纹一起落盘；取不到指纹时不缓存"""
+        if signature is None:
+            self.aggregates.delete(date_str)
+            return
+        self.aggregates.put(date_str, df.assign(source_signature=signature))
+
     async def write_quality(self, df: pd.DataFrame) -> None:
         """
-        写入 data_fabric_interface_quality
-        """
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df.to_sql(
-                    "data_fabric_interface_quality",
-                    sync_conn,
-                    index=False,
-                    if_exists="append",
-                    method="multi",
-                    chunksize=10000
-                )
-            )
\ No newline at end of file
+        写入 data_fabric_interface_quality（按 create_time 分区幂等发布）
+        """
+        await self.backend.publish("data_fabric_interface_quality", df, partition_of(df, ['create_time']))
@@ -0,0 +1,57 @@
+# dao/queries.py
+"""
+仓储查询声明：每条查询只声明一次（表、列、条件列），条件值一律作为绑定参数在调用时传入，
+不再有任何取值拼进 SQL 文本。
+
+SqlBackend 按 (表, 列, 条件形状) 缓存生成好的语句对象，同一查询换日期重跑时 SQL 文本不变：
+- SQLAlchemy 编译缓存按语句命中，不再重复拼接、解析绑定变量、编译
+- SQLite 驱动按 SQL 文本复用连接上已准备好的语句
+- aiomysql 只走文本协议、不支持服务端 prepare，MySQL 侧的收益是稳定文本与客户端编译缓存
+"""
+from dataclasses import dataclass, replace
+from typing import Any, Mapping
+
+
+@dataclass(frozen=True)
+class Query:
+    table: str
+    columns: tuple[str, ...] | None = None
+    # 条件列：调用时按列名传值，标量为等值条件，列表为 IN
+    params: tuple[str, ...] = ()
+    distinct: bool = False
+
+    def on(self, table: str) -> 'Query':
+        """表名由配置决定的查询（如 settings.task_run_table）在调用时换表"""
+        return replace(self, table=table)
+
+    def where(self, values: Mapping[str, Any]) -> dict[str, Any]:
+        missing = [p for p in self.params if p not in values]
+        extra = [k for k in values if k not in self.params]
+        if missing or extra:
+            raise TypeError(f"查询 {self.table} 参数不匹配：缺少 {missing}，多余 {extra}")
+        return {p: values[p] for p in self.params}
+
+
+# ---------- 数据治理平台 ----------
+META_DATA_INTERFACE = Query('data_fabric_meta_data_interface')
+META_DATA_INTERFACE_DEFINITION = Query(
+    'data_fabric_meta_data_interface',
+    columns=('interface_id', 'responsibility_department', 'interface_storage_id',
+             'importance_level', 'business_scene'))
+PROTOCOL_FIELDS = Query('data_fabric_meta_data_field')   # 表名见 settings.protocol_field_table
+
+# ---------- 数智运维平台 ----------
+TASK_REGISTER = Query('data_interface_task_register')
+TASK_REGISTER_STAGES = Query('data_interface_task_register', columns=('interface_id', 'pt', 'job_stage'))
+TASK_ERROR_JOBS = Query('data_interface_task_error', columns=('job_id',), params=('data_date',), distinct=True)
+TASK_DELAY_JOBS = Query('data_interface_task_delay', columns=('job_id',), params=('data_date',), distinct=True)
+TASK_RUNS = Query('data_interface_task_run', columns=('job_id', 'start_time', 'end_time'),
+                  params=('data_date',))   # 表名见 settings.task_run_table
+
+# ---------- 驾驶舱结果表 ----------
+INTERFACE_DETAIL = Query('data_fabric_interface_detail')
+# 库内聚合时环节耗时汇总只需要接口平台的维度
+INTERFACE_DETAIL_DIMS = Query('data_fabric_interface_detail',
+                              columns=('interface_id_op', 'pt', 'data_date', 'department', 'level', 'biz_name'))
+METRIC_TREND_BY_DAY = Query('data_fabric_metric_trend', params=('create_time',))
+BUSINESS_LEVEL_TMP_BY_DAYS = Query('data_fabric_interface_business_level_tmp', params=('create_time',))
@@ -0,0 +1,145 @@
+# dao/query_cache.py
+"""
+查询结果缓存（可选，settings.query_cache_enabled 开启）：
+
+- 键：规整后的 SQL + 绑定参数的 sha1
+- 两级：进程内 LRU + 磁盘 Parquet（settings.query_cache_dir），磁盘命中后提升到内存
+- 过期：按 SQL 读到的表取各表 TTL 的最小值（settings.query_cache_ttl，未配置用默认值）
+- 失效：仓储写某表时记录该表写入时间，早于该时间缓存的、读过该表的结果全部作废；
+  写入时间落盘，其它进程的缓存同样感知
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Mapping
+
+import pandas as pd
+
+from config.settings import settings
+
+_TABLE_RE = re.compile(r'\b(?:from|join)\s+`?([A-Za-z_][A-Za-z0-9_]*)`?', re.IGNORECASE)
+_WRITES_FILE = '_table_writes.json'
+
+
+def normalize_sql(sql: str) -> str:
+    """合并空白、去掉末尾分号；不改大小写，避免影响字符串字面量"""
+    return re.sub(r'\s+', ' ', sql).strip().rstrip(';').strip()
+
+
+def tables_of(sql: str) -> frozenset[str]:
+    return frozenset(t.lower() for t in _TABLE_RE.findall(sql))
+
+
+class QueryCache:
+    def __init__(self, capacity: int | None = None, disk_dir: str | Path | None = None,
+                 default_ttl: int | None = None, table_ttl: Mapping[str, int] | None = None):
+        self.capacity = capacity or settings.query_cache_size
+        self.disk_dir = Path(disk_dir or settings.query_cache_dir)
+        self.default_ttl = default_ttl if default_ttl is not None else settings.query_cache_default_ttl
+        self.table_ttl = {k.lower(): v for k, v in (table_ttl or settings.query_cache_ttl).items()}
+        # key -> (DataFrame, 读到的表, 缓存时间)
+        self._mem: OrderedDict[str, tuple[pd.DataFrame, frozenset[str], float]] = OrderedDict()
+        self.hits = self.misses = 0
+
+    # ---------- 键与有效性 ----------
+    @staticmethod
+    def key(sql: str, params: Mapping[str, Any] | None = None) -> str:
+        payload = normalize_sql(sql) + '\n' + json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _ttl(self, tables: frozenset[str]) -> float:
+        return min([self.table_ttl.get(t, self.default_ttl) for t in tables] or [self.default_ttl])
+
+    def _writes(self) -> dict[str, float]:
+        path = self.disk_dir / _WRITES_FILE
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _valid(self, tables: frozenset[str], created: float, writes: dict[str, float]) -> bool:
+        if time.time() - created > self._ttl(tables):
+            return False
+        return all(writes.get(t, 0) < created for t in tables)
+
+    # ---------- 读写 ----------
+    def get(self, sql: str, params: Mapping[str, Any] | None = None) -> pd.DataFrame | None:
+        k = self.key(sql, params)
+        writes = self._writes()
+        entry = self._mem.get(k)
+        if entry is not None:
+            df, tables, created = entry
+            if self._valid(tables, created, writes):
+                self._mem.move_to_end(k)
+                self.hits += 1
+                return df.copy()
+            del self._mem[k]
+
+        meta_path, data_path = self.disk_dir / f"{k}.json", self.disk_dir / f"{k}.parquet"
+        if meta_path.exists() and data_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+                tables, created = frozenset(meta['tables']), meta['created']
+                if self._valid(tables, created, writes):
+                    df = pd.read_parquet(data_path)
+                    self._remember(k, df, tables, created)
+                    self.hits += 1
+                    return df.copy()
+            except (OSError, ValueError, KeyError):
+                pass
+            meta_path.unlink(missing_ok=True)
+            data_path.unlink(missing_ok=True)
+        self.misses += 1
+        return None
+
+    def put(self, sql: str, params: Mapping[str, Any] | None, df: pd.DataFrame,
+            started: float | None = None) -> None:
+        """
+        :param started: 查询发起时间；以此作为缓存时间，查询期间发生的写入会使其作废
+        """
+        k = self.key(sql, params)
+        tables, created = tables_of(sql), started or time.time()
+        self._remember(k, df.copy(), tables, created)
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.disk_dir / f".{k}.{os.getpid()}.tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self.disk_dir / f"{k}.parquet")
+            (self.disk_dir / f"{k}.json").write_text(json.dumps({'tables': sorted(tables), 'created': created}))
+        except (OSError, ValueError, TypeError):
+            # 混合类型的 object 列无法写 Parquet，只保留内存层
+            pass
+
+    def _remember(self, k: str, df: pd.DataFrame, tables: frozenset[str], created: float) -> None:
+        self._mem[k] = (df, tables, created)
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.capacity:
+            self._mem.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        """某表被写入：读过它的缓存全部作废"""
+        table = table.lower()
+        now = time.time()
+        for k in [k for k, (_, tables, _) in self._mem.items() if table in tables]:
+            del self._mem[k]
+        writes = self._writes()
+        writes[table] = now
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.disk_dir / f".{_WRITES_FILE}.{os.getpid()}.tmp"
+            tmp.write_text(json.dumps(writes))
+            os.replace(tmp, self.disk_dir / _WRITES_FILE)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        self._mem.clear()
+        if self.disk_dir.exists():
+            for p in self.disk_dir.glob('*'):
+                p.unlink(missing_ok=True)
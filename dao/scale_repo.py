@@ -1,58 +1,38 @@
-# dao/quality_scale_repo.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import text
+# dao/scale_repo.py
 import pandas as pd
-from config.settings import settings
+from dao import queries
+from dao.backends import RepoBackend, create_backend
+from dao.publish import partition_of
+from dao.frame_store import FrameStore
 
 class ScaleRepo:
-    def __init__(self):
-        self.engine = create_async_engine(settings.url)
+    def __init__(self, backend: RepoBackend | None = None, snapshots: FrameStore | None = None):
+        self.backend = backend or create_backend()
+        # 按天保存接口目录指纹快照，规模指标靠相邻快照比对得出
+        self.snapshots = snapshots or FrameStore("interface_snapshot")
 
-    async def load_business_level(self, yesterday: str, today: str) -> pd.DataFrame:
-        """
-        取两天的数据，字段重命名后直接返回
-        """
-        sql = text("""
-            SELECT *
-            FROM   data_fabric_interface_business_level
-            WHERE  create_time IN (:yesterday, :today)
-        """)
-        async with self.engine.connect() as conn:
-            res = await conn.execute(sql, {"yesterday": yesterday, "today": today})
-            df = pd.DataFrame(res.fetchall(), columns=res.keys())
-        # 把日期列转 datetime，便于对齐
-        df["create_time"] = pd.to_datetime(df["create_time"])
-        return df
-
-    async def load_quality(self, today: str) -> pd.DataFrame:
-        """
-        暂时使用质量表的数据
-        """
-        sql = text("""
-            SELECT department,create_time,statistic_cycle
-            FROM   data_fabric_interface_quality
-            WHERE  create_time = :today
-        """)
-        async with self.engine.connect() as conn:
-            res = await conn.execute(sql, {"today": today})
-            df = pd.DataFrame(res.fetchall(), columns=res.keys())
-        # 把日期列转 datetime，便于对齐
-        df["create_time"] = pd.to_datetime(df["create_time"])
-        return df
+    async def load_meta_data_interface(self) -> pd.DataFrame:
+        """数据治理平台-接口资源表（只取决定接口定义的列）"""
+        return await self.backend.query(queries.META_DATA_INTERFACE_DEFINITION)
+
+    async def load_register(self) -> pd.DataFrame:
+        """数智运维平台-接口总表"""
+        return await self.backend.query(queries.TASK_REGISTER_STAGES)
+
+    def load_snapshot(self, date_str: str) -> pd.DataFrame | None:
+        return self.snapshots.get(date_str)
+
+    def save_snapshot(self, date_str: str, df: pd.DataFrame) -> None:
+        self.snapshots.put(date_str, df)
+
+    def latest_snapshot_date(self, on_or_before: str | None = None) -> str | None:
+        """不晚于给定日期（YYYYMMDD）的最近一份快照；不给日期时为全部快照中最新的一份"""
+        dates = [d for d in self.snapshots.keys() if on_or_before is None or d <= on_or_before]
+        return dates[-1] if dates else None
 
 
     async def write_scale(self, df: pd.DataFrame) -> None:
         """
-        写入 data_fabric_interface_scale
+        写入 data_fabric_interface_scale（按 create_time 分区幂等发布）
         """
-        async with self.engine.begin() as conn:
-            await conn.run_sync(
-                lambda sync_conn: df.to_sql(
-                    "data_fabric_interface_scale",
-                    sync_conn,
-                    index=False,
-                    if_exists="append",
-                    method="multi",
-                    chunksize=10000
-                )
-            )
\ No newline at end of file
+        await self.backend.publish("data_fabric_interface_scale", df, partition_of(df, ['create_time']))
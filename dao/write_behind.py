@@ -0,0 +1,130 @@
+# dao/write_behind.py
+"""
+后台写入队列：计算侧每得到一段结果就 put 进有界队列并继续计算，后台 worker 攒批写入同一个
+分区发布（dao.publish），写库与后续计算重叠，总耗时约为 max(计算, 写入) 而不是两者之和。
+
+- 背压：队列满时 put 等待，内存中待写的帧数不超过 settings.write_behind_queue
+- 攒批：worker 取到一帧后顺带取走队列里已有的帧，凑满 settings.write_behind_batch_rows 行再写
+- 关闭：正常退出时等队列写完再提交分区；没有任何数据或带异常退出时丢弃临时表，旧分区保持不变
+- 出错：任一批写入失败，之后的 put / 关闭都会抛出该异常，已排队的帧直接丢弃
+
+用法：
+    async with WriteBehind(backend, 'data_fabric_metric_trend', {'create_time': '20250727'}) as wb:
+        await wb.put(day_df)       # 立即返回（队列满时等待）
+        await wb.put(week_df)
+"""
+import asyncio
+from typing import Any, Mapping
+
+import pandas as pd
+
+from config.settings import settings
+
+
+class WriteBehind:
+    def __init__(self, backend, table: str, partition: Mapping[str, Any], mode: str | None = None,
+                 maxsize: int | None = None, workers: int | None = None, batch_rows: int | None = None):
+        self.backend = backend
+        self.table = table
+        self.partition = dict(partition)
+        self.mode = mode
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize or settings.write_behind_queue)
+        self.workers = workers or settings.write_behind_workers
+        self.batch_rows = batch_rows or settings.write_behind_batch_rows
+        self.rows = 0
+        self._pub = None
+        self._tasks: list[asyncio.Task] = []
+        self._error: BaseException | None = None
+        self._primed = False
+        self._prime_lock = asyncio.Lock()
+        self._closed = False
+
+    async def __aenter__(self) -> 'WriteBehind':
+        self._pub = self.backend.publication(self.table, self.partition, self.mode)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"write-behind-{self.table}-{i}")
+                       for i in range(self.workers)]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self._abort()
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    async def put(self, df: pd.DataFrame) -> None:
+        """投递一段结果；队列满时等待 worker 消化"""
+        if self._closed:
+            raise RuntimeError(f"写入队列 {self.table} 已关闭")
+        self._raise()
+        if df.empty:
+            return
+        await self.queue.put(df)
+
+    async def _add(self, df: pd.DataFrame) -> None:
+        # 首批负责建临时表，其余 worker 等它完成后再并发写
+        if not self._primed:
+            async with self._prime_lock:
+                if not self._primed:
+                    await self._pub.add(df)
+                    self._primed = True
+                    return
+        await self._pub.add(df)
+
+    async def _worker(self) -> None:
+        while True:
+            df = await self.queue.get()
+            if df is None:
+                self.queue.task_done()
+                return
+            frames, rows, stop = [df], len(df), False
+            while rows < self.batch_rows:
+                try:
+                    nxt = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                frames.append(nxt)
+                rows += len(nxt)
+            try:
+                # 已有批次失败时只消费不写，避免生产方在满队列上卡死
+                if self._error is None:
+                    await self._add(frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True))
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+            finally:
+                for _ in range(len(frames) + stop):
+                    self.queue.task_done()
+            if stop:
+                return
+
+    async def close(self) -> int:
+        """等队列写完后提交分区，返回写入行数；本次没有任何数据时不替换分区"""
+        if self._closed:
+            return self.rows
+        self._closed = True
+        for _ in self._tasks:
+            await self.queue.put(None)
+        await asyncio.gather(*self._tasks)
+        if self._error is not None:
+            await self._pub.abort()
+            raise self._error
+        if self._pub.rows == 0 and not self._pub.retracted:
+            # 与 publish 一致：空结果集不动已有分区（增量模式下即没有任何变化）
+            await self._pub.abort()
+            return 0
+        self.rows = await self._pub.commit()
+        return self.rows
+
+    async def _abort(self) -> None:
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._pub.abort()
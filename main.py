@@ -1,21 +1,15 @@
+import time
+_T0 = time.perf_counter()
+
 import asyncio
-from datetime import datetime
-from dao.interface_repo import InterfaceRepo
-from dao.metric_repo import MetricRepo
-from dao.business_repo import BusinessLevelRepo
-from dao.quality_repo import QualityRepo
-from dao.scale_repo import ScaleRepo
-from service.InterfaceDetailService import InterfaceService
-from service.MetricTrendService import MetricTrendService
-from service.BusinessLevelService import BusinessLevelService
-from service.QualityService import QualityService
-from service.scale_service import ScaleService
+import importlib
+from datetime import datetime, timedelta
 
 """
 | 层级                  | 目录/模块   | 主要职责                        
 | -----------------    | ----------| ---------------------------    
 | **配置层**            | `config`  | 统一读取环境变量、数据库连接串           
-| **数据访问层 DAO**     | `dao`     | 只负责 **读写数据库**，不掺杂任何业务逻辑     
+| **数据访问层 DAO**     | `dao`     | 只负责 **读写数据库**，不掺杂任何业务逻辑；`dao.backends` 可切换 mysql/sqlite/memory/parquet     
 | **业务逻辑层 Service** | `service` | 只负责 **算法/计算**，不感知数据存储细节     
 | **公共工具层 Utils**   | `common`  | 只负责 **公共函数**
 | **入口/编排层**        | `main.py` | **选择/编排** 调用哪个 Service，控制启停            
@@ -23,75 +17,431 @@ from service.scale_service import ScaleService
 
 
 """
-interface_service  → data_fabric_interface_detail.csv    ---驾驶舱接口明细表
+中间结果均由 utils.artifacts 异步写入 artifacts/<表名>/<日期分区>/part.parquet
+
+interface_service  → data_fabric_interface_detail    ---驾驶舱接口明细表
         ↓
-metric_service     → data_fabric_metric_trend.csv（日/周/月滚动 7+30 天）    ---驾驶舱接口趋势表
+metric_service     → data_fabric_metric_trend（日/周/月滚动 7+30 天）    ---驾驶舱接口趋势表
+                   → data_fabric_metric_latency（环节耗时 / 到达延迟 P50/P95，开启 latency_enabled 时）
         ↓
-business_service   → data_fabric_interface_business_level.csv（stability/timeliness/...）    ---驾驶舱接口业务级别表
+business_service   → data_fabric_interface_business_level（stability/timeliness/...）    ---驾驶舱接口业务级别表
         ↓ 拆分
-quality_service    → data_fabric_interface_quality.csv（stability_ratio / timeliness_ratio）    ---驾驶舱接口质量表
-scale_service      → data_fabric_interface_scale.csv   ---驾驶舱接口规模表
+quality_service    → data_fabric_interface_quality（stability_ratio / timeliness_ratio）    ---驾驶舱接口质量表
+scale_service      → data_fabric_interface_scale   ---驾驶舱接口规模表
+"""
+
+
 """
+命令行：python main.py <阶段> [日期]，日期支持 YYYYMMDD / YYYY-MM-DD，缺省为今天
+    python main.py detail 2025-06-26
+    python main.py metric 20250727
+    python main.py all 20250727
+    python main.py backfill 20250701 20250731 --stages=metric,business,quality,scale
+    python main.py metric_parity 20250727
+    python main.py compute_parity 20250727
+    python main.py health
+各阶段只在运行时导入自己需要的模块，短阶段和健康检查不为无关 Service 的导入买单。
+"""
+
+# 阶段 -> 需要导入的模块（按需导入，统计导入耗时）
+STAGE_MODULES = {
+    'detail': ['dao.interface_repo', 'service.InterfaceDetailService'],
+    'metric': ['dao.metric_repo', 'service.MetricTrendService'],
+    'business': ['dao.business_repo', 'service.BusinessLevelService'],
+    'quality': ['dao.quality_repo', 'service.QualityService'],
+    'scale': ['dao.scale_repo', 'service.scale_service'],
+    'health': ['dao.backends'],
+}
+STAGE_MODULES['metric_parity'] = STAGE_MODULES['metric'] + ['dao.pushdown']
+STAGE_MODULES['compute_parity'] = [m for k in ('detail', 'metric', 'business') for m in STAGE_MODULES[k]] + ['utils.compute']
+STAGE_MODULES['all'] = [m for k in ('detail', 'metric', 'business', 'quality', 'scale') for m in STAGE_MODULES[k]] + ['dao.checkpoint']
+STAGE_MODULES['backfill'] = STAGE_MODULES['all'] + ['utils.scheduler']
+
+
+def _date(date_str=None, fmt: str = '%Y%m%d') -> str:
+    """统一日期格式：fire 会把 20250727 解析成 int，这里一并转回字符串"""
+    if date_str is None or date_str == '':
+        return datetime.now().strftime(fmt)
+    date_str = str(date_str)
+    for src in ('%Y%m%d', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(date_str, src).strftime(fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的日期: {date_str}")
 
 
-async def run_detail(date_str: str = datetime.now().strftime('%Y-%m-%d')):
+async def run_detail(date_str: str = datetime.now().strftime('%Y-%m-%d'), dispose: bool = True):
     """
     :param date_str: 数据日期
     :return: dataframe
     """
+    from dao.interface_repo import InterfaceRepo
+    from service.InterfaceDetailService import InterfaceService
+    from utils.artifacts import artifact_writer
+
     repo = InterfaceRepo()
     svc = InterfaceService(repo)
     df = await svc.build_detail(date_str)
     await repo.write_detail(df)
     print("✅ 接口明细已写入")
-    await repo.engine.dispose()
-async def run_metric(date_str: str = datetime.now().strftime('%Y%m%d')):
+    await artifact_writer.flush()
+    if dispose:
+        await repo.backend.dispose()
+    return df
+
+async def run_metric(date_str: str = datetime.now().strftime('%Y%m%d'), dispose: bool = True):
     """
     :param date_str: 数据录入日期，注意：不同于数据日期！
     :return: dataframe
     """
+    from dao.metric_repo import MetricRepo
+    from service.MetricTrendService import MetricTrendService
+    from utils.artifacts import artifact_writer
+
     repo = MetricRepo()
     svc = MetricTrendService(repo)
-    await svc.build_metric(date_str)
+    df = await svc.build_metric(date_str)
     # await repo.write_metric(metric_df)
     print("✅ 指标已写入")
-    await repo.engine.dispose()
+    await artifact_writer.flush()
+    if dispose:
+        await repo.backend.dispose()
+    return df
 
-async def run_business_level(date_str: str = datetime.now().strftime('%Y%m%d')):
+async def run_business_level(date_str: str = datetime.now().strftime('%Y%m%d'), dispose: bool = True):
     """
     :param date_str: 数据录入日期，注意：不同于数据日期！
     :return: dataframe
     """
+    from dao.business_repo import BusinessLevelRepo
+    from service.BusinessLevelService import BusinessLevelService
+    from utils.artifacts import artifact_writer
+
     repo = BusinessLevelRepo()
     agg = BusinessLevelService(repo)
     business_level_df = await agg.build_aggregate(date_str)
-    # await repo.write_data(business_level_df)
-    print("✅ 业务级数据已生成")
-    await repo.engine.dispose()
+    # 原先注释掉了写库：当时直接 append，重跑会重复。现按 create_time 分区幂等发布，可以放开
+    await repo.write_data(business_level_df)
+    print("✅ 业务级数据已写入")
+    await artifact_writer.flush()
+    if dispose:
+        await repo.backend.dispose()
+    return business_level_df
+
+async def run_quality(date_str: str = datetime.now().strftime('%Y%m%d'), dispose: bool = True):
+    from dao.quality_repo import QualityRepo
+    from service.QualityService import QualityService
+    from utils.artifacts import artifact_writer
 
-async def run_quality(date_str: str = datetime.now().strftime('%Y%m%d')):
     repo = QualityRepo()
     svc = QualityService(repo)
     df = await svc.build_quality(date_str)
     await repo.write_quality(df)
     print("✅ 驾驶舱接口质量规模表已生成并入库")
-    await repo.engine.dispose()
+    await artifact_writer.flush()
+    if dispose:
+        await repo.backend.dispose()
+    return df
+
+async def run_scale(date_str: str = datetime.now().strftime('%Y%m%d'), dispose: bool = True):
+    from dao.scale_repo import ScaleRepo
+    from service.scale_service import ScaleService
+    from utils.artifacts import artifact_writer
 
-async def run_scale(date_str: str = datetime.now().strftime('%Y%m%d')):
     repo = ScaleRepo()
     svc = ScaleService(repo)
     df = await svc.build_scale(date_str)
     await repo.write_scale(df)
     print("✅ 驾驶舱接口质量规模表已生成并入库")
-    await repo.engine.dispose()
+    await artifact_writer.flush()
+    if dispose:
+        await repo.backend.dispose()
+    return df
 
-async def run_all():
-    # await run_detail('2025-06-26')
-    await run_metric('20250727')
-    await run_business_level('20250727')
-    # await run_quality('20250629')
-    # await run_scale('20250728')
+def _stage_inputs(stage: str, d: str) -> list[tuple[str, dict | None]]:
+    """阶段读取的库表（表名, 过滤条件），用于检查点的输入指纹；d 为 YYYYMMDD"""
+    from config.settings import settings
+    from dao import queries
+
+    if stage == 'detail':
+        day = _date(d, '%Y-%m-%d')
+        inputs = [(queries.META_DATA_INTERFACE.table, None), (queries.TASK_REGISTER.table, None),
+                  (queries.TASK_ERROR_JOBS.table, {'data_date': day}), (queries.TASK_DELAY_JOBS.table, {'data_date': day})]
+        if settings.latency_enabled:
+            inputs.append((settings.task_run_table, {'data_date': day}))
+        if settings.profile_enabled or settings.sampling_enabled:
+            inputs.append((settings.protocol_field_table, None))
+        return inputs
+    if stage == 'metric':
+        return [(queries.INTERFACE_DETAIL.table, None)]
+    if stage == 'business':
+        return [(queries.METRIC_TREND_BY_DAY.table, {'create_time': d})]
+    if stage == 'quality':
+        return [(queries.BUSINESS_LEVEL_TMP_BY_DAYS.table, None)]
+    if stage == 'scale':
+        return [(queries.META_DATA_INTERFACE.table, None), (queries.TASK_REGISTER.table, None)]
+    return []
 
-if __name__ == "__main__":
-    asyncio.run(run_all())
 
+def _stage_files(stage: str, d: str) -> list[str]:
+    """明细阶段扫描 / 核对 / 抽样读取的当天接口文件（路径:大小:修改时间），文件变化同样使检查点失效"""
+    from config.settings import settings
+    from utils.file_scan import find_files
+
+    if stage != 'detail' or not (settings.profile_enabled or settings.reconcile_enabled or settings.sampling_enabled):
+        return []
+    return [f"{p}:{p.stat().st_size}:{p.stat().st_mtime_ns}"
+            for p in find_files(settings.profile_file_root, settings.profile_file_pattern, d, '*', '*')]
+
+
+# 阶段写库的目标：(表名, 分区列, 分区值日期格式)；不在此表中的阶段不落检查点
+_STAGE_OUTPUTS = {
+    'detail': ('data_fabric_interface_detail', 'data_date', '%Y-%m-%d'),
+    'metric': ('data_fabric_metric_trend', 'create_time', '%Y%m%d'),
+    'business': ('data_fabric_interface_business_level', 'create_time', '%Y%m%d'),
+    'quality': ('data_fabric_interface_quality', 'create_time', '%Y%m%d'),
+    'scale': ('data_fabric_interface_scale', 'create_time', '%Y%m%d'),
+}
+
+
+async def _checkpointed(stage: str, d: str, runner, fresh: bool = False):
+    """
+    输入指纹与检查点一致、且库中仍有该阶段当天的输出分区时直接读检查点，
+    否则运行阶段（runner 内写库成功返回后）再落检查点
+    :param d: YYYYMMDD；runner 接收阶段自己的日期格式
+    """
+    from dao.backends import create_backend
+    from dao.checkpoint import CheckpointStore, fingerprint
+
+    if stage not in _STAGE_OUTPUTS:
+        return await runner()
+    backend = create_backend()
+    store = CheckpointStore()
+    fp = await fingerprint(backend, _stage_inputs(stage, d), {'files': _stage_files(stage, d)})
+    if not fresh:
+        df = store.load(stage, d, fp)
+        if df is not None:
+            table, col, fmt = _STAGE_OUTPUTS[stage]
+            # 空结果不写库（旧分区保持不变），无从核对
+            [rows] = await backend.count_rows([(table, {col: _date(d, fmt)})]) if len(df) else [None]
+            if len(df) and not rows:
+                print(f"⚠️ 阶段 {stage} {d} 有检查点但 {table} 中没有当天数据，重新运行")
+            else:
+                print(f"⏭ 阶段 {stage} {d} 输入未变，读取检查点 {len(df)} 行")
+                return df
+    df = await runner()
+    store.save(stage, d, fp, df)
+    return df
+
+
+async def run_all(date_str: str = datetime.now().strftime('%Y%m%d'), fresh: bool = False):
+    """
+    按依赖顺序跑完同一天的全部阶段；质量表与规模表互不依赖，并发执行，一边写库时另一边继续计算
+    每个阶段写库成功后落检查点（dao.checkpoint），中途失败重跑时输入未变、且库中已有当天输出的阶段直接跳过；
+    fresh 忽略检查点
+    各阶段共用同一后端连接池，最后统一释放
+    """
+    from dao.backends import create_backend
+
+    d = _date(date_str)
+    await _checkpointed('detail', d, lambda: run_detail(_date(d, '%Y-%m-%d'), dispose=False), fresh)
+    await _checkpointed('metric', d, lambda: run_metric(d, dispose=False), fresh)
+    await _checkpointed('business', d, lambda: run_business_level(d, dispose=False), fresh)
+    await asyncio.gather(_checkpointed('quality', d, lambda: run_quality(d, dispose=False), fresh),
+                         _checkpointed('scale', d, lambda: run_scale(d, dispose=False), fresh))
+    await create_backend().dispose()
+
+def _backfill_deps(stage: str, d: str) -> list[tuple[str, str]]:
+    """
+    (阶段, 日期) 的前置节点：
+    - metric D 读 D 往前 4 周及上一自然月的明细
+    - business D 读 metric D
+    - quality D 读 business D 及各对比期（D-1、上周、上月、去年同日）
+    - scale D 依赖 D-1：接口目录快照只在正向运行时保存（见 ScaleService），须按日期先后依次运行；
+      早于已有最新快照的日期只用已存快照比对，不会被回刷覆盖
+    """
+    from config.settings import settings
+    from utils.compare import lag_dates
+    from utils.scheduler import date_range, shift
+
+    dt = datetime.strptime(d, '%Y%m%d')
+    if stage == 'metric':
+        month_start = (dt.replace(day=1) - timedelta(days=1)).replace(day=1)
+        start = min(month_start, dt - timedelta(days=27)).strftime('%Y%m%d')
+        return [('detail', x) for x in date_range(start, d)]
+    if stage == 'business':
+        return [('metric', d)]
+    if stage == 'quality':
+        lags = lag_dates(dt, settings.quality_lags).values()
+        return [('business', d)] + [('business', t.strftime('%Y%m%d')) for t in lags]
+    if stage == 'scale':
+        return [('scale', shift(d, -1))]
+    return []
+
+async def run_backfill(start: str, end: str, stages: list[str], concurrency: int | None = None,
+                       fresh: bool = False):
+    """
+    日期区间回刷：按 (日期 × 阶段) 依赖图并发执行，失败后重跑同一区间从断点续跑
+    各节点共用同一后端；调度期间共享读取结果（任意后端），元数据、登记表、明细表等相邻日期共同的输入只读一次
+    """
+    from dao.backends import create_backend
+    from utils.scheduler import BackfillScheduler
+
+    runners = {
+        'detail': lambda d: run_detail(_date(d, '%Y-%m-%d'), dispose=False),
+        'metric': lambda d: run_metric(d, dispose=False),
+        'business': lambda d: run_business_level(d, dispose=False),
+        'quality': lambda d: run_quality(d, dispose=False),
+        'scale': lambda d: run_scale(d, dispose=False),
+    }
+    scheduler = BackfillScheduler(runners, _backfill_deps, concurrency=concurrency, backend=create_backend())
+    result = await scheduler.run(start, end, stages, fresh=fresh)
+    if result['failed'] or result['skipped']:
+        raise RuntimeError(f"回刷未完成：失败 {result['failed']}，跳过 {len(result['skipped'])} 个节点；修复后重跑同一命令续跑")
+    return result
+
+async def run_metric_parity(date_str: str = datetime.now().strftime('%Y%m%d')):
+    """趋势表 pandas / sql 两种计算引擎的输出比对（不写库）"""
+    from dao.metric_repo import MetricRepo
+    from service.MetricTrendService import MetricTrendService
+
+    repo = MetricRepo()
+    diff = await MetricTrendService(repo).compare_engines(date_str)
+    await repo.backend.dispose()
+    if diff.empty:
+        print("✅ 趋势表两种计算引擎输出一致")
+    else:
+        print(f"❌ 趋势表两种计算引擎输出不一致：{len(diff)} 行")
+        print(diff.head(20).to_string())
+    return diff
+
+async def run_compute_parity(date_str: str = datetime.now().strftime('%Y%m%d')):
+    """
+    明细表 / 趋势表 / 业务级别表在 pandas、polars 两种计算后端下的输出比对（不写库，主键列不参与）
+    :param date_str: 数据录入日期；明细表以同一天作为数据日期
+    :return: 表名 -> 只在一侧出现或行序不同的行
+    """
+    from dao.business_repo import BusinessLevelRepo
+    from dao.interface_repo import InterfaceRepo
+    from dao.metric_repo import MetricRepo
+    from service.BusinessLevelService import BusinessLevelService
+    from service.InterfaceDetailService import InterfaceService
+    from service.MetricTrendService import MetricTrendService
+    from utils.artifacts import ArtifactWriter
+    from utils.compute import COMPUTE_BACKENDS, frame_diff, get_compute
+
+    detail_repo, metric_repo, business_repo = InterfaceRepo(), MetricRepo(), BusinessLevelRepo()
+    artifacts = ArtifactWriter(enabled=False)
+    tables = {}
+    for name in COMPUTE_BACKENDS:
+        compute = get_compute(name)
+        detail = await InterfaceService(detail_repo, artifacts, compute=compute).build_detail(_date(date_str, '%Y-%m-%d'))
+        # 趋势表只有 pandas 引擎经过计算后端
+        metric = await MetricTrendService(metric_repo, artifacts, compute).preview(date_str, 'pandas')
+        business = await BusinessLevelService(business_repo, artifacts, compute).build_aggregate(date_str)
+        tables[name] = {
+            'data_fabric_interface_detail': detail.drop(columns=['interface_detail_id']),
+            'data_fabric_metric_trend': metric,
+            'data_fabric_interface_business_level': business.drop(columns=['interface_business_level_id']),
+        }
+    for repo in (detail_repo, metric_repo, business_repo):
+        await repo.backend.dispose()
+
+    diffs = {}
+    for table in tables[COMPUTE_BACKENDS[0]]:
+        diffs[table] = diff = frame_diff(*(tables[name][table] for name in COMPUTE_BACKENDS), ordered=True)
+        if diff.empty:
+            print(f"✅ {table} 两种计算后端输出一致（{len(tables[COMPUTE_BACKENDS[0]][table])} 行）")
+        else:
+            print(f"❌ {table} 两种计算后端输出不一致：{len(diff)} 行")
+            print(diff.head(20).to_string())
+    return diffs
+
+async def run_health():
+    """后端连通性检查"""
+    from dao.backends import create_backend, supports_sql
+
+    backend = create_backend()
+    if supports_sql(backend):
+        await backend.read_query("SELECT 1 AS ok")
+    await backend.dispose()
+    print(f"✅ 后端 {type(backend).__name__} 可用")
+
+
+class Cli:
+    """驾驶舱数据治理：按阶段运行，日期缺省为今天"""
+
+    def detail(self, date=None):
+        """接口明细表（date 为数据日期）"""
+        self._run('detail', run_detail, _date(date, '%Y-%m-%d'))
+
+    def metric(self, date=None):
+        """接口趋势表（date 为数据录入日期）"""
+        self._run('metric', run_metric, _date(date))
+
+    def business(self, date=None):
+        """接口业务级别表"""
+        self._run('business', run_business_level, _date(date))
+
+    def quality(self, date=None):
+        """接口质量表"""
+        self._run('quality', run_quality, _date(date))
+
+    def scale(self, date=None):
+        """接口规模表"""
+        self._run('scale', run_scale, _date(date))
+
+    def all(self, date=None, fresh=False):
+        """
+        全部阶段；上次中途失败时输入未变的阶段读检查点跳过
+        :param fresh: 忽略检查点，全部重跑
+        """
+        self._run('all', run_all, _date(date), fresh)
+
+    def backfill(self, start, end=None, stages='metric,business,quality,scale', concurrency=None, fresh=False):
+        """
+        日期区间回刷（闭区间，end 缺省同 start）
+        :param stages: 逗号分隔，可选 detail/metric/business/quality/scale
+        :param concurrency: 同时运行的节点数，缺省 settings.backfill_concurrency
+        :param fresh: 忽略上次的断点，全部重跑
+        """
+        if isinstance(stages, str):
+            stages = stages.split(',')
+        stages = [s.strip() for s in stages if s.strip()]
+        self._run('backfill', run_backfill, _date(start), _date(end or start), stages, concurrency, fresh)
+
+    def metric_parity(self, date=None):
+        """趋势表 pandas / sql 计算引擎输出比对（date 为数据录入日期）"""
+        self._run('metric_parity', run_metric_parity, _date(date))
+
+    def compute_parity(self, date=None):
+        """明细 / 趋势 / 业务级别表 pandas / polars 计算后端输出比对（date 为数据录入日期）"""
+        self._run('compute_parity', run_compute_parity, _date(date))
+
+    def health(self):
+        """后端连通性检查"""
+        self._run('health', run_health)
+
+    @staticmethod
+    async def _guard(fn, *args):
+        from dao.backends import dispose_all
+        try:
+            await fn(*args)
+        finally:
+            await dispose_all()
+
+    @staticmethod
+    def _run(stage: str, fn, *args) -> None:
+        t1 = time.perf_counter()
+        for module in STAGE_MODULES[stage]:
+            importlib.import_module(module)
+        t2 = time.perf_counter()
+        print(f"⏱ 启动 {(t1 - _T0) * 1000:.0f} ms | 阶段 {stage} 按需导入 {(t2 - t1) * 1000:.0f} ms")
+        asyncio.run(Cli._guard(fn, *args))
+        print(f"⏱ 阶段 {stage} 运行 {time.perf_counter() - t2:.1f} s")
+
+
+if __name__ == "__main__":
+    import fire
+    fire.Fire(Cli)
@@ -4,14 +4,22 @@ import asyncio
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from utils.common import pct_mean
+from config.settings import settings
+from utils.common import pct_format, pct_parse
+from utils.compute import Compute, get_compute
+from utils.dimensions import constant, decode, encode
 from dao.business_repo import BusinessLevelRepo
 from dao.mysql_client import MysqlClient
+from utils.artifacts import ArtifactWriter, artifact_writer
 
 class BusinessLevelService:
-    def __init__(self, repo: BusinessLevelRepo):
+    def __init__(self, repo: BusinessLevelRepo, artifacts: ArtifactWriter | None = None,
+                 compute: Compute | None = None):
         self.repo = repo
-        self.dao_sql = MysqlClient()
+        self.artifacts = artifacts or artifact_writer
+        # 分组汇总的计算后端（settings.compute_backend）
+        self.compute = compute or get_compute()
+        self.dao_sql = MysqlClient(repo.backend)
 
     # ---------- 列映射 ----------
     COL_MAP = {
@@ -47,25 +55,27 @@ class BusinessLevelService:
         'normativity': ['normativity_field_format']
     }
 
-    def _calc(self, group: pd.DataFrame) -> pd.Series:
-        return pd.Series({
-            k: pct_mean(group[cols].stack()) for k, cols in self.GROUP_COLS.items()
-        })
+    def _calc(self, df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+        """
+        各分组内把同一类的多列值合在一起求均值：sum(各列之和) / sum(各列非空个数)，
+        等价于逐组 stack 后取均值，一次 groupby 算完；截断取整后补 %
+        """
+        sums, counts = self.compute.group_sum_count(df, keys, list(self.COL_MAP))
+        out = sums.index.to_frame(index=False)
+        # 保留原 groupby.apply + reset_index 产生的 index 列（分组序号）
+        out['index'] = np.arange(len(out))
+        for k, cols in self.GROUP_COLS.items():
+            mean = sums[cols].sum(axis=1) / counts[cols].sum(axis=1)
+            out[k] = pct_format(mean.fillna(0)).where(mean.notna(), '-').to_numpy()
+        return out
 
     # ---------- 主流程 ----------
     async def build_aggregate(self, date_str: str) -> pd.DataFrame:
         df_raw = await self.repo.load_data(date_str)
-        df = df_raw.astype({
-            'department': str, 'create_time': str, 'statistic_cycle': str,
-            'stability_scan': str, 'stability_clean': str, 'stability_convert': str,
-            'stability_warehouse': str, 'stability_check': str,
-            'scan_timeliness': str, 'cleaning_timeliness': str,
-            'conversion_timeliness': str, 'warehousing_timeliness': str,
-            'inspection_timeliness': str, 'completeness_file_field': str,
-            'accuracy_sample_field': str, 'consistency_file_record': str,
-            'uniqueness_primary_key': str, 'normativity_field_format': str,
-            'biz_name': str, 'level': str
-        })
+        df = encode(df_raw.astype({'create_time': str}), ['department', 'statistic_cycle', 'biz_name', 'level'])
+        # 百分比列只解析一次
+        for col in self.COL_MAP:
+            df[col] = pct_parse(df[col])
 
         # 并发聚合
         level1_obj1, level1_obj2 = await asyncio.gather(
@@ -78,34 +88,28 @@ class BusinessLevelService:
             int(time.time() * 1000) + np.arange(len(final))
         ).astype(str)
 
-        final.to_csv('data_fabric_interface_business.csv', index=False, encoding='utf_8_sig')
+        self.artifacts.submit(final, 'data_fabric_interface_business_level', 'create_time')
         print(f"业务级聚合完成 {len(final)} 条")
         return final
 
     # ---------- 并发聚合 ----------
     async def _agg_obj1(self, df: pd.DataFrame) -> pd.DataFrame:
         # 1. 当天真正聚合结果
-        agg = (
-            df
-                .groupby(['department', 'create_time', 'statistic_cycle', 'biz_name'], as_index=False)
-                .apply(self._calc, include_groups=False)
-                .reset_index()
-        )
+        agg = self._calc(df, ['department', 'create_time', 'statistic_cycle', 'biz_name'])
 
-        # 2. 全量骨架：所有 department / create_time / statistic_cycle 与 5 个固定 biz_name 的笛卡尔积
-        full_biz = ['-', '大音', '掌经', '一经']
+        # 2. 全量骨架：所有 department / create_time / statistic_cycle 与配置的固定 biz_name 的笛卡尔积
+        full_biz = constant(settings.dimension_values['biz_name'], df['biz_name'])
         skeleton = (
             df[['department', 'create_time', 'statistic_cycle']]
             .drop_duplicates()
-            .assign(key=1)
-            .merge(pd.DataFrame({'biz_name': full_biz, 'key': 1}), on='key')
-            .drop(columns='key')
+            .merge(pd.DataFrame({'biz_name': full_biz}), how='cross')
         )
 
         # 3. merge + 填充 + 补列
         full = (
             skeleton
             .merge(agg, on=['department', 'create_time', 'statistic_cycle', 'biz_name'], how='left')
+            .pipe(decode)
             .fillna('-')
             .assign(object_type='1')
         )
@@ -113,27 +117,21 @@ class BusinessLevelService:
         return full
     async def _agg_obj2(self, df: pd.DataFrame) -> pd.DataFrame:
         # 1. 真正聚合的部分（仅对当天有数据的 level 才出现）
-        agg = (
-            df
-            .groupby(['department', 'create_time', 'statistic_cycle', 'level'], as_index=False)
-            .apply(self._calc, include_groups=False)
-            .reset_index()
-        )
+        agg = self._calc(df, ['department', 'create_time', 'statistic_cycle', 'level'])
 
-        # 2. 构造全量骨架：所有 department / create_time / statistic_cycle 与 P0-P5 的笛卡尔积
-        levels = ['P0', 'P1', 'P2', 'P3', 'P4', 'P5']
+        # 2. 构造全量骨架：所有 department / create_time / statistic_cycle 与配置的 P0-P5 的笛卡尔积
+        levels = constant(settings.dimension_values['level'], df['level'])
         skeleton = (
             df[['department', 'create_time', 'statistic_cycle']]
             .drop_duplicates()
-            .assign(key=1)  # 造一个临时列做笛卡尔积
-            .merge(pd.DataFrame({'level': levels, 'key': 1}), on='key')
-            .drop(columns='key')
+            .merge(pd.DataFrame({'level': levels}), how='cross')
         )
 
         # 3. 把骨架与聚合结果 merge，缺失的指标列填 “-”
         full = (
             skeleton
             .merge(agg, on=['department', 'create_time', 'statistic_cycle', 'level'], how='left')
+            .pipe(decode)
             .fillna('-')  # 所有 NaN -> “-”
             .assign(object_type='2')  # 补上固定列
         )
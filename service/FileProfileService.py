@@ -0,0 +1,121 @@
+# FileProfileService.py
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from dao.interface_repo import InterfaceRepo
+from utils.file_scan import find_files, merge_profiles, profile_file
+
+# 扫描结果回填的明细表列
+PROFILE_COLS = ['protocol_field_count', 'file_field_count', 'file_field_completeness_rate',
+                'primary_key_uniqueness_rate', 'field_format_normativity_rate', 'inspected_fields']
+PK_FLAGS = {'1', 'y', 'yes', 'true', '是'}
+
+
+class FileProfileService:
+    """
+    接口文件画像：按协议字段表逐个扫描当天的接口文件，回填明细表的字段数、完整率、主键唯一率、格式规范率。
+    文件在进程池中并行扫描，单个文件按块流式读取；主键去重草图按天落盘，供趋势表周 / 月窗口合并。
+    """
+
+    def __init__(self, repo: InterfaceRepo, workers: int | None = None, root: str | Path | None = None):
+        self.repo = repo
+        self.workers = workers or settings.profile_workers
+        self.root = Path(root or settings.profile_file_root)
+
+    def find_files(self, date_str: str, file_name: str, interface_id: str) -> list[Path]:
+        return find_files(self.root, settings.profile_file_pattern, date_str, file_name, interface_id)
+
+    @staticmethod
+    def _spec(fields: pd.DataFrame) -> dict:
+        fields = fields.sort_values('field_order', kind='stable')
+        patterns = fields['field_format'] if 'field_format' in fields else pd.Series([None] * len(fields))
+        pk_flags = fields['is_primary_key'] if 'is_primary_key' in fields else pd.Series([None] * len(fields))
+        return {
+            'n_fields': len(fields),
+            'names': fields['field_name'].astype(str).tolist(),
+            'patterns': [p if isinstance(p, str) and p.strip() else None for p in patterns],
+            'pk': [i for i, f in enumerate(pk_flags) if str(f).strip().lower() in PK_FLAGS],
+            'exact_limit': settings.uniqueness_exact_limit,
+            'precision': settings.sketch_precision,
+            'delimiter': settings.profile_delimiter,
+            'encoding': settings.profile_encoding,
+            'chunk_bytes': settings.profile_chunk_bytes,
+        }
+
+    @staticmethod
+    def _summarize(spec: dict, prof: dict) -> dict:
+        n, records = spec['n_fields'], prof['records']
+        counts = prof['field_counts']
+        non_null = np.asarray(prof['non_null'], dtype=float)
+        checked = np.asarray(prof['format_checked'], dtype=float)
+        ok = np.asarray(prof['format_ok'], dtype=float)
+        completeness = (non_null / records).mean() * 100 if records and n else 100
+        normativity = ok.sum() / checked.sum() * 100 if checked.sum() else 100
+        inspected = [name for name, p in zip(spec['names'], spec['patterns']) if p]
+        # 未配置主键时保持默认 100%
+        uniqueness = min(prof['pk'].count() / records, 1) * 100 if prof['pk'] is not None and records else 100
+        return {
+            'protocol_field_count': n,
+            # 文件字段数取出现最多的每行字段数
+            'file_field_count': max(counts, key=counts.get) if counts else 0,
+            'file_field_completeness_rate': f"{int(completeness)}%",
+            'primary_key_uniqueness_rate': f"{int(uniqueness)}%",
+            'field_format_normativity_rate': f"{int(normativity)}%",
+            'inspected_fields': ','.join(inspected) if inspected else 'NULL',
+        }
+
+    def _save_sketches(self, date_str: str, merged: dict[str, dict]) -> None:
+        """当天各接口的主键草图与记录数落盘（覆盖当天）"""
+        rows = [{'interface_id': iid, 'records': prof['records'], 'precision': settings.sketch_precision,
+                 **prof['pk'].to_record()}
+                for iid, prof in merged.items() if prof['pk'] is not None]
+        if rows:
+            self.repo.save_pk_sketches(date_str.replace('-', ''), pd.DataFrame(rows))
+
+    async def profile(self, date_str: str, interfaces: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param interfaces: interface_id + interface_file_name
+        :return: 以 interface_id 为索引、PROFILE_COLS 为列；没有协议或找不到文件的接口不出现
+        """
+        fields = await self.repo.load_protocol_fields()
+        fields = fields.assign(interface_id=fields['interface_id'].astype(str))
+        specs = {iid: self._spec(g) for iid, g in fields.groupby('interface_id', sort=False)}
+
+        jobs = []   # (interface_id, path)
+        for r in interfaces.dropna(subset=['interface_id']).drop_duplicates('interface_id').itertuples(index=False):
+            iid = str(r.interface_id)
+            if iid in specs and isinstance(r.interface_file_name, str) and r.interface_file_name:
+                jobs.extend((iid, p) for p in self.find_files(date_str, r.interface_file_name, iid))
+        if not jobs:
+            print("接口文件扫描：无可扫描文件")
+            return pd.DataFrame(columns=PROFILE_COLS, index=pd.Index([], name='interface_id'))
+
+        # 大文件先投递，进程池尾部更均衡
+        jobs.sort(key=lambda j: j[1].stat().st_size, reverse=True)
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, profile_file, str(path), specs[iid]) for iid, path in jobs),
+                return_exceptions=True
+            )
+
+        per_interface: dict[str, list[dict]] = {}
+        for (iid, path), res in zip(jobs, results):
+            if isinstance(res, Exception):
+                print(f"⚠️ 接口文件扫描失败 {path}：{res}")
+                continue
+            per_interface.setdefault(iid, []).append(res)
+
+        merged = {iid: merge_profiles(profs, settings.uniqueness_exact_limit, settings.sketch_precision)
+                  for iid, profs in per_interface.items()}
+        rows = {iid: self._summarize(specs[iid], prof) for iid, prof in merged.items()}
+        out = pd.DataFrame.from_dict(rows, orient='index', columns=PROFILE_COLS)
+        self._save_sketches(date_str, merged)
+        out.index.name = 'interface_id'
+        print(f"接口文件扫描完成：{len(jobs)} 个文件，{len(out)} 个接口")
+        return out
@@ -3,7 +3,15 @@ import time
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from config.settings import settings
 from dao.interface_repo import InterfaceRepo
+from service.FileProfileService import PROFILE_COLS, FileProfileService
+from service.LatencyService import LATENCY_COLS, LatencyService
+from service.ReconcileService import RECONCILE_COLS, ReconcileService
+from service.SamplingService import SAMPLING_COLS, SamplingService
+from utils.artifacts import ArtifactWriter, artifact_writer
+from utils.common import composite_score, pct_format
+from utils.compute import Compute, get_compute
 
 # ---------- 常量 ----------
 STAGE_DICT = pd.DataFrame(
@@ -21,8 +29,22 @@ PT_PREFIX_LEN = {'省经': 2, '一经': 2}   # 其它平台 3
 
 
 class InterfaceService:
-    def __init__(self, repo: InterfaceRepo):
+    def __init__(self, repo: InterfaceRepo, artifacts: ArtifactWriter | None = None,
+                 profiler: FileProfileService | None = None, reconciler: ReconcileService | None = None,
+                 sampler: SamplingService | None = None, latency: LatencyService | None = None,
+                 compute: Compute | None = None):
         self.repo = repo
+        self.artifacts = artifacts or artifact_writer
+        # 环节展开 / 透视的计算后端（settings.compute_backend）
+        self.compute = compute or get_compute()
+        # 接口文件扫描：开启后回填字段数、完整率、格式规范率，否则保持默认值
+        self.profiler = profiler or (FileProfileService(repo) if settings.profile_enabled else None)
+        # 记录数核对：开启后回填文件记录数、入库记录数、一致率
+        self.reconciler = reconciler or (ReconcileService(repo) if settings.reconcile_enabled else None)
+        # 抽样比对：开启后回填抽样字段准确性
+        self.sampler = sampler or (SamplingService(repo) if settings.sampling_enabled else None)
+        # 环节耗时：开启后按作业运行记录回填各环节平均耗时、到达时间
+        self.latency = latency or (LatencyService(repo) if settings.latency_enabled else None)
 
     def split_platform_interface(self, df: pd.DataFrame) -> pd.DataFrame:
         """初步拆分平台和接口"""
@@ -52,6 +74,60 @@ class InterfaceService:
         print(f"拆分平台后共有{len(parsed)}个记录")
         return parsed
 
+    def stage_matrix(self, uni: pd.DataFrame) -> tuple[pd.MultiIndex, list[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (接口, 平台) × 环节 标志矩阵：计算后端按环节名生成，这里换成英文名并按英文名排列
+        :return: (接口, 平台) 索引（升序）、环节英文名（升序）、存在 / 失败 / 延迟 三个 bool 矩阵
+        """
+        pairs, names, present, failed, delayed = self.compute.stage_flags(uni)
+        # 未映射的环节名按字典序编号为 other1、other2 ...
+        others = sorted(n for n in names if n not in STAGE_MAP)
+        stage_en = np.array([STAGE_MAP.get(n) or f"other{others.index(n) + 1}" for n in names], dtype=object)
+        order = np.argsort(stage_en, kind='stable')
+        return pairs, list(stage_en[order]), present[:, order], failed[:, order], delayed[:, order]
+
+    def stage_pivot(self, uni: pd.DataFrame) -> pd.DataFrame:
+        """
+        标志矩阵一次生成宽表：<环节>_failure_rate 有失败为 100%，<环节>_timeliness_rate 有作业且无延迟为 100%，
+        其余（含接口没有该环节）为 0%
+        """
+        pairs, stages, present, failed, delayed = self.stage_matrix(uni)
+        print(f"按接口编号、平台、ETL作业名分组后记录数{int(present.sum())}个")
+        pct = np.array(['0%', '100%'], dtype=object)
+        values = np.hstack([pct[failed.astype(np.intp)], pct[(present & ~delayed).astype(np.intp)]])
+        pivot = pd.DataFrame(
+            values,
+            columns=[f"{s}_failure_rate" for s in stages] + [f"{s}_timeliness_rate" for s in stages]
+        )
+        pivot.insert(0, 'interface_id', pairs.get_level_values(0))
+        pivot.insert(1, 'pt', pairs.get_level_values(1))
+        # 各环节失败率（0 / 100）按配置权重的综合得分，供 operation_stability 使用，输出前删除
+        weights = [settings.stage_weights.get(s, 1.0) for s in stages]
+        pivot['_failure_score'] = composite_score(np.where(failed, 100.0, 0.0), weights)
+        return pivot
+
+    @staticmethod
+    def overlay(final: pd.DataFrame, result: pd.DataFrame, cols: list[str],
+                keys: tuple[str, ...] = ('interface_id',)) -> pd.DataFrame:
+        """按 keys（结果的索引）用扫描 / 核对结果覆盖默认列，结果中没有的接口保持原值"""
+        if len(keys) == 1:
+            ids = final[keys[0]].astype(str)
+        else:
+            ids = pd.MultiIndex.from_frame(final[list(keys)].astype(str))
+        hit = ids.isin(result.index)
+        hit = hit if isinstance(hit, np.ndarray) else hit.to_numpy()
+        if not hit.any():
+            return final
+        final = final.copy()
+        for col in cols:
+            values = result[col].reindex(ids[hit]).to_numpy()
+            dtype = final[col].dtype
+            final[col] = final[col].astype(object)
+            final.loc[hit, col] = values
+            if pd.api.types.is_integer_dtype(dtype):
+                final[col] = final[col].astype(dtype)
+        return final
+
     async def build_detail(self, date_str: str) -> pd.DataFrame:
 
         meta = await self.repo.load_meta_data_interface()
@@ -95,35 +171,8 @@ class InterfaceService:
         delay = await self.repo.load_delay(date_str)
         print(f"数智运维平台 - register:{len(reg)} | error:{len(error)} | delay:{len(delay)}")
 
-        def prefix_len(pt):
-            return 2 if pt in ('省经', '一经') else 3
-
         # 此部分处理为同步处理,dataframe在内存中无异步操作
-        rows = []
-        for r in reg.itertuples(index=False):
-            stage_raw = str(r.job_stage).strip()
-            pt_val = r.pt
-            if stage_raw in ('', 'null', 'None'):
-                stage_raw = '01' if pt_val in ('省经', '一经') else '10'
-            else:
-                stage_raw = stage_raw.replace('null', '10')
-            for stage_num in stage_raw.split(','):
-                stage_num = stage_num.strip()
-                if not stage_num:
-                    continue
-                new_job_id = (
-                        r.job_id[:prefix_len(pt_val)] +
-                        str(r.interface_id).zfill(4) +
-                        stage_num.zfill(2)
-                )
-                rows.append({
-                    'new_job_id': new_job_id,
-                    'interface_id': str(r.interface_id).zfill(4),
-                    'pt': pt_val,
-                    'stage_num': stage_num
-                })
-
-        uni_df = pd.DataFrame(rows)
+        uni_df = self.compute.expand_jobs(reg, PT_PREFIX_LEN)
 
         uni = uni_df.drop_duplicates(['pt', 'new_job_id'])
         uni = uni.merge(STAGE_DICT, left_on='stage_num', right_on='stage_code', how='left').fillna({'stage_name': '未知'})
@@ -134,37 +183,7 @@ class InterfaceService:
         uni['failure_flag'] = uni['new_job_id'].isin(err_set)
         uni['delay_flag'] = uni['new_job_id'].isin(dly_set)
 
-        flag = (
-            uni.groupby(['interface_id', 'pt', 'stage_name'], as_index=False).agg(has_fail=('failure_flag', 'any'), has_delay=('delay_flag', 'any'))
-        )
-        flag['has_fail'] = flag['has_fail'].map({True: '100%', False: '0%'})
-        flag['has_delay'] = flag['has_delay'].map({True: '0%', False: '100%'})  # 统计的是及时率，从延迟表里来，就
-
-        flag['stage_name_en'] = (
-            flag['stage_name']
-            .map(STAGE_MAP)
-            .fillna(
-                flag['stage_name']
-                .mask(flag['stage_name'].isin(STAGE_MAP.keys()), '')
-                .replace('', pd.NA)
-                .dropna()
-                .astype('category')
-                .cat.codes.add(1)
-                .astype(str)
-                .radd('other')
-                )
-        )
-        print(f"按接口编号、平台、ETL作业名分组后记录数{len(flag)}个")
-        flag['f_col'] = flag['stage_name_en'] + '_failure_rate'
-        flag['d_col'] = flag['stage_name_en'] + '_timeliness_rate'
-        # 以interface_id和pt作为索引，生成透视表
-        pivot_f = (flag.pivot(index=['interface_id', 'pt'], columns='f_col', values='has_fail').fillna(False).reset_index())
-        pivot_d = (flag.pivot(index=['interface_id', 'pt'], columns='d_col', values='has_delay').fillna(False).reset_index())
-        # 合并两个透视表
-        pivot = pd.merge(pivot_f, pivot_d, on=['interface_id', 'pt'], how='outer').fillna(False)
-
-        for col in pivot.columns:
-            pivot[col] = pivot[col].replace({True: '100%', False: '0%'})
+        pivot = self.stage_pivot(uni)
 
         final_tmp = sql_df.merge(
             pivot,
@@ -195,12 +214,7 @@ class InterfaceService:
             record_count_consistency_rate='100%',
             inspected_fields='NULL',
             field_format_normativity_rate='100%',
-            operation_stability=lambda d: (
-                (100 - d.filter(regex=r'_failure_rate$')
-                 .apply(lambda s: pd.to_numeric(s.str.rstrip('%'), errors='coerce'))
-                 .mean(axis=1))
-                .fillna(0).astype(int).astype(str) + '%'
-            ),
+            operation_stability=lambda d: pct_format((100 - d['_failure_score']).fillna(0)),
             scan_arrival_time='-',  # 扫描作业到达时间
             cleaning_avg_time='-',  # 平均清洗时间
             cleaning_arrival_time='-',  # 清洗作业到达时间
@@ -221,10 +235,23 @@ class InterfaceService:
 
         rate_cols = [c for c in final.columns if c.endswith(('_failure_rate', '_timeliness_rate'))]
         final[rate_cols] = final[rate_cols].fillna('100%')
-        final = final.drop(columns=[c for c in final.columns if c.endswith(('_x', '_y', '_csv'))])
+        final = final.drop(columns=[c for c in final.columns if c.endswith(('_x', '_y', '_csv'))] + ['_failure_score'])
 
         final = final.drop(columns=['platform_block'])
         print(f"最终右关联数智运维平台业务表后记录数{len(final)}个")
-        final.to_csv(f"data_fabric_interface_detail.csv", index=False, encoding='utf_8_sig')
+        files = final[['interface_id', 'interface_file_name']]
+        if self.profiler is not None:
+            final = self.overlay(final, await self.profiler.profile(date_str, files), PROFILE_COLS)
+        if self.reconciler is not None:
+            final = self.overlay(final, await self.reconciler.reconcile(date_str, files), RECONCILE_COLS)
+        if self.sampler is not None:
+            final = self.overlay(final, await self.sampler.sample(date_str, files), SAMPLING_COLS)
+        if self.latency is not None:
+            jobs = uni[['new_job_id', 'interface_id', 'pt']].assign(stage=uni['stage_name'].map(STAGE_MAP))
+            schedule = sql_df[['storage_interface_id', 'pt', 'protocol_upload_time']].rename(
+                columns={'storage_interface_id': 'interface_id'})
+            final = self.overlay(final, await self.latency.latency(date_str, jobs, schedule), LATENCY_COLS,
+                                 keys=('interface_id_op', 'pt'))
+        self.artifacts.submit(final, 'data_fabric_interface_detail', 'data_date')
 
         return final
\ No newline at end of file
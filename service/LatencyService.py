@@ -0,0 +1,104 @@
+# LatencyService.py
+import numpy as np
+import pandas as pd
+
+from config.settings import data_fabric_interface_detail_cols, settings
+from dao.interface_repo import InterfaceRepo
+from utils.intervals import merge_intervals, to_seconds
+from utils.sketches import DDSketch
+
+# 回填的明细表列：<环节>_avg_time 平均运行分钟数，<环节>_arrival_time 到达时间（扫描环节只有到达时间）
+LATENCY_COLS = [c for c in data_fabric_interface_detail_cols if c.endswith(('_avg_time', '_arrival_time'))]
+
+
+def clock_seconds(s: pd.Series) -> np.ndarray:
+    """'08:00' / '8:00:00' 这类约定时刻转当天秒数，无法解析为 NaN"""
+    text = s.fillna('').astype(str).str.strip()
+    text = text.where(~text.str.fullmatch(r'\d{1,2}:\d{2}'), text + ':00')
+    return pd.to_timedelta(text.where(text.str.fullmatch(r'\d{1,2}:\d{2}:\d{2}')), errors='coerce') \
+        .dt.total_seconds().to_numpy()
+
+
+class LatencyService:
+    """
+    环节耗时与到达时间：按作业号关联当天作业运行记录，同一作业重跑 / 重试的区间合并后计运行时长
+    （utils.intervals），环节到达时间取该环节各作业的最晚结束时间，与 protocol_upload_time 比较得到延迟。
+    逐 (接口, 平台, 环节) 的耗时、延迟写入 DDSketch 按天落盘，趋势表按周 / 月合并草图求均值与分位数。
+    """
+
+    def __init__(self, repo: InterfaceRepo):
+        self.repo = repo
+
+    @staticmethod
+    def _stage_stats(runs: pd.DataFrame, jobs: pd.DataFrame) -> pd.DataFrame:
+        """:return: 每个作业一行：interface_id, pt, stage, busy（秒）, last_end（epoch 秒）"""
+        runs = runs.astype({'job_id': str}).merge(jobs, left_on='job_id', right_on='new_job_id')
+        if runs.empty:
+            return pd.DataFrame(columns=['interface_id', 'pt', 'stage', 'busy', 'last_end'])
+        codes, uniq = pd.MultiIndex.from_frame(runs[['pt', 'new_job_id']]).factorize()
+        merged = merge_intervals(codes, to_seconds(runs['start_time']), to_seconds(runs['end_time']))
+        # 每个作业号对应唯一的 (接口, 平台, 环节)
+        keys = runs.drop_duplicates(['pt', 'new_job_id']).set_index(['pt', 'new_job_id'])
+        keys = keys.reindex(uniq[merged['group'].to_numpy()])
+        return pd.DataFrame({
+            'interface_id': keys['interface_id'].to_numpy(),
+            'pt': keys.index.get_level_values(0),
+            'stage': keys['stage'].to_numpy(),
+            'busy': merged['busy'].to_numpy(),
+            'last_end': merged['last_end'].to_numpy(),
+        })
+
+    def _save_sketches(self, date_str: str, per_job: pd.DataFrame, per_stage: pd.DataFrame) -> None:
+        """
+        当天 (接口, 平台, 环节) 的草图落盘（覆盖当天），metric 取值：
+        duration 各作业运行时长，lag 环节到达时间相对约定时间的延迟（提前为负），单位均为分钟
+        """
+        alpha = settings.latency_relative_accuracy
+        rows = []
+        for metric, frame, col in (('duration', per_job, 'busy_min'), ('lag', per_stage, 'lag_min')):
+            for (iid, pt, stage), values in frame.groupby(['interface_id', 'pt', 'stage'], sort=False)[col]:
+                sketch = DDSketch(alpha)
+                sketch.add(values.to_numpy())
+                if sketch.n:
+                    rows.append({'interface_id': iid, 'pt': pt, 'stage': stage, 'metric': metric,
+                                 **sketch.to_record()})
+        if rows:
+            self.repo.save_latency_sketches(date_str.replace('-', ''), pd.DataFrame(rows))
+
+    async def latency(self, date_str: str, jobs: pd.DataFrame, schedule: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param jobs: new_job_id, interface_id（运维四位接口号）, pt, stage（环节英文名，未映射为空）
+        :param schedule: interface_id（运维四位接口号）, pt, protocol_upload_time
+        :return: 以 (interface_id, pt) 为索引、LATENCY_COLS 为列；没有运行记录的环节为 '-'
+        """
+        runs = await self.repo.load_task_runs(date_str)
+        jobs = (
+            jobs.dropna(subset=['stage', 'new_job_id'])
+            .drop_duplicates(['pt', 'new_job_id'])
+            [['new_job_id', 'interface_id', 'pt', 'stage']]
+        )
+        per_job = self._stage_stats(runs, jobs)
+        if per_job.empty:
+            print(f"环节耗时：作业运行记录 {len(runs)} 条，无可关联作业")
+            return pd.DataFrame(columns=LATENCY_COLS, index=pd.MultiIndex.from_arrays([[], []],
+                                                                                       names=['interface_id', 'pt']))
+        per_job['busy_min'] = per_job['busy'] / 60
+
+        # 环节：作业平均运行时长、最晚结束为到达时间
+        per_stage = per_job.groupby(['interface_id', 'pt', 'stage'], sort=False).agg(
+            avg_min=('busy_min', 'mean'), arrival=('last_end', 'max')).reset_index()
+        day_start = pd.Timestamp(date_str).value // 10 ** 9 + settings.arrival_day_offset * 86400
+        schedule = schedule.dropna(subset=['interface_id', 'pt']).drop_duplicates(['interface_id', 'pt'])
+        due = pd.Series(day_start + clock_seconds(schedule['protocol_upload_time']),
+                        index=pd.MultiIndex.from_frame(schedule[['interface_id', 'pt']]))
+        due = due.reindex(pd.MultiIndex.from_frame(per_stage[['interface_id', 'pt']])).to_numpy()
+        per_stage['lag_min'] = (per_stage['arrival'].to_numpy() - due) / 60
+        self._save_sketches(date_str, per_job, per_stage)
+
+        per_stage['avg_time'] = per_stage['avg_min'].map('{:.1f}'.format)
+        per_stage['arrival_time'] = pd.to_datetime(per_stage['arrival'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+        wide = per_stage.pivot(index=['interface_id', 'pt'], columns='stage', values=['avg_time', 'arrival_time'])
+        wide.columns = [f"{stage}_{kind}" for kind, stage in wide.columns]
+        out = wide.reindex(columns=LATENCY_COLS).fillna('-')
+        print(f"环节耗时：作业运行记录 {len(runs)} 条，{len(per_job)} 个作业，{len(out)} 个接口平台")
+        return out
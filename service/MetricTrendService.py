@@ -5,148 +5,348 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-from utils.common import pct_int
+from utils.common import pct_format, pct_parse
+from utils.compute import Compute, frame_diff, get_compute
+from utils.dimensions import decode, encode, encode_series
+from utils.sketches import DDSketch, DistinctCounter
+from config.settings import settings
 from dao.metric_repo import MetricRepo
+from utils.artifacts import ArtifactWriter, artifact_writer
 
 class MetricTrendService:
-    def __init__(self, repo: MetricRepo):
+    def __init__(self, repo: MetricRepo, artifacts: ArtifactWriter | None = None, compute: Compute | None = None):
         self.repo = repo
+        self.artifacts = artifacts or artifact_writer
+        # pandas 引擎下窗口分组均值的计算后端（settings.compute_backend）
+        self.compute = compute or get_compute()
 
-    @staticmethod
-    def pct_int(series: pd.Series) -> int:
-        return int(pd.to_numeric(series.astype(str).str.rstrip('%'), errors='coerce').mean())
-
-    AGG_DICT = {
-        'stability_scan': ('scan_failure_rate', lambda s: f"{100 - MetricTrendService.pct_int(s)}%"),  # 扫描稳定性
-        'scan_timeliness': ('scan_timeliness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 扫描及时性
-        'stability_clean': ('cleaning_failure_rate', lambda s: f"{100 - MetricTrendService.pct_int(s)}%"),  # 清洗稳定性
-        'cleaning_timeliness': ('cleaning_timeliness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 清洗及时性
-        'stability_convert': ('conversion_failure_rate', lambda s: f"{100 - MetricTrendService.pct_int(s)}%"),  # 转换稳定性
-        'conversion_timeliness': ('conversion_timeliness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 转换及时性
-        'stability_warehouse': ('warehousing_failure_rate', lambda s: f"{100 - MetricTrendService.pct_int(s)}%"),  # 入库稳定性
-        'warehousing_timeliness': ('warehousing_timeliness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 入库及时性
-        'stability_check': ('inspection_failure_rate', lambda s: f"{100 - MetricTrendService.pct_int(s)}%"),  # 校验稳定性
-        'inspection_timeliness': ('inspection_timeliness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 校验及时性
-        'accuracy_sample_field': ('sampling_field_accuracy', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 抽样字段准确性
-        'consistency_file_record': ('record_count_consistency_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 文件记录数一致性
-        'completeness_file_field': ('file_field_completeness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 文件字段完整性
-        'uniqueness_primary_key': ('primary_key_uniqueness_rate', lambda s: f"{MetricTrendService.pct_int(s)}%"),  # 主键唯一性
-        'normativity_field_format': ('field_format_normativity_rate', lambda s: f"{MetricTrendService.pct_int(s)}%")  # 字段格式规范率
+    # 输出列 -> (明细列, 是否失败率)；失败率输出为稳定性 = 100 - 失败率
+    METRICS = {
+        'stability_scan': ('scan_failure_rate', True),  # 扫描稳定性
+        'scan_timeliness': ('scan_timeliness_rate', False),  # 扫描及时性
+        'stability_clean': ('cleaning_failure_rate', True),  # 清洗稳定性
+        'cleaning_timeliness': ('cleaning_timeliness_rate', False),  # 清洗及时性
+        'stability_convert': ('conversion_failure_rate', True),  # 转换稳定性
+        'conversion_timeliness': ('conversion_timeliness_rate', False),  # 转换及时性
+        'stability_warehouse': ('warehousing_failure_rate', True),  # 入库稳定性
+        'warehousing_timeliness': ('warehousing_timeliness_rate', False),  # 入库及时性
+        'stability_check': ('inspection_failure_rate', True),  # 校验稳定性
+        'inspection_timeliness': ('inspection_timeliness_rate', False),  # 校验及时性
+        'accuracy_sample_field': ('sampling_field_accuracy', False),  # 抽样字段准确性
+        'consistency_file_record': ('record_count_consistency_rate', False),  # 文件记录数一致性
+        'completeness_file_field': ('file_field_completeness_rate', False),  # 文件字段完整性
+        'uniqueness_primary_key': ('primary_key_uniqueness_rate', False),  # 主键唯一性
+        'normativity_field_format': ('field_format_normativity_rate', False)  # 字段格式规范率
     }
+    GROUP_KEYS = ['department', 'create_time', 'biz_name_split', 'level']
+    # 各周期结果按此去重（不含 level，保留排序后的第一行）
+    CYCLE_KEYS = ['department', 'biz_name', 'create_time', 'statistic_cycle', 'statistic_week_month']
+    ENGINES = ('pandas', 'sql')
+    # 环节耗时 / 到达延迟汇总的分位数
+    LATENCY_QUANTILES = {'p50': 0.5, 'p95': 0.95}
+
+    def _aggregate(self, df: pd.DataFrame, bridge: pd.DataFrame, mask: pd.Series,
+                   uniqueness: pd.Series | None = None) -> pd.DataFrame:
+        """
+        按维度编码分组求均值，截断取整后补 %（均值为空记 0）
+        :param bridge: (row, biz_name_split) 桥表，row 为 df 中的行号；只按行号取出窗口内需要的列
+        :param mask: df 上的窗口条件
+        :param uniqueness: 窗口级主键唯一率（interface_id -> %），有草图的接口以此替换逐日值
+        """
+        src = [col for col, _ in self.METRICS.values()]
+        b = bridge[mask.to_numpy()[bridge['row'].to_numpy()]]
+        rows = df[['department', 'create_time', 'level', 'interface_id'] + src].take(b['row'].to_numpy())
+        rows['biz_name_split'] = b['biz_name_split'].array
+        if uniqueness is not None and not uniqueness.empty:
+            col = 'primary_key_uniqueness_rate'
+            rows[col] = rows['interface_id'].astype(str).map(uniqueness).fillna(rows[col])
+        return self._format(self.compute.group_mean(rows, self.GROUP_KEYS, src))
+
+    def _format(self, mean: pd.DataFrame) -> pd.DataFrame:
+        """以 GROUP_KEYS 为索引的各明细列均值 → 输出指标列（失败率转稳定性）"""
+        pct = mean.fillna(0).astype(int)
+        out = mean.index.to_frame(index=False)
+        for name, (col, failure) in self.METRICS.items():
+            out[name] = pct_format(100 - pct[col] if failure else pct[col]).to_numpy()
+        return out
+
+    @staticmethod
+    def _label(agg: pd.DataFrame, cycle: int, dt: datetime, label: str) -> pd.DataFrame:
+        return (
+            agg.assign(statistic_cycle=cycle, create_time=dt.strftime('%Y%m%d'), statistic_week_month=label)
+            .rename(columns={'biz_name_split': 'biz_name'})
+        )
+
+    @staticmethod
+    def _window_uniqueness(sketches: pd.DataFrame, start: datetime, end: datetime) -> pd.Series:
+        """
+        窗口内逐日主键草图按接口合并：去重主键数 / 总记录数（%），跨天重复的主键只计一次
+        """
+        if sketches.empty:
+            return pd.Series(dtype=float)
+        win = sketches[(sketches['date'] >= start.strftime('%Y%m%d')) & (sketches['date'] <= end.strftime('%Y%m%d'))]
+        out = {}
+        for iid, g in win.groupby('interface_id', sort=False):
+            counter = None
+            for r in g.itertuples(index=False):
+                part = DistinctCounter.from_record(r.registers, r.exact if isinstance(r.exact, bytes) else None,
+                                                   settings.uniqueness_exact_limit, int(r.precision))
+                counter = part if counter is None else counter.merge(part)
+            records = g['records'].sum()
+            out[str(iid)] = min(counter.count() / records, 1) * 100 if records else 100.0
+        return pd.Series(out, dtype=float)
+
+    @staticmethod
+    def _windows(dt: datetime) -> list[tuple[int, datetime, datetime, str]]:
+        """(statistic_cycle, 起, 止, statistic_week_month)：当天、近 4 个自然周、上月"""
+        weeks = [(dt - timedelta(days=i * 7 + 6), dt - timedelta(days=i * 7)) for i in range(4)]
+        first_day = (dt.replace(day=1) - pd.offsets.MonthBegin(1))
+        last_day = first_day + pd.offsets.MonthEnd(1)
+        return ([(1, dt, dt, dt.strftime('%Y%m%d'))]
+                + [(2, s, e, f"{s.strftime('%Y%m%d')}-{e.strftime('%Y%m%d')}") for s, e in weeks]
+                + [(3, first_day, last_day, first_day.strftime('%Y%m'))])
+
+    def _latency(self, df: pd.DataFrame, bridge: pd.DataFrame, dt: datetime, sketches: pd.DataFrame) -> pd.DataFrame:
+        """
+        环节耗时 / 到达延迟：按日、周、月窗口合并逐日草图，得到 (部门, 业务, 等级, 环节, 指标) 的
+        样本数与均值、P50、P95（分钟）；接口平台的维度取明细中最新一天的记录
+        """
+        if sketches.empty or 'interface_id_op' not in df:
+            return pd.DataFrame()
+        latest = (
+            df[['interface_id_op', 'pt', 'data_date']].assign(row=np.arange(len(df)))
+            .sort_values('data_date', kind='stable')
+            .drop_duplicates(['interface_id_op', 'pt'], keep='last')
+        )
+        b = bridge[np.isin(bridge['row'].to_numpy(), latest['row'].to_numpy())]
+        dims = df[['interface_id_op', 'pt', 'department', 'level']].take(b['row'].to_numpy())
+        dims = dims.assign(interface_id=dims['interface_id_op'].astype(str), pt=dims['pt'].astype(str),
+                           biz_name_split=b['biz_name_split'].array).drop(columns=['interface_id_op'])
+
+        # 每行草图只解析一次，各窗口按行号取用
+        record_cols = ['alpha', 'count', 'sum', 'zeros', 'keys', 'counts', 'neg_keys', 'neg_counts']
+        parsed = [DDSketch.from_record(**r) for r in sketches[record_cols].to_dict('records')]
+        sk = (
+            sketches[['interface_id', 'pt', 'stage', 'metric', 'date']]
+            .astype({'interface_id': str, 'pt': str})
+            .assign(sketch=np.arange(len(sketches)))
+            .merge(dims, on=['interface_id', 'pt'])
+        )
+        keys = ['department', 'biz_name_split', 'level', 'stage', 'metric']
+        frames = []
+        for cycle, start, end, label in self._windows(dt):
+            win = sk[(sk['date'] >= start.strftime('%Y%m%d')) & (sk['date'] <= end.strftime('%Y%m%d'))]
+            rows = []
+            for key, idx in win.groupby(keys, observed=True, sort=False)['sketch']:
+                merged = DDSketch.merge_all([parsed[i] for i in idx])
+                rows.append((*key, merged.n, merged.mean(),
+                             *merged.quantile(list(self.LATENCY_QUANTILES.values()))))
+            frames.append(pd.DataFrame(rows, columns=keys + ['samples', 'avg', *self.LATENCY_QUANTILES])
+                          .assign(statistic_cycle=cycle, statistic_week_month=label))
+        out = pd.concat(frames, ignore_index=True)
+        stats = ['avg', *self.LATENCY_QUANTILES]
+        out[stats] = out[stats].astype(float).round(1)
+        return decode(out.assign(create_time=dt.strftime('%Y%m%d')).rename(columns={'biz_name_split': 'biz_name'}))
 
     # ---------- 主流程 ----------
-    async def build_metric(self, date_str: str) -> pd.DataFrame:
-        # 1) 一次性读库
-        df_raw = await self.repo.load_data(date_str)
-        df = df_raw.astype({
-            'department': str,
-            'create_time': str,
-            'data_date': str,
-            'scan_failure_rate': str,
-            'scan_timeliness_rate': str,
-            'cleaning_failure_rate': str,
-            'cleaning_timeliness_rate': str,
-            'conversion_failure_rate': str,
-            'conversion_timeliness_rate': str,
-            'warehousing_failure_rate': str,
-            'warehousing_timeliness_rate': str,
-            'inspection_failure_rate': str,
-            'inspection_timeliness_rate': str,
-            'sampling_field_accuracy': str,
-            'record_count_consistency_rate': str,
-            'file_field_completeness_rate': str,
-            'primary_key_uniqueness_rate': str,
-            'field_format_normativity_rate': str
-        })
+    def _engine(self) -> str:
+        """settings.metric_engine；后端不支持库内聚合时回退 pandas"""
+        engine = settings.metric_engine
+        if engine not in self.ENGINES:
+            raise ValueError(f"未知趋势表计算引擎: {engine}")
+        if engine == 'sql' and not self.repo.pushdown:
+            print(f"⚠️ 后端 {type(self.repo.backend).__name__} 不支持库内聚合，趋势表改用 pandas 计算")
+            return 'pandas'
+        return engine
+
+    def _prepare(self, df_raw: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """明细 → (编码后的明细, (行号, biz_name_split) 桥表)"""
+        # level 空值记 ''（与原先整表 fillna('') 一致），department 空值随 astype(str) 成为 'None' / 'nan'
+        df = encode(df_raw.astype({c: str for c in ('create_time', 'data_date') if c in df_raw})
+                    .fillna({'level': ''}), ['department', 'level'])
+        # 百分比列只解析一次，各周期直接对数值求均值
+        for col, _ in self.METRICS.values():
+            if col in df:
+                df[col] = pct_parse(df[col])
 
         df['data_date'] = pd.to_datetime(df['data_date'], errors='coerce')
-        df['create_time'] = pd.to_datetime(df['create_time'], errors='coerce')
+        if 'create_time' in df:
+            df['create_time'] = pd.to_datetime(df['create_time'], errors='coerce')
+
+        # 拆分 biz_name：只展开 (行号, biz_name) 桥表，多业务接口不复制整行明细
+        biz = df['biz_name'].fillna('').astype(str).reset_index(drop=True)
+        # 空值不进桥表即不参与统计；按“、”或“,”拆分，若无分隔符则原样保留
+        split = biz[biz != ''].str.split(r'[,，、]').explode()
+        bridge = pd.DataFrame({
+            'row': split.index.to_numpy(),
+            'biz_name_split': encode_series(split.fillna('').reset_index(drop=True), 'biz_name'),
+        })
+        return df, bridge
+
+    def _sketches(self, dt: datetime) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """周 / 月窗口覆盖的各天主键草图（未开启文件扫描时为空，沿用逐日唯一率均值）与环节耗时草图"""
+        first_day = (dt.replace(day=1) - pd.offsets.MonthBegin(1))
+        span = list(pd.date_range(min(first_day, dt - timedelta(days=27)), dt).strftime('%Y%m%d'))
+        return self.repo.load_pk_sketches(span), self.repo.load_latency_sketches(span)
+
+    async def _cycles(self, engine: str, dt: datetime, sketches: pd.DataFrame, need_dims: bool):
+        """:return: (日 / 周 / 月结果的异步迭代器, 明细, 桥表)；sql 引擎只在 need_dims 时读维度列"""
+        if engine == 'sql':
+            df, bridge = self._prepare(await self.repo.load_dimensions()) if need_dims else (pd.DataFrame(), None)
+            return self._sql_cycles(dt, sketches), df, bridge
+        df, bridge = self._prepare(await self.repo.load_data(dt.strftime('%Y%m%d')))
+        return self._pandas_cycles(df, bridge, dt, sketches), df, bridge
+
+    async def build_metric(self, date_str: str) -> pd.DataFrame:
         dt_point = datetime.strptime(date_str, '%Y%m%d')
+        sketches, latency_sketches = self._sketches(dt_point)
 
-        # 2) 拆分 biz_name
-        df['biz_name'] = df['biz_name'].fillna('').astype(str)
-        df = df[df['biz_name'] != '']  # 空值保留原行
-        # 按“、”或“,”拆分；若无分隔符则原样保留
-        df = df.assign(biz_name_split=df['biz_name'].str.split(r'[,，、]')).explode('biz_name_split').fillna('')
-
-        # 3) 并发聚合
-        day_df, week_df, month_df = await asyncio.gather(
-            self._day(df, dt_point),
-            self._week(df, dt_point),
-            self._month(df, dt_point)
-        )
+        # 1) 取数：pandas 引擎一次性读明细；sql 引擎在库内聚合，只取回聚合行
+        cycles, df, bridge = await self._cycles(self._engine(), dt_point, sketches, not latency_sketches.empty)
 
-        # 4) 合并并去重
-        result = pd.concat([day_df, week_df, month_df], ignore_index=True)
+        # 2) 日 / 周 / 月每段算完立即入队写库
         base_ms = int(time.time() * 1000)
-        result['metric_trend_id'] = (base_ms + np.arange(len(result))).astype(str)
-        # result['metric_type'] = '-'
+        frames = []
+        async with self.repo.metric_writer(dt_point.strftime('%Y%m%d')) as writer:
+            async for part in cycles:
+                part = decode(part)
+                part['metric_trend_id'] = (base_ms + sum(map(len, frames)) + np.arange(len(part))).astype(str)
+                frames.append(part)
+                await writer.put(part)
+            # 环节耗时 / 到达延迟汇总（未开启环节耗时时没有草图），与最后一段写库重叠
+            latency = await asyncio.to_thread(self._latency, df, bridge, dt_point, latency_sketches)
 
-        result.to_csv('data_fabric_metric_trend_business.csv', index=False, encoding='utf_8_sig')
-        await self.repo.write_metric(result)
+        # 3) 合并
+        result = pd.concat(frames, ignore_index=True)
+        # result['metric_type'] = '-'
+        self.artifacts.submit(result, 'data_fabric_metric_trend', 'create_time')
         print(f"趋势表完成 {len(result)} 条")
+
+        if not latency.empty:
+            await self.repo.write_latency(latency)
+            self.artifacts.submit(latency, 'data_fabric_metric_latency', 'create_time')
+            print(f"环节耗时汇总完成 {len(latency)} 条，已写入")
         return result
 
+    async def preview(self, date_str: str, engine: str | None = None) -> pd.DataFrame:
+        """日 / 周 / 月结果（不写库、不生成主键）；engine 缺省按 settings.metric_engine"""
+        dt_point = datetime.strptime(date_str, '%Y%m%d')
+        sketches, _ = self._sketches(dt_point)
+        cycles, _, _ = await self._cycles(engine or self._engine(), dt_point, sketches, False)
+        return pd.concat([decode(part) async for part in cycles], ignore_index=True)
+
+    async def compare_engines(self, date_str: str) -> pd.DataFrame:
+        """
+        同一天分别用 pandas / sql 引擎计算日 / 周 / 月结果（不写库），返回只在一侧出现的行（_merge 列标明来源），
+        为空即两种引擎输出一致
+        """
+        if not self.repo.pushdown:
+            raise ValueError(f"后端 {type(self.repo.backend).__name__} 不支持库内聚合，无法比对")
+        out = [(await self.preview(date_str, engine)).astype(str) for engine in self.ENGINES]
+        return frame_diff(*out, names=self.ENGINES)
+
+    async def _pandas_cycles(self, df: pd.DataFrame, bridge: pd.DataFrame, dt: datetime, sketches: pd.DataFrame):
+        """日 / 周 / 月依次在线程中聚合，事件循环空出来给后台写入"""
+        for task, args in ((self._day, (df, bridge, dt)),
+                           (self._week, (df, bridge, dt, sketches)),
+                           (self._month, (df, bridge, dt, sketches))):
+            yield await asyncio.to_thread(task, *args)
+
+    # ------------ 库内聚合（dao.pushdown） ------------
+    async def _sql_window(self, cycle: int, start: datetime, end: datetime, sketches: pd.DataFrame) -> pd.DataFrame:
+        """一个窗口在库内分组求和，取回后按 GROUP_KEYS 求均值并格式化"""
+        src = [col for col, _ in self.METRICS.values()]
+        if cycle == 1:
+            return self._sql_means(await self.repo.aggregate_detail(src, day=start.strftime('%Y%m%d')))
+        window = {'start': start.strftime('%Y-%m-%d'), 'end': end.strftime('%Y-%m-%d')}
+        uniqueness = self._window_uniqueness(sketches, start, end)
+        if uniqueness.empty:
+            return self._sql_means(await self.repo.aggregate_detail(src, **window))
+        sums, per_interface = await asyncio.gather(
+            self.repo.aggregate_detail(src, **window),
+            self.repo.aggregate_detail(['primary_key_uniqueness_rate'], interfaces=list(uniqueness.index), **window))
+        return self._sql_means(sums, per_interface, uniqueness)
+
+    def _sql_means(self, sums: pd.DataFrame, per_interface: pd.DataFrame | None = None,
+                   uniqueness: pd.Series | None = None) -> pd.DataFrame:
+        """
+        库内分组的和 / 个数 → 与 _aggregate 相同的输出；录入日期按日期解析后再合并一次
+        有窗口主键草图的接口：其行的唯一率整体替换为窗口值（与 pandas 引擎的 map + fillna 相同）
+        """
+        src = [col for col, _ in self.METRICS.values()]
+        values = [f"{p}_{col}" for col in src for p in ('s', 'c')]
+        sums = sums.copy()
+        sums[values] = sums[values].apply(pd.to_numeric, errors='coerce').astype(float)
+        sums = self._sql_keys(sums)
+        totals = sums.groupby(self.GROUP_KEYS)[values].sum()
+        if per_interface is not None and not per_interface.empty:
+            col = 'primary_key_uniqueness_rate'
+            part = self._sql_keys(per_interface.copy())
+            part[[f's_{col}', f'c_{col}', 'n']] = \
+                part[[f's_{col}', f'c_{col}', 'n']].apply(pd.to_numeric, errors='coerce').astype(float)
+            part['v'] = part['n'] * part['interface_id'].astype(str).map(uniqueness)
+            adj = part.groupby(self.GROUP_KEYS)[[f's_{col}', f'c_{col}', 'n', 'v']].sum().reindex(totals.index, fill_value=0)
+            totals[f's_{col}'] += adj['v'] - adj[f's_{col}']
+            totals[f'c_{col}'] += adj['n'] - adj[f'c_{col}']
+        counts = pd.DataFrame({col: totals[f'c_{col}'] for col in src})
+        mean = pd.DataFrame({col: totals[f's_{col}'] for col in src}) / counts.where(counts > 0)
+        return self._format(mean)
+
+    @staticmethod
+    def _sql_keys(df: pd.DataFrame) -> pd.DataFrame:
+        """分组键对齐 pandas 引擎：维度转字符串，录入日期解析为日期，解析失败的行不参与统计"""
+        df['create_time'] = pd.to_datetime(df['create_time'].astype(str), errors='coerce')
+        for col in ('department', 'biz_name_split', 'level'):
+            df[col] = df[col].astype(str)
+        return df.dropna(subset=['create_time'])
+
+    async def _sql_cycles(self, dt: datetime, sketches: pd.DataFrame):
+        """全部窗口并发查询，按日 / 周 / 月依次产出"""
+        windows = self._windows(dt)
+        aggs = await asyncio.gather(*(self._sql_window(cycle, start, end, sketches)
+                                      for cycle, start, end, _ in windows))
+        for cycle, name in ((1, '日'), (2, '周'), (3, '月')):
+            part = pd.concat([self._label(agg, c, dt, label) for agg, (c, _, _, label) in zip(aggs, windows)
+                              if c == cycle], ignore_index=True).drop_duplicates(subset=self.CYCLE_KEYS)
+            print(f"子任务-{name}数据库内聚合已完成：{len(part)}")
+            yield part
+
     # ------------ 子任务：直接返回业务级聚合 ------------
-    async def _day(self, df: pd.DataFrame, dt: datetime) -> pd.DataFrame:
-
-        dey_df = (
-                df[df['create_time'] == dt]
-                .groupby([
-                    'department', 'create_time', 'biz_name_split', 'level'
-                ], as_index=False)
-                .agg(**self.AGG_DICT)
-                .assign(statistic_cycle=1,
-                        create_time=dt.strftime('%Y%m%d'),
-                        statistic_week_month=dt.strftime('%Y%m%d'))
-                .rename(columns={'biz_name_split': 'biz_name'})
-            )
-        dey_df = dey_df.drop_duplicates(subset=['department', 'biz_name', 'create_time', 'statistic_cycle', 'statistic_week_month'])
+    def _day(self, df: pd.DataFrame, bridge: pd.DataFrame, dt: datetime) -> pd.DataFrame:
+
+        dey_df = self._label(self._aggregate(df, bridge, df['create_time'] == dt), 1, dt, dt.strftime('%Y%m%d'))
+        dey_df = dey_df.drop_duplicates(subset=self.CYCLE_KEYS)
         print(f"子任务-日数据聚合已完成：{len(dey_df)}")
         # dey_df.to_csv('data_fabric_metric_trend_business_day.csv', index=False, encoding='utf_8_sig')
         return dey_df
 
 
-    async def _week(self, df: pd.DataFrame, dt: datetime) -> pd.DataFrame:
+    def _week(self, df: pd.DataFrame, bridge: pd.DataFrame, dt: datetime, sketches: pd.DataFrame) -> pd.DataFrame:
         windows = [(dt - timedelta(days=i * 7 + 6), dt - timedelta(days=i * 7)) for i in range(4)]
         dfs = []
         for w_start, w_end in windows:
-            df_week = (
-                df[(df['data_date'] >= w_start) & (df['data_date'] <= w_end)]
-                .groupby([
-                    'department', 'create_time', 'biz_name_split', 'level'
-                ], as_index=False)
-                .agg(**self.AGG_DICT)
-                .assign(statistic_cycle=2,
-                        create_time=dt.strftime('%Y%m%d'),
-                        statistic_week_month=f"{w_start.strftime('%Y%m%d')}-{w_end.strftime('%Y%m%d')}")
-                .rename(columns={'biz_name_split': 'biz_name'})
-            )
+            df_week = self._label(
+                self._aggregate(df, bridge, (df['data_date'] >= w_start) & (df['data_date'] <= w_end),
+                                self._window_uniqueness(sketches, w_start, w_end)),
+                2, dt, f"{w_start.strftime('%Y%m%d')}-{w_end.strftime('%Y%m%d')}")
             dfs.append(df_week)
 
         print(f"子任务-周数据聚合已完成：{len(dfs)}")
         week_df = pd.concat(dfs, ignore_index=True)
-        week_df = week_df.drop_duplicates(subset=['department', 'biz_name', 'create_time', 'statistic_cycle', 'statistic_week_month'])
+        week_df = week_df.drop_duplicates(subset=self.CYCLE_KEYS)
         # week_df.to_csv('data_fabric_metric_trend_business_week.csv', index=False, encoding='utf_8_sig')
         return week_df
 
 
 
-    async def _month(self, df: pd.DataFrame, dt: datetime) -> pd.DataFrame:
+    def _month(self, df: pd.DataFrame, bridge: pd.DataFrame, dt: datetime, sketches: pd.DataFrame) -> pd.DataFrame:
         first_day = (dt.replace(day=1) - pd.offsets.MonthBegin(1))
         last_day = first_day + pd.offsets.MonthEnd(1)
-        month_df = (
-            df[(df['data_date'] >= first_day) & (df['data_date'] <= last_day)]
-            .groupby([
-                'department', 'create_time', 'biz_name_split', 'level'
-            ], as_index=False)
-            .agg(**self.AGG_DICT)
-            .assign(statistic_cycle=3,
-                    create_time=dt.strftime('%Y%m%d'),
-                    statistic_week_month=first_day.strftime('%Y%m'))
-            .rename(columns={'biz_name_split': 'biz_name'})
-        )
+        month_df = self._label(
+            self._aggregate(df, bridge, (df['data_date'] >= first_day) & (df['data_date'] <= last_day),
+                            self._window_uniqueness(sketches, first_day, last_day)),
+            3, dt, first_day.strftime('%Y%m'))
         print(f"子任务-月数据聚合已完成：{len(month_df)}")
-        month_df = month_df.drop_duplicates(subset=['department', 'biz_name', 'create_time', 'statistic_cycle', 'statistic_week_month'])
+        month_df = month_df.drop_duplicates(subset=self.CYCLE_KEYS)
         # month_df.to_csv('data_fabric_metric_trend_business_month.csv', index=False, encoding='utf_8_sig')
         return month_df
\ No newline at end of file
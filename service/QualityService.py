@@ -1,20 +1,43 @@
 import time
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Sequence
 
-from utils.common import pct_int, pct_ratio
+from config.settings import settings
+from utils.compare import lag_dates, multi_lag_ratios
 from dao.quality_repo import QualityRepo
+from utils.artifacts import ArtifactWriter, artifact_writer
 
 class QualityService:
-    def __init__(self, repo: QualityRepo):
+    def __init__(self, repo: QualityRepo, artifacts: ArtifactWriter | None = None,
+                 lags: Sequence[str] | None = None):
         self.repo = repo
+        self.artifacts = artifacts or artifact_writer
+        # 对比期：day 日环比 / week 周同比 / month 月同比 / year 年同比
+        self.lags = list(lags if lags is not None else settings.quality_lags)
+
+    @staticmethod
+    def _daily_aggregate(df: pd.DataFrame) -> pd.DataFrame:
+        """单日按 department、statistic_cycle 求均值（浮点），既用于当天输出也落盘供后续各期对比"""
+        return (
+            df
+            .groupby(['department', 'statistic_cycle'], as_index=False)
+            .agg(
+                stability=('stability', 'mean'),
+                timeliness=('timeliness', 'mean')
+            )
+        )
 
     async def build_quality(self, date_str: str) -> pd.DataFrame:
         today = datetime.strptime(date_str, "%Y%m%d")
-        yesterday = (today - timedelta(days=1)).strftime("%Y%m%d")
+        lag_days = sorted({d.strftime("%Y%m%d") for d in lag_dates(today, self.lags).values()})
 
-        df = await self.repo.load_business_level(yesterday, date_str)
+        # 各对比期的聚合优先查本地缓存（源分区指纹不变才可用），缺失或已失效的日期与当天一起一次查库
+        signatures = {d: await self.repo.source_signature(d) for d in [*lag_days, date_str]}
+        history = {d: self.repo.load_daily_aggregate(d, signatures[d]) for d in lag_days}
+        missing = [d for d in lag_days if history[d] is None]
+        df = await self.repo.load_business_level_days(missing + [date_str])
         if df.empty:
             return pd.DataFrame()
 
@@ -24,42 +47,41 @@ class QualityService:
         df['stability'] = df['stability'].astype(str).str.rstrip('%').astype(float)
         df['timeliness'] = df['timeliness'].astype(str).str.rstrip('%').astype(float)
 
-        # 先按 department、statistic_cycle、create_time 聚合当天值
-        today_df = (
-            df[df['create_time'] == date_str]
-            .groupby(['department', 'statistic_cycle', 'create_time'], as_index=False)
-            .agg(
-                stability=('stability', lambda x: f"{pct_int(x)}%"),
-                timeliness=('timeliness', lambda x: f"{pct_int(x)}%")
-            )
-        )
+        # 先按 department、statistic_cycle 聚合当天值
+        today_agg = self._daily_aggregate(df[df['create_time'] == date_str])
+        if not today_agg.empty:
+            self.repo.save_daily_aggregate(date_str, today_agg, signatures[date_str])
+        today_df = today_agg.assign(
+            create_time=date_str,
+            stability=lambda x: x['stability'].fillna(0).astype(int).astype(str) + '%',
+            timeliness=lambda x: x['timeliness'].fillna(0).astype(int).astype(str) + '%'
+        )[['department', 'statistic_cycle', 'create_time', 'stability', 'timeliness']]
         print(f"当天聚合计算结果{len(today_df)}个")
-        # 计算环比（与昨天同维度）
-        yest_df = (
-            df[df['create_time'] == yesterday]
-            .groupby(['department', 'statistic_cycle'], as_index=False)
-            .agg(
-                yest_stability=('stability', 'mean'),
-                yest_timeliness=('timeliness', 'mean')
-            )
-        )
-        print(f"昨天聚合计算结果{len(today_df)}个")
-        # 合并计算环比
-        result = (
-            today_df
-            .merge(yest_df, on=['department', 'statistic_cycle'], how='left')
-            .assign(
-                stability_ratio=lambda r: pct_ratio(r['stability'], r['yest_stability']),
-                timeliness_ratio=lambda r: pct_ratio(r['timeliness'], r['yest_timeliness']),
-                object_type='1',
-                create_time=date_str
-            )
-            .drop(columns=['yest_stability', 'yest_timeliness'])
-        )
+
+        # 补齐缓存缺失的历史日期并落盘
+        for d in missing:
+            agg = self._daily_aggregate(df[df['create_time'] == d])
+            if not agg.empty:
+                self.repo.save_daily_aggregate(d, agg, signatures[d])
+                history[d] = agg
+        print(f"对比期历史 {len(lag_days)} 天：缓存命中 {len(lag_days) - len(missing)} 天，查库补齐 {len(missing)} 天")
+
+        frames = [agg.assign(date=pd.Timestamp(d)) for d, agg in history.items() if agg is not None]
+        hist = (pd.concat(frames, ignore_index=True) if frames else
+                pd.DataFrame({'department': [], 'statistic_cycle': [], 'stability': [], 'timeliness': [],
+                              'date': pd.Series([], dtype='datetime64[ns]')}))
+
+        # 各对比期一次对齐、一次算完
+        result = multi_lag_ratios(
+            today_df, hist,
+            keys=['department', 'statistic_cycle'],
+            value_cols=['stability', 'timeliness'],
+            as_of=today, lags=self.lags
+        ).assign(object_type='1', create_time=date_str)
 
 
         base_ms = int(time.time() * 1000)
         result['interface_quality_id'] = (base_ms + np.arange(len(result))).astype(str)
 
-        result.to_csv('data_fabric_interface_quality.csv', index=False, encoding='utf_8_sig')
-        return result
\ No newline at end of file
+        self.artifacts.submit(result, 'data_fabric_interface_quality', 'create_time')
+        return result
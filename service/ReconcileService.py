@@ -0,0 +1,93 @@
+# ReconcileService.py
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import settings
+from dao.interface_repo import InterfaceRepo
+from utils.file_scan import count_lines, find_files
+
+# 核对结果回填的明细表列
+RECONCILE_COLS = ['file_record_count', 'warehousing_record_count', 'record_count_consistency_rate']
+
+
+def consistency_rate(file_count: int, warehouse_count: int) -> str:
+    """两边一致为 100%，否则 较小值 / 较大值（多入库、少入库同样扣分），截断取整"""
+    if file_count == warehouse_count:
+        return '100%'
+    return f"{int(min(file_count, warehouse_count) / max(file_count, warehouse_count) * 100)}%"
+
+
+class ReconcileService:
+    """
+    记录数核对：文件行数（进程池并行、按块数换行）对比入库表当天分区的 COUNT(*)。
+    入库表名由 settings.warehouse_table_template 从接口文件名得出，相同 (表, 分区) 只计一次；
+    计数按批 UNION ALL、在共享连接池上限流并发，见 SqlBackend.count_rows。
+    """
+
+    def __init__(self, repo: InterfaceRepo, workers: int | None = None, root: str | Path | None = None):
+        self.repo = repo
+        self.workers = workers or settings.profile_workers
+        self.root = Path(root or settings.profile_file_root)
+
+    async def _file_counts(self, date_str: str, interfaces: pd.DataFrame) -> dict[str, int]:
+        jobs = []   # (interface_id, path)
+        for r in interfaces.itertuples(index=False):
+            jobs.extend((r.interface_id, p) for p in
+                        find_files(self.root, settings.profile_file_pattern, date_str, r.interface_file_name, r.interface_id))
+        if not jobs:
+            return {}
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            counts = await asyncio.gather(
+                *(loop.run_in_executor(pool, count_lines, str(p), settings.profile_chunk_bytes) for _, p in jobs),
+                return_exceptions=True
+            )
+        out: dict[str, int] = {}
+        for (iid, path), n in zip(jobs, counts):
+            if isinstance(n, Exception):
+                print(f"⚠️ 文件行数统计失败 {path}：{n}")
+                continue
+            out[iid] = out.get(iid, 0) + n
+        return out
+
+    async def _warehouse_counts(self, date_str: str, interfaces: pd.DataFrame) -> dict[str, int]:
+        part_value = datetime.strptime(date_str.replace('-', ''), '%Y%m%d').strftime(settings.reconcile_partition_format)
+        where = {settings.reconcile_partition_col: part_value}
+        tables = {
+            r.interface_id: settings.warehouse_table_template.format(file_name=r.interface_file_name,
+                                                                     interface_id=r.interface_id)
+            for r in interfaces.itertuples(index=False)
+        }
+        unique = sorted(set(tables.values()))
+        counts = await self.repo.count_tables([(t, where) for t in unique])
+        by_table = dict(zip(unique, counts))
+        return {iid: by_table[t] for iid, t in tables.items() if by_table[t] is not None}
+
+    async def reconcile(self, date_str: str, interfaces: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param interfaces: interface_id + interface_file_name
+        :return: 以 interface_id 为索引、RECONCILE_COLS 为列；文件与入库计数都拿到的接口才出现
+        """
+        interfaces = (
+            interfaces.dropna(subset=['interface_id', 'interface_file_name'])
+            .astype({'interface_id': str, 'interface_file_name': str})
+            .drop_duplicates('interface_id')
+        )
+        interfaces = interfaces[interfaces['interface_file_name'] != '']
+        files, warehouse = await asyncio.gather(
+            self._file_counts(date_str, interfaces),
+            self._warehouse_counts(date_str, interfaces)
+        )
+        rows = {
+            iid: {'file_record_count': n, 'warehousing_record_count': warehouse[iid],
+                  'record_count_consistency_rate': consistency_rate(n, warehouse[iid])}
+            for iid, n in files.items() if iid in warehouse
+        }
+        out = pd.DataFrame.from_dict(rows, orient='index', columns=RECONCILE_COLS)
+        out.index.name = 'interface_id'
+        print(f"记录数核对完成：文件 {len(files)} 个接口，入库 {len(warehouse)} 个接口，核对 {len(out)} 个")
+        return out
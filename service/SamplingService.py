@@ -0,0 +1,156 @@
+# SamplingService.py
+import asyncio
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import settings
+from dao.interface_repo import InterfaceRepo
+from service.FileProfileService import PK_FLAGS
+from utils.file_scan import NULL_TOKENS, find_files, merge_samples, reservoir_sample
+
+# 抽样结果回填的明细表列
+SAMPLING_COLS = ['sampling_field_accuracy']
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """比对前统一成去空白字符串，各种空值记为空串"""
+    out = df.astype(object).where(df.notna(), '').astype(str).apply(lambda s: s.str.strip())
+    return out.mask(out.isin(NULL_TOKENS), '')
+
+
+class SamplingService:
+    """
+    抽样字段准确性：每个接口每天从文件中蓄水池抽取固定条数，按主键分批 IN 查询入库表同一分区，
+    逐字段向量化比对；单接口成本只与抽样条数有关，与文件大小无关。
+    随机种子由 (接口, 日期) 决定，同一天重跑抽到同一批记录。
+    """
+
+    def __init__(self, repo: InterfaceRepo, workers: int | None = None, root: str | Path | None = None,
+                 sample_size: int | None = None):
+        self.repo = repo
+        self.workers = workers or settings.profile_workers
+        self.root = Path(root or settings.profile_file_root)
+        self.sample_size = sample_size or settings.sample_size
+
+    @staticmethod
+    def _seed(interface_id: str, date_str: str) -> int:
+        return zlib.crc32(f"{interface_id}|{date_str}".encode('utf-8'))
+
+    def _parse(self, lines: list[str], names: list[str]) -> pd.DataFrame:
+        """
+        按协议字段切列：最多切 len(names) 次，多出的字段落在下标 len(names) 的溢出列，reindex 时直接丢弃，
+        不会并入最后一个协议字段；字段不足的记录缺的列为空值。字段数是否合规由 FileProfileService 统计
+        """
+        parts = pd.Series(lines, dtype=object).str.split(settings.profile_delimiter, n=len(names), expand=True,
+                                                          regex=False)
+        parts = parts.reindex(columns=range(len(names)))
+        parts.columns = names
+        return parts
+
+    async def _lookup(self, table: str, names: list[str], pk: list[str], sample: pd.DataFrame,
+                      where: dict, sem: asyncio.Semaphore) -> pd.DataFrame:
+        """按首个主键列分批 IN 查询；复合主键其余列在比对时对齐"""
+        keys = sample[pk[0]].dropna().unique().tolist()
+        batch = settings.sample_lookup_batch
+        frames = []
+        for i in range(0, len(keys), batch):
+            async with sem:
+                frames.append(await self.repo.backend.select(
+                    table, columns=names, where={**where, pk[0]: keys[i:i + batch]}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=names)
+
+    @staticmethod
+    def accuracy(sample: pd.DataFrame, stored: pd.DataFrame, pk: list[str]) -> float:
+        """
+        抽样记录按主键对齐入库记录，非主键字段逐格比对；入库缺失的记录所有字段计为不一致
+        :return: 一致字段数 / 比对字段数（%）
+        """
+        fields = [c for c in sample.columns if c not in pk]
+        if sample.empty or not fields:
+            return 100.0
+        left = _normalize(sample)
+        right = _normalize(stored[list(sample.columns)]).drop_duplicates(subset=pk, keep='first')
+        merged = left.merge(right, on=pk, how='left', suffixes=('', '__wh'), indicator=True)
+        found = (merged['_merge'] == 'both').to_numpy()
+        a = merged[fields].to_numpy()
+        b = merged[[f"{c}__wh" for c in fields]].to_numpy()
+        same = (a == b) & found[:, None]
+        return float(same.sum()) / same.size * 100
+
+    async def sample(self, date_str: str, interfaces: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param interfaces: interface_id + interface_file_name
+        :return: 以 interface_id 为索引、SAMPLING_COLS 为列；无主键 / 无文件的接口不出现
+        """
+        fields = await self.repo.load_protocol_fields()
+        fields = fields.assign(interface_id=fields['interface_id'].astype(str)).sort_values(
+            ['interface_id', 'field_order'], kind='stable')
+        if 'is_primary_key' not in fields:
+            print("抽样比对：协议字段表未配置主键，跳过")
+            return pd.DataFrame(columns=SAMPLING_COLS, index=pd.Index([], name='interface_id'))
+        specs = {}
+        for iid, g in fields.groupby('interface_id', sort=False):
+            names = g['field_name'].astype(str).tolist()
+            pk = [n for n, f in zip(names, g['is_primary_key']) if str(f).strip().lower() in PK_FLAGS]
+            if pk:
+                specs[iid] = (names, pk)
+
+        interfaces = (
+            interfaces.dropna(subset=['interface_id', 'interface_file_name'])
+            .astype({'interface_id': str, 'interface_file_name': str})
+            .drop_duplicates('interface_id')
+        )
+        jobs = []   # (interface_id, 文件名, path)
+        for r in interfaces.itertuples(index=False):
+            if r.interface_id in specs:
+                jobs.extend((r.interface_id, r.interface_file_name, p) for p in find_files(
+                    self.root, settings.profile_file_pattern, date_str, r.interface_file_name, r.interface_id))
+        if not jobs:
+            print("抽样比对：无可抽样文件")
+            return pd.DataFrame(columns=SAMPLING_COLS, index=pd.Index([], name='interface_id'))
+
+        # 1) 进程池里一次流式扫描完成抽样
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, reservoir_sample, str(p), self.sample_size,
+                                       self._seed(iid, date_str) ^ k, settings.profile_chunk_bytes,
+                                       settings.profile_encoding)
+                  for k, (iid, _, p) in enumerate(jobs)),
+                return_exceptions=True
+            )
+        per_interface: dict[str, list[dict]] = {}
+        file_names: dict[str, str] = {}
+        for (iid, fn, path), res in zip(jobs, results):
+            if isinstance(res, Exception):
+                print(f"⚠️ 抽样失败 {path}：{res}")
+                continue
+            per_interface.setdefault(iid, []).append(res)
+            file_names[iid] = fn
+
+        # 2) 按主键分批回查入库表，接口间限流并发
+        part_value = datetime.strptime(date_str.replace('-', ''), '%Y%m%d').strftime(settings.reconcile_partition_format)
+        where = {settings.reconcile_partition_col: part_value}
+        sem = asyncio.Semaphore(settings.count_concurrency)
+
+        async def check(iid: str) -> tuple[str, float | None]:
+            names, pk = specs[iid]
+            sample = self._parse(merge_samples(per_interface[iid], self.sample_size), names)
+            table = settings.warehouse_table_template.format(file_name=file_names[iid], interface_id=iid)
+            try:
+                stored = await self._lookup(table, names, pk, sample, where, sem)
+            except Exception as e:
+                print(f"⚠️ 入库表回查失败 {table}：{str(e).splitlines()[0]}")
+                return iid, None
+            return iid, self.accuracy(sample, stored, pk)
+
+        checked = await asyncio.gather(*(check(iid) for iid in per_interface))
+        rows = {iid: {'sampling_field_accuracy': f"{int(acc)}%"} for iid, acc in checked if acc is not None}
+        out = pd.DataFrame.from_dict(rows, orient='index', columns=SAMPLING_COLS)
+        out.index.name = 'interface_id'
+        print(f"抽样比对完成：{len(out)} 个接口，每接口抽样 {self.sample_size} 条")
+        return out
@@ -1,37 +1,154 @@
 import time
 import numpy as np
 import pandas as pd
+from datetime import datetime
 
 from dao.scale_repo import ScaleRepo   # 新建 DAO
+from utils.artifacts import ArtifactWriter, artifact_writer
+from utils.hashing import hash_rows, sorted_lookup
+
+# 统计周期 -> 与多久之前的快照比对：1 日 / 2 周 / 3 月
+SCALE_CYCLES = {
+    1: pd.DateOffset(days=1),
+    2: pd.DateOffset(weeks=1),
+    3: pd.DateOffset(months=1),
+}
+# 决定接口定义的属性：存储编号+平台+作业环节、重要等级、业务场景
+FINGERPRINT_COLS = ['storage', 'importance_level', 'business_scene']
+
+
+def _pct(num: pd.Series, den: pd.Series) -> pd.Series:
+    return (num / den.replace(0, np.nan) * 100).fillna(0).round(0).astype(int).astype(str) + '%'
+
 
 class ScaleService:
-    def __init__(self, repo: ScaleRepo):
+    def __init__(self, repo: ScaleRepo, artifacts: ArtifactWriter | None = None):
         self.repo = repo
+        self.artifacts = artifacts or artifact_writer
 
-    async def build_scale(self, date_str: str) -> pd.DataFrame:
-        df = await self.repo.load_quality(date_str)
-        # if df.empty:
-        #     return pd.DataFrame()
-        #
-        # # 仅按 department、statistic_cycle、create_time 分组即可
-        # base = (
-        #     df
-        #     .groupby(['department', 'statistic_cycle', 'create_time'], as_index=False)
-        #     .first()  # 任意取一行占位
-        # )
-
-        result = df.assign(
-            object_type='2',
-            scale_total='0',
-            scale_total_ratio='0%',
-            scale_new='0',
-            scale_new_ratio='0%',
-            scale_changed='0%',
-            scale_changed_ratio='0%'
+    @staticmethod
+    def build_snapshot(meta: pd.DataFrame, reg: pd.DataFrame) -> pd.DataFrame:
+        """
+        接口目录快照：每个接口一行，key 为接口编号指纹，fingerprint 为定义属性指纹
+        """
+        # 存储编号按平台拆开：云平台0123|省经0456,0789 -> (云平台, 0123), (省经, 0456)
+        storage = (
+            meta['interface_storage_id'].astype(str).str.replace(' ', '')
+            .str.extractall(r'(?P<pt>云平台|省经|一经)(?P<sid>[^|,，、]+)')
+            .reset_index(level='match', drop=True)
+        )
+        storage['sid'] = storage['sid'].str.zfill(4)
+        storage['interface_id'] = meta['interface_id'].astype(str).reindex(storage.index).to_numpy()
+
+        # 每个 (平台, 存储编号) 的作业环节去重排序
+        stages = (
+            reg.assign(sid=reg['interface_id'].astype(str).str.zfill(4),
+                       stage=reg['job_stage'].astype(str).str.split(','))
+            .explode('stage')
+            .assign(stage=lambda x: x['stage'].str.strip())
+            .query("stage != ''")
+            .drop_duplicates(['pt', 'sid', 'stage'])
+            .sort_values('stage')
+            .groupby(['pt', 'sid'])['stage'].agg(','.join)
+            .rename('stages')
+            .reset_index()
+        )
+        tokens = storage.merge(stages, on=['pt', 'sid'], how='left').fillna({'stages': ''})
+        tokens = (
+            (tokens['pt'] + tokens['sid'] + ':' + tokens['stages'])
+            .groupby(tokens['interface_id']).agg(lambda s: ';'.join(sorted(s)))
+            .rename('storage')
+        )
+
+        snap = (
+            meta.assign(interface_id=meta['interface_id'].astype(str),
+                        department=meta['responsibility_department'].fillna('-'))
+            .drop_duplicates('interface_id')
+            .merge(tokens, left_on='interface_id', right_index=True, how='left')
+        )
+        return pd.DataFrame({
+            'department': snap['department'].to_numpy(),
+            'interface_id': snap['interface_id'].to_numpy(),
+            'key': hash_rows(snap, ['interface_id']),
+            'fingerprint': hash_rows(snap, FINGERPRINT_COLS),
+        })
+
+    @staticmethod
+    def diff_snapshots(today: pd.DataFrame, prev: pd.DataFrame | None) -> pd.DataFrame:
+        """
+        按部门统计：总数、新增、变更、上期总数。
+        有序数组二分查找当天 key 是否在上期出现，出现且指纹不同即为变更。
+        """
+        if prev is None:
+            flags = today.assign(is_new=False, is_changed=False)
+            prev_total = pd.Series(dtype=int)
+        else:
+            found, pos = sorted_lookup(prev['key'].to_numpy(), today['key'].to_numpy())
+            changed = found & (prev['fingerprint'].to_numpy()[pos] != today['fingerprint'].to_numpy())
+            flags = today.assign(is_new=~found, is_changed=changed)
+            prev_total = prev.groupby('department').size()
+        stat = flags.groupby('department').agg(
+            scale_total=('key', 'size'),
+            scale_new=('is_new', 'sum'),
+            scale_changed=('is_changed', 'sum'),
         )
+        stat['prev_total'] = prev_total.reindex(stat.index).fillna(0).astype(int)
+        return stat.reset_index()
+
+    async def _snapshot(self, date_str: str) -> pd.DataFrame | None:
+        """
+        当天的接口目录快照。接口目录只有当前版本，只能代表最新一天：
+        - 晚于已有最新快照（正向运行）：由当前目录生成并保存
+        - 不晚于最新快照（重跑 / 回刷历史日期）：只读已存的当天快照，不用当前目录覆盖；没有时返回 None
+        """
+        latest = self.repo.latest_snapshot_date()
+        if latest is not None and date_str <= latest:
+            snap = self.repo.load_snapshot(date_str)
+            if snap is None:
+                print(f"⚠️ {date_str} 不晚于最新快照 {latest} 且没有当天快照，当前接口目录不能代表该日，跳过规模统计")
+            else:
+                print(f"使用已保存的 {date_str} 接口目录快照（{len(snap)}个接口），不覆盖")
+            return snap
+
+        meta = await self.repo.load_meta_data_interface()
+        reg = await self.repo.load_register()
+        if meta.empty:
+            return None
+        snap = self.build_snapshot(meta, reg)
+        self.repo.save_snapshot(date_str, snap)
+        print(f"接口目录快照共{len(snap)}个接口")
+        return snap
+
+    async def build_scale(self, date_str: str) -> pd.DataFrame:
+        snap = await self._snapshot(date_str)
+        if snap is None:
+            return pd.DataFrame()
+
+        today = datetime.strptime(date_str, '%Y%m%d')
+        dfs = []
+        for cycle, offset in SCALE_CYCLES.items():
+            prev_date = self.repo.latest_snapshot_date((today - offset).strftime('%Y%m%d'))
+            prev = self.repo.load_snapshot(prev_date) if prev_date else None
+            print(f"统计周期{cycle}：对比快照 {prev_date or '无（新增/变更记 0）'}")
+            stat = self.diff_snapshots(snap, prev)
+            dfs.append(stat.assign(statistic_cycle=cycle))
+        stat = pd.concat(dfs, ignore_index=True)
+
+        result = pd.DataFrame({
+            'department': stat['department'],
+            'create_time': date_str,
+            'statistic_cycle': stat['statistic_cycle'],
+            'object_type': '2',
+            'scale_total': stat['scale_total'].astype(str),
+            'scale_total_ratio': _pct(stat['scale_total'] - stat['prev_total'], stat['prev_total']),
+            'scale_new': stat['scale_new'].astype(str),
+            'scale_new_ratio': _pct(stat['scale_new'], stat['scale_total']),
+            'scale_changed': stat['scale_changed'].astype(str),
+            'scale_changed_ratio': _pct(stat['scale_changed'], stat['scale_total']),
+        })
 
         base_ms = int(time.time() * 1000)
         result['interface_scale_id'] = (base_ms + np.arange(len(result))).astype(str)
 
-        result.to_csv('data_fabric_interface_scale.csv', index=False, encoding='utf_8_sig')
-        return result
\ No newline at end of file
+        self.artifacts.submit(result, 'data_fabric_interface_scale', 'create_time')
+        return result
@@ -0,0 +1,89 @@
+# tests/conftest.py
+"""
+合成数据：源接口资源表 / 作业注册 / 失败 / 延迟四张源表，以及多天的接口明细表，
+供各计算引擎、计算后端的一致性检查使用。本地状态与中间结果全部落在临时目录。
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import data_fabric_interface_detail_cols, data_fabric_interface_detail_schema, settings  # noqa: E402
+from utils.artifacts import artifact_writer  # noqa: E402
+
+PLATFORMS = {'云平台': 'YPT', '省经': 'SJ', '一经': 'YJ'}
+STAGES = ['10', '20', '40', '50', '52', '60', '80']
+RATES = ['0%', '100%', '85.5%', '-', None, '33%', '66.7%', '12.25%']
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """本地状态目录、中间结果目录指向临时目录，且不落中间结果"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, 'state_dir', str(tmp_path / 'state'))
+    monkeypatch.setattr(settings, 'artifact_dir', str(tmp_path / 'artifacts'))
+    monkeypatch.setattr(settings, 'artifact_enabled', False)
+    monkeypatch.setattr(artifact_writer, 'enabled', False)
+    return tmp_path
+
+
+@pytest.fixture
+def source_tables() -> dict[str, pd.DataFrame]:
+    """明细阶段的四张源表，data_date 为 2025-06-27"""
+    rnd = random.Random(0)
+    meta, reg, err, dly = [], [], [], []
+    for i in range(300):
+        sids = [(pt, f"{rnd.randint(1, 9999):04d}") for pt in rnd.sample(list(PLATFORMS), rnd.randint(1, 2))]
+        meta.append(dict(
+            interface_id=f"{100000 + i}", responsibility_department=rnd.choice(['网络部', '市场部', '-']),
+            interface_name=f"接口{i}", model_name_en=f"tb_{i}",
+            interface_storage_id='|'.join(f"{pt}{sid}" for pt, sid in sids),
+            interface_type=rnd.choice(['日', '月']), importance_level=rnd.choice(['P0', 'P1', 'P2', 'P3', 'P4', 'P5']),
+            interface_data_scheduled_arrival_time='08:00',
+            business_scene=rnd.choice(['一经相关', '大音相关、掌经相关', '掌经相关', '一经相关,大音相关', None])))
+        for pt, sid in sids:
+            stages = ','.join(rnd.sample(STAGES, rnd.randint(1, 4)))
+            reg.append(dict(job_id=PLATFORMS[pt] + sid + '10', interface_id=int(sid), pt=pt, job_stage=stages))
+            for stage in stages.split(','):
+                job_id = PLATFORMS[pt][:2 if pt in ('省经', '一经') else 3] + sid + stage
+                if rnd.random() < .2:
+                    err.append(dict(job_id=job_id, data_date='2025-06-27'))
+                if rnd.random() < .3:
+                    dly.append(dict(job_id=job_id, data_date='2025-06-27'))
+    return {'data_fabric_meta_data_interface': pd.DataFrame(meta),
+            'data_interface_task_register': pd.DataFrame(reg),
+            'data_interface_task_error': pd.DataFrame(err),
+            'data_interface_task_delay': pd.DataFrame(dly)}
+
+
+@pytest.fixture
+def detail_history() -> pd.DataFrame:
+    """
+    截至 2025-06-27 的 50 天接口明细（覆盖日 / 近 4 周 / 上月窗口），百分比列混有小数、'-'、空值，
+    业务名混用三种分隔符与空值，录入日期与数据日期相差 0 ~ 1 天
+    """
+    rnd = random.Random(1)
+    metrics = [c for c in data_fabric_interface_detail_cols if c.endswith(('_rate', '_accuracy'))]
+    end = datetime(2025, 6, 27)
+    # 其它列取表结构允许的占位值
+    blank = {c: 0 if data_fabric_interface_detail_schema.get(c) == 'int64' else '-'
+             for c in data_fabric_interface_detail_cols}
+    rows = []
+    for day in range(50):
+        d = end - timedelta(days=day)
+        for i in range(100):
+            row = dict(blank)
+            row.update(
+                interface_detail_id=f"{day}-{i}", interface_id=f"{100000 + i}", interface_id_op=f"{i:04d}",
+                pt=rnd.choice(list(PLATFORMS)), data_date=d.strftime('%Y-%m-%d'),
+                create_time=(d + timedelta(days=rnd.randint(0, 1))).strftime('%Y%m%d'),
+                department=rnd.choice(['-', '市场部', None, '网络部']), level=rnd.choice(['P0', 'P1', None, 'P3']),
+                biz_name=rnd.choice(['掌经', None, '大音、掌经', '一经', '一经,大音', '大音，一经', '掌经,', '']),
+                **{c: rnd.choice(RATES) for c in metrics})
+            rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,67 @@
+# tests/test_compare.py
+"""多期对比：multi_lag_ratios 一次 reindex 的结果与逐期取历史、按维度 merge 再算 pct_ratio 的旧做法一致"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.common import pct_ratio
+from utils.compare import LAGS, RATIO_SUFFIX, lag_dates, multi_lag_ratios
+
+KEYS = ['department', 'statistic_cycle']
+VALUES = ['stability', 'timeliness']
+
+
+def _history(as_of: datetime) -> pd.DataFrame:
+    """400 天 × 部门 × 周期，随机缺 20% 的 (维度, 日期)"""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(end=as_of, periods=400, freq='D')
+    grid = pd.MultiIndex.from_product([['网络部', '市场部', '-', '财务部'], [1, 2, 3], dates],
+                                      names=[*KEYS, 'date']).to_frame(index=False)
+    grid = grid[rng.random(len(grid)) > 0.2].reset_index(drop=True)
+    for col in VALUES:
+        grid[col] = rng.choice([0.0, 12.5, 50.0, 85.5, 100.0, np.nan], len(grid))
+    return grid
+
+
+def _per_lag(current: pd.DataFrame, history: pd.DataFrame, as_of: datetime, lags: list[str]) -> pd.DataFrame:
+    """旧做法：每个对比期单独取当天历史，按维度左连接后算环比"""
+    out = current.copy()
+    for lag, day in lag_dates(as_of, lags).items():
+        prev = history[history['date'] == day][KEYS + VALUES]
+        merged = current[KEYS].merge(prev, on=KEYS, how='left', suffixes=('', '_prev'))
+        for col in VALUES:
+            out[f"{col}_{RATIO_SUFFIX[lag]}"] = pct_ratio(current[col].reset_index(drop=True),
+                                                          merged[col]).set_axis(out.index)
+    return out
+
+
+@pytest.mark.parametrize('as_of', [datetime(2025, 6, 27), datetime(2024, 3, 31), datetime(2024, 2, 29)])
+def test_multi_lag_matches_per_lag_reindex(as_of):
+    history = _history(as_of)
+    current = history[history['date'] == as_of][KEYS + VALUES].copy()
+    current[VALUES] = current[VALUES].fillna(0).astype(int).astype(str) + '%'
+    # 历史里完全没有的维度：各期环比为 0%
+    current = pd.concat([current, pd.DataFrame({'department': ['新部门'], 'statistic_cycle': [1],
+                                                'stability': ['90%'], 'timeliness': ['80%']})],
+                        ignore_index=True)
+    current.index = current.index + 100     # 非默认索引同样按行对齐
+
+    lags = list(LAGS)
+    expected = _per_lag(current, history, as_of, lags)
+    actual = multi_lag_ratios(current, history, KEYS, VALUES, as_of, lags)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert list(actual.columns[len(KEYS) + len(VALUES):]) == [
+        f"{col}_{RATIO_SUFFIX[lag]}" for lag in lags for col in VALUES]
+
+
+def test_calendar_lags_and_day_only():
+    assert {k: v.strftime('%Y%m%d') for k, v in lag_dates(datetime(2024, 3, 31), list(LAGS)).items()} == {
+        'day': '20240330', 'week': '20240324', 'month': '20240229', 'year': '20230331'}
+    history = _history(datetime(2025, 6, 27))
+    current = pd.DataFrame({'department': ['网络部'], 'statistic_cycle': [1], 'stability': ['50%'],
+                            'timeliness': ['50%']})
+    out = multi_lag_ratios(current, history, KEYS, VALUES, datetime(2025, 6, 27), ['day'])
+    assert list(out.columns) == [*KEYS, *VALUES, 'stability_ratio', 'timeliness_ratio']
+    assert multi_lag_ratios(current, history, KEYS, VALUES, datetime(2025, 6, 27), []).equals(current)
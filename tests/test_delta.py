@@ -0,0 +1,88 @@
+# tests/test_delta.py
+"""增量发布：未变化的行沿用上次主键，变化行重写，消失的行撤回；业务级别表重跑时主键不变"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+import main
+from config.settings import settings
+from dao import backends
+from dao.backends import MemoryBackend, SqlBackend
+from dao.business_repo import BusinessLevelRepo
+from dao.delta import RowDelta
+
+TABLE = 'data_fabric_interface_business_level'
+ID = 'interface_business_level_id'
+
+
+def _rows(ids: list[str], values: list[str]) -> pd.DataFrame:
+    return pd.DataFrame({ID: ids, 'create_time': '20250627', 'department': 'd', 'stability': values})
+
+
+def test_row_delta_carries_ids_and_retracts_vanished_rows():
+    first = RowDelta(None, ID)
+    assert len(first.split(_rows(['1', '2', '3', '4'], ['a', 'b', 'b', 'c']))) == 4
+    published = first.index()
+
+    delta = RowDelta(published, ID)
+    # 分两段到达：'b' 重复一次（只与一条旧行对应），'c' 变为 'x'，'a' 不变
+    part1 = _rows(['11', '12'], ['b', 'a'])
+    changed1 = delta.split(part1)
+    part2 = _rows(['13', '14'], ['x', 'b'])
+    changed2 = delta.split(part2)
+
+    assert changed1.empty
+    assert part1[ID].tolist() == ['2', '1']
+    assert changed2[ID].tolist() == ['13']
+    assert part2[ID].tolist() == ['13', '3']
+    assert delta.carried == 3
+    assert delta.retracted() == ['4']
+    assert sorted(delta.index()['id']) == ['1', '13', '2', '3']
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_delta_publish_keeps_ids_of_unchanged_rows(tmp_path, monkeypatch, kind):
+    monkeypatch.setattr(settings, 'delta_publish', True)
+
+    async def run():
+        backend = MemoryBackend() if kind == 'memory' else SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'd.sqlite3'}")
+        repo = BusinessLevelRepo(backend)
+        await repo.write_data(_rows(['1', '2', '3'], ['a', 'b', 'c']))
+        # 重跑：主键全部重新生成，'b' 变为 'y'，'c' 消失，新增 'z'
+        rerun = _rows(['11', '12', '14'], ['a', 'y', 'z'])
+        await repo.write_data(rerun)
+        out = await backend.select(TABLE)
+        await backend.dispose()
+        return rerun, out.sort_values(ID).reset_index(drop=True)
+
+    rerun, out = asyncio.run(run())
+    assert rerun[ID].tolist() == ['1', '12', '14']
+    assert out[[ID, 'stability']].values.tolist() == [['1', 'a'], ['12', 'y'], ['14', 'z']]
+
+
+@pytest.mark.parametrize('delta', [False, True])
+def test_business_rerun_rewrites_partition(monkeypatch, source_tables, detail_history, delta):
+    monkeypatch.setattr(settings, 'backend', 'memory')
+    monkeypatch.setattr(settings, 'delta_publish', delta)
+    backend = MemoryBackend({**source_tables, 'data_fabric_interface_detail': detail_history})
+    monkeypatch.setattr(backends, '_MEMORY', backend)
+
+    async def run():
+        await main.run_metric('20250627', dispose=False)
+        first = (await main.run_business_level('20250627', dispose=False)).copy()
+        published = backend.tables[TABLE].copy()
+        await asyncio.sleep(0.01)     # 主键按毫秒时间戳生成，确保重跑生成的主键不同
+        second = await main.run_business_level('20250627', dispose=False)
+        return first, published, second, backend.tables[TABLE]
+
+    first, published, second, rerun = asyncio.run(run())
+    assert len(published) == len(first) > 0
+    # 重跑替换当天分区，不追加
+    assert len(rerun) == len(first)
+    if delta:
+        # 结果不变：全部沿用上次主键，库中行与首次发布完全相同
+        assert second[ID].tolist() == first[ID].tolist()
+        pd.testing.assert_frame_equal(rerun, published)
+    else:
+        assert set(rerun[ID]) == set(second[ID]) != set(first[ID])
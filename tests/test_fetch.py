@@ -0,0 +1,75 @@
+# tests/test_fetch.py
+"""列式取数：Arrow 与 NumPy 回退两条路径结果一致，分批解码与整批一致，与 pandas 直接读库一致"""
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from config.settings import settings
+from dao import fetch
+from dao.backends import SqlBackend
+from dao.fetch import frame_from_batches
+
+KEYS = ['interface_id', 'rows', 'rate', 'ok', 'loaded_at', 'note']
+SCHEMA = {'interface_id': 'string', 'rows': 'int64', 'rate': 'float64', 'ok': 'bool', 'loaded_at': 'timestamp'}
+ROWS = [
+    ('0001', 10, 85.5, True, datetime(2025, 6, 27, 8), 'a'),
+    (2, None, None, None, None, None),          # 数字存成 int 的字符串列、整批 NULL 的未声明列
+    ('0003', 30, 100, False, datetime(2025, 6, 27, 9, 30), 1.5),
+    ('0004', 40, 0.0, True, datetime(2025, 6, 28), 2),
+]
+
+
+def _batches(size: int) -> list[list[tuple]]:
+    return [ROWS[i:i + size] for i in range(0, len(ROWS), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 4])
+def test_arrow_and_numpy_paths_agree(monkeypatch, size):
+    declared = KEYS[:-1]
+    arrow = frame_from_batches(KEYS, _batches(size), SCHEMA)
+    monkeypatch.setattr(fetch, 'pa', None)
+    numpy = frame_from_batches(KEYS, _batches(size), SCHEMA)
+
+    assert arrow['interface_id'].tolist() == ['0001', '2', '0003', '0004']
+    assert arrow['rows'].dtype == numpy['rows'].dtype == 'float64'
+    # 声明类型的列两条路径完全一致（时间精度统一到 us）
+    for col in declared:
+        a, n = arrow[col], numpy[col]
+        if col == 'loaded_at':
+            a, n = a.astype('datetime64[us]'), n.astype('datetime64[us]')
+        if col == 'interface_id':
+            n = n.astype(str)
+        pd.testing.assert_series_equal(a, n, check_dtype=col not in ('ok', 'interface_id'), obj=col)
+    # 未声明列：各批推断不同时 Arrow 统一成一种类型
+    assert arrow['note'].tolist() == ['a', None, '1.5', '2']
+
+
+def test_batched_decode_equals_single_batch_and_empty_result():
+    pd.testing.assert_frame_equal(frame_from_batches(KEYS, _batches(1), SCHEMA),
+                                  frame_from_batches(KEYS, _batches(4), SCHEMA))
+    empty = frame_from_batches(KEYS, [], SCHEMA)
+    assert list(empty.columns) == KEYS and empty.empty
+    arrow = frame_from_batches(KEYS, _batches(2), SCHEMA, dtype_backend='pyarrow')
+    assert all(isinstance(t, pd.ArrowDtype) for t in arrow.dtypes)
+
+
+def test_streamed_select_matches_pandas(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'fetch_batch_size', 3)
+    df = pd.DataFrame({'interface_id': [f"{i:04d}" for i in range(10)], 'n': range(10),
+                       'rate': [i / 3 for i in range(10)], 'pt': ['云平台', None] * 5})
+
+    async def run():
+        backend = SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'f.sqlite3'}")
+        await backend.insert('t', df)
+        streamed = await backend.select('t')
+        async with backend.engine.connect() as conn:
+            direct = await conn.run_sync(lambda c: pd.read_sql(text("SELECT * FROM t"), c))
+        await backend.dispose()
+        return streamed, direct
+
+    streamed, direct = asyncio.run(run())
+    pd.testing.assert_frame_equal(streamed, direct)
+    pd.testing.assert_frame_equal(streamed, df)
@@ -0,0 +1,61 @@
+# tests/test_intervals.py
+"""运行区间合并：重叠、重试、相接、嵌套的区间按组合并，与逐组循环的结果一致"""
+import numpy as np
+import pandas as pd
+
+from utils.intervals import merge_intervals, to_seconds
+
+
+def _naive(groups, start, end) -> pd.DataFrame:
+    rows = []
+    for g in sorted(set(groups)):
+        spans = sorted((s, e) for gg, s, e in zip(groups, start, end)
+                       if gg == g and not np.isnan(s) and not np.isnan(e) and e >= s)
+        if not spans:
+            continue
+        busy, (cur_s, cur_e) = 0.0, spans[0]
+        for s, e in spans[1:]:
+            if s > cur_e:
+                busy += cur_e - cur_s
+                cur_s, cur_e = s, e
+            else:
+                cur_e = max(cur_e, e)
+        busy += cur_e - cur_s
+        rows.append({'group': g, 'runs': len(spans), 'busy': busy,
+                     'first_start': spans[0][0], 'last_end': max(e for _, e in spans)})
+    return pd.DataFrame(rows)
+
+
+def test_overlapping_and_retried_runs():
+    groups = [0, 0, 0, 0, 1, 1, 1, 2, 3]
+    start = [0, 10, 5, 40, 100, 100, 130, 7, np.nan]
+    end = [20, 30, 8, 50, 120, 110, 130, 3, 9]
+    out = merge_intervals(np.array(groups), np.array(start, dtype=float), np.array(end, dtype=float))
+    # 组 0：[0,30] 内含嵌套 [5,8] 与重叠 [10,30]，另有 [40,50]；组 1：重试 [100,110] 包含在首次运行内，
+    # [130,130] 零时长；组 2 结束早于开始、组 3 缺开始时间，均丢弃
+    assert out.to_dict('list') == {'group': [0, 1], 'runs': [4, 3], 'busy': [40.0, 20.0],
+                                   'first_start': [0.0, 100.0], 'last_end': [50.0, 130.0]}
+
+
+def test_touching_runs_merge_into_one_segment():
+    out = merge_intervals(np.array([5, 5]), np.array([0.0, 10.0]), np.array([10.0, 15.0]))
+    assert out[['runs', 'busy']].values.tolist() == [[2, 15.0]]
+
+
+def test_matches_per_group_loop():
+    rng = np.random.default_rng(0)
+    n = 3000
+    groups = rng.integers(0, 200, n)
+    start = rng.integers(0, 10000, n).astype(float)
+    end = start + rng.integers(-5, 400, n)
+    start[rng.random(n) < 0.02] = np.nan
+    out = merge_intervals(groups, start, end)
+    pd.testing.assert_frame_equal(out, _naive(groups, start, end), check_dtype=False)
+
+
+def test_empty_and_seconds():
+    out = merge_intervals(np.array([1]), np.array([np.nan]), np.array([1.0]))
+    assert out.empty and list(out.columns) == ['group', 'runs', 'busy', 'first_start', 'last_end']
+    secs = to_seconds(pd.Series(['2025-06-27 00:00:10', None, 'x']))
+    assert secs[0] == pd.Timestamp('2025-06-27 00:00:10').timestamp()
+    assert np.isnan(secs[1:]).all()
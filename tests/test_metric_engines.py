@@ -0,0 +1,36 @@
+# tests/test_metric_engines.py
+"""趋势表 pandas / sql（库内聚合，dao.pushdown）两种计算引擎在 SQLite 上的输出一致性"""
+import asyncio
+
+import pandas as pd
+
+from config.settings import settings
+from dao.backends import SqlBackend
+from dao.metric_repo import MetricRepo
+from service.MetricTrendService import MetricTrendService
+from utils.artifacts import ArtifactWriter
+
+
+def _build_metric(tmp_path, detail: pd.DataFrame, engine: str) -> pd.DataFrame:
+    async def run():
+        backend = SqlBackend(f"sqlite+aiosqlite:///{tmp_path / f'{engine}.sqlite3'}")
+        try:
+            await backend.insert('data_fabric_interface_detail', detail)
+            repo = MetricRepo(backend)
+            assert repo.pushdown
+            return await MetricTrendService(repo, ArtifactWriter(enabled=False)).build_metric('20250627')
+        finally:
+            await backend.dispose()
+
+    settings.metric_engine = engine
+    out = asyncio.run(run()).drop(columns=['metric_trend_id'])
+    return out.sort_values(list(out.columns), kind='stable').reset_index(drop=True)
+
+
+def test_sql_engine_matches_pandas(tmp_path, monkeypatch, detail_history):
+    monkeypatch.setattr(settings, 'metric_engine', 'pandas')
+    expected = _build_metric(tmp_path, detail_history, 'pandas')
+    actual = _build_metric(tmp_path, detail_history, 'sql')
+
+    assert set(expected['statistic_cycle']) == {1, 2, 3}
+    pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,82 @@
+# tests/test_publish.py
+"""分区幂等发布：重跑整体替换当天分区、其它分区不动，空结果保持旧分区；SQLite 与内存后端行为一致"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+from dao.backends import MemoryBackend, SqlBackend
+from dao.publish import FramePublication, _BasePublication, partition_of
+
+TABLE = 'data_fabric_interface_quality'
+
+
+def _day(create_time: str, values: list[int]) -> pd.DataFrame:
+    return pd.DataFrame({'create_time': create_time, 'value': values})
+
+
+async def _rows(backend) -> pd.DataFrame:
+    df = await backend.select(TABLE)
+    df['value'] = df['value'].astype(int)
+    return df.sort_values(['create_time', 'value']).reset_index(drop=True)
+
+
+async def _rerun(backend, mode: str) -> list[pd.DataFrame]:
+    snapshots = []
+    for df in (_day('20250626', [1, 2]), _day('20250627', [3, 4, 5])):
+        await backend.publish(TABLE, df, partition_of(df, ['create_time']), mode)
+    snapshots.append(await _rows(backend))
+    # 重跑 0627：行数变少，整体替换
+    rerun = _day('20250627', [6])
+    assert await backend.publish(TABLE, rerun, partition_of(rerun, ['create_time']), mode) == 1
+    snapshots.append(await _rows(backend))
+    # 同一结果再重跑一次：不重复
+    await backend.publish(TABLE, rerun, partition_of(rerun, ['create_time']), mode)
+    snapshots.append(await _rows(backend))
+    # 空结果：publish 与显式发布对象都保持旧分区
+    empty = _day('20250627', [])
+    assert await backend.publish(TABLE, empty, partition_of(empty, ['create_time']), mode) == 0
+    async with backend.publication(TABLE, {'create_time': '20250627'}, mode) as pub:
+        await pub.add(empty)
+    snapshots.append(await _rows(backend))
+    return snapshots
+
+
+@pytest.mark.parametrize('mode', ['replace', 'exchange'])
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_rerun_replaces_partition_and_empty_keeps_it(tmp_path, kind, mode):
+    async def run():
+        backend = MemoryBackend() if kind == 'memory' else SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'p.sqlite3'}")
+        try:
+            return await _rerun(backend, mode)
+        finally:
+            await backend.dispose()
+
+    first, rerun, again, empty = asyncio.run(run())
+    pd.testing.assert_frame_equal(first, pd.concat([_day('20250626', [1, 2]), _day('20250627', [3, 4, 5])],
+                                                   ignore_index=True))
+    expected = pd.concat([_day('20250626', [1, 2]), _day('20250627', [6])], ignore_index=True)
+    for out in (rerun, again, empty):
+        pd.testing.assert_frame_equal(out, expected)
+
+
+def test_failed_publication_keeps_partition():
+    async def run():
+        backend = MemoryBackend({TABLE: _day('20250627', [1])})
+        with pytest.raises(RuntimeError):
+            async with backend.publication(TABLE, {'create_time': '20250627'}) as pub:
+                await pub.add(_day('20250627', [2]))
+                raise RuntimeError('计算中途失败')
+        return await _rows(backend)
+
+    pd.testing.assert_frame_equal(asyncio.run(run()), _day('20250627', [1]))
+
+
+def test_incomplete_publication_fails_on_construction():
+    class NoCommit(_BasePublication):
+        async def add(self, df):
+            pass
+
+    with pytest.raises(TypeError):
+        NoCommit(TABLE, {'create_time': '20250627'}, 'replace')
+    assert isinstance(FramePublication(MemoryBackend(), TABLE, {'create_time': '20250627'}), _BasePublication)
@@ -0,0 +1,56 @@
+# tests/test_quality_cache.py
+"""质量表对比期聚合缓存：源分区不变时复用，重新发布后失效"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+from dao.backends import MemoryBackend, SqlBackend
+from dao.frame_store import FrameStore
+from dao.quality_repo import QualityRepo
+from service.QualityService import QualityService
+from utils.artifacts import ArtifactWriter
+
+TABLE = 'data_fabric_interface_business_level_tmp'
+
+
+def _level(create_time: str, stability: list[str]) -> pd.DataFrame:
+    return pd.DataFrame({
+        'department': ['网络部', '网络部', '市场部'], 'statistic_cycle': [1, 1, 1], 'create_time': create_time,
+        'stability': stability, 'timeliness': ['50%', '70%', '80%'],
+    })
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_republished_partition_invalidates_cached_aggregate(tmp_path, kind):
+    store = FrameStore('quality_daily_agg', tmp_path / 'state')
+
+    async def run():
+        backend = MemoryBackend() if kind == 'memory' else SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'q.sqlite3'}")
+        for df in (_level('20250626', ['30%', '40%', '50%']), _level('20250627', ['60%', '80%', '100%'])):
+            await backend.publish(TABLE, df, {'create_time': df['create_time'].iloc[0]})
+        repo = QualityRepo(backend, store)
+        reads = []
+        load = repo.load_business_level_days
+
+        async def counting(dates):
+            reads.append(sorted(dates))
+            return await load(dates)
+
+        repo.load_business_level_days = counting
+        svc = QualityService(repo, ArtifactWriter(enabled=False), lags=['day'])
+        first = await svc.build_quality('20250627')
+        cached = await svc.build_quality('20250627')
+        # 重新发布 0626：网络部稳定性均值 35% -> 14%（pct_ratio 为取整后的倍数）
+        await backend.publish(TABLE, _level('20250626', ['10%', '18%', '50%']), {'create_time': '20250626'})
+        after = await svc.build_quality('20250627')
+        await backend.dispose()
+        return first, cached, after, reads
+
+    first, cached, after, reads = asyncio.run(run())
+    ratio = lambda df: df.set_index('department')['stability_ratio'].to_dict()
+    assert ratio(first) == {'网络部': '1%', '市场部': '1%'}
+    assert ratio(cached) == ratio(first)
+    assert ratio(after) == {'网络部': '4%', '市场部': '1%'}
+    # 首次查两天；源分区未变时只查当天；重新发布后 0626 重新查库
+    assert reads == [['20250626', '20250627'], ['20250627'], ['20250626', '20250627']]
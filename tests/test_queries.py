@@ -0,0 +1,66 @@
+# tests/test_queries.py
+"""声明式查询：参数校验、绑定参数（不拼接取值）、语句按形状复用、各后端结果一致"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+from dao import queries
+from dao.backends import MemoryBackend, SqlBackend, _ident
+from dao.queries import Query
+
+RUNS = pd.DataFrame({'job_id': ['j1', 'j2', 'j3', "x' OR '1'='1"],
+                     'data_date': ['2025-06-26', '2025-06-27', '2025-06-27', '2025-06-27'],
+                     'start_time': ['08:00'] * 4, 'end_time': ['09:00'] * 4})
+
+
+def test_where_checks_parameters():
+    assert queries.TASK_RUNS.where({'data_date': '2025-06-27'}) == {'data_date': '2025-06-27'}
+    with pytest.raises(TypeError):
+        queries.TASK_RUNS.where({})
+    with pytest.raises(TypeError):
+        queries.TASK_RUNS.where({'data_date': '2025-06-27', 'job_id': 'j1'})
+    moved = queries.TASK_RUNS.on('data_interface_task_run_his')
+    assert moved.table == 'data_interface_task_run_his' and moved.params == queries.TASK_RUNS.params
+    assert queries.TASK_RUNS.table == 'data_interface_task_run'
+
+
+def test_statement_reused_across_values_and_values_bound():
+    day1, p1 = SqlBackend.build_select('t', ('a', 'b'), {'d': '20250626'})
+    day2, p2 = SqlBackend.build_select('t', ('a', 'b'), {'d': '20250627'})
+    assert day1 is day2 and (p1, p2) == ({'p0': '20250626'}, {'p0': '20250627'})
+    assert '20250626' not in str(day1)
+    many, params = SqlBackend.build_select('t', None, {'d': ['20250626', '20250627']}, distinct=True)
+    assert many is not day1 and params == {'p0': ['20250626', '20250627']}
+    assert str(many).startswith('SELECT DISTINCT * FROM t WHERE d IN')
+    for bad in ('t; DROP TABLE t', 'a b', '1t'):
+        with pytest.raises(ValueError):
+            _ident(bad)
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_backends_answer_declared_queries_alike(tmp_path, kind):
+    query = Query('data_interface_task_run', columns=('job_id',), params=('data_date', 'job_id'))
+
+    async def run():
+        backend = MemoryBackend() if kind == 'memory' else SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'q.sqlite3'}")
+        await backend.insert('data_interface_task_run', RUNS)
+        out = {
+            'day': await backend.query(queries.TASK_RUNS, data_date='2025-06-27'),
+            'in': await backend.query(query, data_date=['2025-06-26', '2025-06-27'], job_id=['j1', 'j3']),
+            # 取值只作为绑定参数，带引号的值按字面匹配
+            'quoted': await backend.query(query, data_date='2025-06-27', job_id="x' OR '1'='1"),
+            'none': await backend.query(query, data_date='2025-06-27', job_id="' OR '1'='1"),
+            'distinct': await backend.query(queries.TASK_ERROR_JOBS.on('data_interface_task_run'),
+                                            data_date='2025-06-27'),
+        }
+        await backend.dispose()
+        return out
+
+    out = asyncio.run(run())
+    assert list(out['day'].columns) == ['job_id', 'start_time', 'end_time']
+    assert out['day']['job_id'].tolist() == ['j2', 'j3', "x' OR '1'='1"]
+    assert out['in']['job_id'].tolist() == ['j1', 'j3']
+    assert out['quoted']['job_id'].tolist() == ["x' OR '1'='1"]
+    assert out['none'].empty
+    assert sorted(out['distinct']['job_id']) == sorted(['j2', 'j3', "x' OR '1'='1"])
@@ -0,0 +1,78 @@
+# tests/test_query_cache.py
+"""查询结果缓存：命中、写表后失效（含其它进程）、TTL、LRU、磁盘层"""
+import asyncio
+import time
+
+import pandas as pd
+
+from dao import queries
+from dao.backends import SqlBackend
+from dao.query_cache import QueryCache, normalize_sql, tables_of
+
+SQL = "SELECT * FROM data_fabric_metric_trend WHERE create_time = :d"
+
+
+def _frame(*values: int) -> pd.DataFrame:
+    return pd.DataFrame({'create_time': '20250627', 'value': list(values)})
+
+
+def test_sql_normalization_and_tables():
+    assert normalize_sql("  SELECT *\n  FROM  t ;  ") == "SELECT * FROM t"
+    assert tables_of("select a from `T1` join t2 on 1 = 1 where x in (select y from t3)") == {'t1', 't2', 't3'}
+    assert QueryCache.key("SELECT 1 ", {'a': 1}) == QueryCache.key("SELECT  1", {'a': 1}) \
+        != QueryCache.key("SELECT 1", {'a': 2})
+
+
+def test_hit_copy_and_write_invalidation(tmp_path):
+    cache = QueryCache(disk_dir=tmp_path)
+    assert cache.get(SQL, {'d': '20250627'}) is None
+    cache.put(SQL, {'d': '20250627'}, _frame(1, 2))
+    hit = cache.get(SQL, {'d': '20250627'})
+    hit.loc[0, 'value'] = 99                       # 调用方修改不影响缓存
+    pd.testing.assert_frame_equal(cache.get(SQL, {'d': '20250627'}), _frame(1, 2))
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # 其它进程（另一个实例，同一磁盘目录）写表：内存层也作废
+    other = QueryCache(disk_dir=tmp_path)
+    pd.testing.assert_frame_equal(other.get(SQL, {'d': '20250627'}), _frame(1, 2))   # 磁盘层命中
+    other.invalidate('DATA_FABRIC_METRIC_TREND')
+    assert cache.get(SQL, {'d': '20250627'}) is None
+    # 写入发生在查询开始之后：这次查询的结果不可用
+    started = time.time()
+    time.sleep(0.01)
+    other.invalidate('data_fabric_metric_trend')
+    cache.put(SQL, {'d': '20250627'}, _frame(1), started=started)
+    assert cache.get(SQL, {'d': '20250627'}) is None
+
+
+def test_ttl_and_lru(tmp_path):
+    cache = QueryCache(capacity=2, disk_dir=tmp_path, table_ttl={'data_fabric_metric_trend': -1})
+    cache.put(SQL, {'d': '1'}, _frame(1))
+    assert cache.get(SQL, {'d': '1'}) is None          # 过期：内存与磁盘一并清掉
+    assert not list(tmp_path.glob('*.parquet'))
+
+    lru = QueryCache(capacity=2, disk_dir=tmp_path / 'lru')
+    for i in range(3):
+        lru.put("SELECT * FROM t", {'i': i}, _frame(i))
+    assert len(lru._mem) == 2
+    lru.clear()
+    assert lru.get("SELECT * FROM t", {'i': 0}) is None
+
+
+def test_backend_cache_invalidated_by_insert_and_publish(tmp_path):
+    async def run():
+        backend = SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'c.sqlite3'}", cache=QueryCache(disk_dir=tmp_path / 'qc'))
+        await backend.insert('data_fabric_metric_trend', _frame(1))
+        seen = [await backend.query(queries.METRIC_TREND_BY_DAY, create_time='20250627')]
+        seen.append(await backend.query(queries.METRIC_TREND_BY_DAY, create_time='20250627'))
+        hits = backend.cache.hits
+        await backend.insert('data_fabric_metric_trend', _frame(2))
+        seen.append(await backend.query(queries.METRIC_TREND_BY_DAY, create_time='20250627'))
+        await backend.publish('data_fabric_metric_trend', _frame(3), {'create_time': '20250627'})
+        seen.append(await backend.query(queries.METRIC_TREND_BY_DAY, create_time='20250627'))
+        await backend.dispose()
+        return [sorted(df['value']) for df in seen], hits
+
+    seen, hits = asyncio.run(run())
+    assert hits == 1
+    assert seen == [[1], [1], [1, 2], [3]]
@@ -0,0 +1,80 @@
+# tests/test_reconcile.py
+"""记录数核对：批量计数（UNION ALL 分批、缺表记 None）、一致率口径、文件与入库计数端到端"""
+import asyncio
+
+import pandas as pd
+import pytest
+from sqlalchemy import event
+
+from config.settings import settings
+from dao.backends import MemoryBackend, SqlBackend
+from dao.interface_repo import InterfaceRepo
+from service.ReconcileService import ReconcileService, consistency_rate
+
+
+@pytest.mark.parametrize('file_count, warehouse_count, rate', [
+    (0, 0, '100%'), (100, 100, '100%'), (0, 5, '0%'), (5, 0, '0%'),
+    (3, 2, '66%'), (2, 3, '66%'), (1000, 999, '99%'), (999, 1000, '99%'),
+])
+def test_consistency_rate(file_count, warehouse_count, rate):
+    assert consistency_rate(file_count, warehouse_count) == rate
+
+
+def _sqlite(tmp_path) -> SqlBackend:
+    return SqlBackend(f"sqlite+aiosqlite:///{tmp_path / 'w.sqlite3'}")
+
+
+async def _seed(backend) -> None:
+    for name, days in {'t_a': ['20250627'] * 3 + ['20250626'], 't_b': ['20250627'] * 2, 't_c': ['20250626']}.items():
+        await backend.insert(name, pd.DataFrame({'data_date': days, 'v': range(len(days))}))
+
+
+TARGETS = [('t_a', {'data_date': '20250627'}), ('t_b', {'data_date': '20250627'}), ('t_missing', {'data_date': '20250627'}),
+           ('t_c', {'data_date': '20250627'}), ('t_a', None)]
+EXPECTED = [3, 2, None, 0, 4]
+
+
+def test_count_rows_batches_and_missing_tables(tmp_path):
+    async def run():
+        backend = _sqlite(tmp_path)
+        await _seed(backend)
+        statements = []
+        event.listen(backend.engine.sync_engine, 'before_cursor_execute',
+                     lambda conn, cursor, sql, *args: statements.append(sql) if 'COUNT(*)' in sql else None)
+        counts = await backend.count_rows(TARGETS, batch_size=2, concurrency=2)
+        memory = MemoryBackend()
+        await _seed(memory)
+        await backend.dispose()
+        return counts, statements, await memory.count_rows(TARGETS)
+
+    counts, statements, memory = asyncio.run(run())
+    assert counts == EXPECTED == memory
+    # 3 批（2 + 2 + 1 个目标）；含缺表的那批失败后拆成 2 条单表计数
+    assert len(statements) == 5
+    assert sum(s.count('UNION ALL') for s in statements) == 2
+
+
+def test_reconcile_files_against_warehouse(tmp_path, monkeypatch):
+    root = tmp_path / 'files'
+    (root / '20250627').mkdir(parents=True)
+    (root / '20250627' / 't_a.001.dat').write_bytes(b'1|x\n2|y\n')
+    (root / '20250627' / 't_a.002.dat').write_bytes(b'3|z')          # 末行无换行也计一条
+    (root / '20250627' / 't_b.dat').write_bytes(b'1\n2\n3\n4\n')
+    (root / '20250627' / 't_missing.dat').write_bytes(b'1\n')
+    monkeypatch.setattr(settings, 'profile_file_pattern', '{date}/{file_name}.*')
+    interfaces = pd.DataFrame({'interface_id': ['1', '2', '3', '4', '5'],
+                               'interface_file_name': ['t_a', 't_b', 't_missing', 't_c', None]})
+
+    async def run():
+        backend = _sqlite(tmp_path)
+        await _seed(backend)
+        out = await ReconcileService(InterfaceRepo(backend), workers=2, root=root).reconcile('2025-06-27', interfaces)
+        await backend.dispose()
+        return out
+
+    out = asyncio.run(run())
+    # 接口 3 入库表不存在、接口 4 无文件、接口 5 无文件名：都不出现
+    assert out.to_dict('index') == {
+        '1': {'file_record_count': 3, 'warehousing_record_count': 3, 'record_count_consistency_rate': '100%'},
+        '2': {'file_record_count': 4, 'warehousing_record_count': 2, 'record_count_consistency_rate': '50%'},
+    }
@@ -0,0 +1,44 @@
+# tests/test_scale_snapshots.py
+"""规模表：重跑 / 回刷历史日期只读已存快照，不用当前接口目录覆盖"""
+import asyncio
+
+import pandas as pd
+
+from dao.backends import MemoryBackend
+from dao.scale_repo import ScaleRepo
+from service.scale_service import ScaleService
+from utils.artifacts import ArtifactWriter
+
+
+def _scale(backend: MemoryBackend, date_str: str) -> pd.DataFrame:
+    out = asyncio.run(ScaleService(ScaleRepo(backend), ArtifactWriter(enabled=False)).build_scale(date_str))
+    return out.drop(columns=['interface_scale_id'], errors='ignore')
+
+
+def test_rerun_of_past_day_keeps_its_snapshot(source_tables):
+    backend = MemoryBackend(source_tables)
+    repo = ScaleRepo(backend)
+    _scale(backend, '20250626')
+    snap_0626 = repo.load_snapshot('20250626')
+
+    # 0627 前接口目录有变更：前 10 个接口改了重要等级
+    meta = backend.tables['data_fabric_meta_data_interface'].copy()
+    meta.loc[:9, 'importance_level'] = 'P9'
+    backend.tables['data_fabric_meta_data_interface'] = meta
+    first = _scale(backend, '20250627')
+    day = first[first['statistic_cycle'] == 1]
+    assert day['scale_changed'].astype(int).sum() == 10
+
+    # 目录为当前版本时重跑 0626：当天快照不变，0627 的比对结果也不变
+    assert not _scale(backend, '20250626').empty
+    pd.testing.assert_frame_equal(repo.load_snapshot('20250626'), snap_0626)
+    pd.testing.assert_frame_equal(_scale(backend, '20250627'), first)
+
+
+def test_past_day_without_snapshot_is_skipped(source_tables):
+    backend = MemoryBackend(source_tables)
+    repo = ScaleRepo(backend)
+    _scale(backend, '20250627')
+
+    assert _scale(backend, '20250620').empty
+    assert repo.snapshots.keys() == ['20250627']
@@ -0,0 +1,99 @@
+# tests/test_sketches.py
+"""去重计数草图与分位数草图：精度、合并、序列化"""
+import numpy as np
+import pytest
+
+from utils.sketches import DEFAULT_PRECISION, DDSketch, DistinctCounter, HyperLogLog
+
+
+def _hashes(n: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, np.iinfo(np.uint64).max, n, dtype=np.uint64, endpoint=True)
+
+
+@pytest.mark.parametrize('n', [100, 5000, 200000])
+def test_hll_estimate_within_expected_error(n):
+    hll = HyperLogLog()
+    keys = _hashes(n, n)
+    hll.add_hashes(np.concatenate([keys, keys[: n // 2]]))     # 重复值不影响
+    std_err = 1.04 / np.sqrt(1 << DEFAULT_PRECISION)
+    assert abs(hll.estimate() - n) / n < 4 * std_err
+
+
+def test_hll_merge_equals_union_and_round_trips():
+    a, b = _hashes(30000, 1), _hashes(30000, 2)
+    union = HyperLogLog()
+    union.add_hashes(np.concatenate([a, b[:10000], b]))
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add_hashes(np.concatenate([a, b[:10000]]))
+    right.add_hashes(b)
+    merged = HyperLogLog.from_bytes(left.to_bytes()).merge(right)
+    np.testing.assert_array_equal(merged.registers, union.registers)
+    with pytest.raises(ValueError):
+        merged.merge(HyperLogLog(10))
+
+
+def test_distinct_counter_exact_below_limit():
+    keys = _hashes(900, 3)
+    counter = DistinctCounter(exact_limit=1000)
+    counter.add_hashes(keys[:600])
+    counter.add_hashes(keys[300:])
+    assert counter.count() == 900
+
+    record = counter.to_record()
+    other = DistinctCounter.from_record(record['registers'], record['exact'], 1000)
+    other.merge(DistinctCounter(1000))
+    assert other.count() == 900
+
+    # 超过阈值后只保留草图，给出估计值
+    more = DistinctCounter(exact_limit=1000)
+    more.add_hashes(_hashes(200, 4))
+    other.merge(more)
+    assert other.exact is None
+    assert abs(other.count() - 1100) / 1100 < 0.05
+
+
+def _data(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.lognormal(3, 2, 5000), -rng.lognormal(1, 1, 500), np.zeros(100)])
+
+
+def _exact(values: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """与 DDSketch.quantile 同一秩定义：升序第 floor(q * (n - 1)) 个"""
+    return np.sort(values)[np.floor(q * (len(values) - 1)).astype(int)]
+
+
+QS = np.array([0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1])
+
+
+@pytest.mark.parametrize('alpha', [0.01, 0.05])
+def test_ddsketch_quantiles_within_alpha(alpha):
+    values = _data(5)
+    sketch = DDSketch(alpha)
+    sketch.add(np.r_[values, np.nan])
+    exact = _exact(values, QS)
+    assert np.all(np.abs(sketch.quantile(QS) - exact) <= alpha * np.abs(exact) + 1e-12)
+    assert sketch.n == len(values)
+    assert sketch.mean() == pytest.approx(values.mean())
+
+
+def test_ddsketch_merge_equals_sketch_of_union():
+    a, b, c = _data(6), _data(7)[:3000], _data(8)
+    union = DDSketch()
+    union.add(np.concatenate([a, b, c]))
+    parts = []
+    for values in (a, b, c):
+        sketch = DDSketch()
+        sketch.add(values)
+        parts.append(DDSketch.from_record(**sketch.to_record()))
+    merged = DDSketch()
+    for sketch in parts:
+        merged.merge(sketch)
+
+    for out in (merged, DDSketch.merge_all(parts)):
+        for attr in ('keys', 'counts', 'neg_keys', 'neg_counts'):
+            np.testing.assert_array_equal(getattr(out, attr), getattr(union, attr))
+        assert (out.zeros, out.n) == (union.zeros, union.n)
+        np.testing.assert_array_equal(out.quantile(QS), union.quantile(QS))
+    with pytest.raises(ValueError):
+        merged.merge(DDSketch(0.05))
+    assert np.isnan(DDSketch().quantile(0.5))
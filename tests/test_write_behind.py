@@ -0,0 +1,123 @@
+# tests/test_write_behind.py
+"""后台写入队列：写入异常传回调用方、异常退出时放弃发布、有界队列背压"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+from dao.backends import MemoryBackend
+from dao.publish import FramePublication
+from dao.write_behind import WriteBehind
+
+TABLE = 'data_fabric_metric_trend'
+PARTITION = {'create_time': '20250627'}
+
+
+def _frame(*values: int) -> pd.DataFrame:
+    return pd.DataFrame({'create_time': '20250627', 'value': list(values)})
+
+
+class GatedPublication(FramePublication):
+    """add 先等 gate 放行；写到 fail_at 批时抛错"""
+
+    def __init__(self, backend, table, partition, mode=None):
+        super().__init__(backend, table, partition, mode)
+        self.batches = 0
+
+    async def add(self, df):
+        await self.backend.gate.wait()
+        self.batches += 1
+        if self.batches == self.backend.fail_at:
+            raise ConnectionError('写库失败')
+        await super().add(df)
+
+
+class GatedBackend(MemoryBackend):
+    def __init__(self, fail_at: int | None = None):
+        super().__init__({TABLE: _frame(-1)})
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail_at = fail_at
+
+    def publication(self, table, partition, mode=None):
+        return GatedPublication(self, table, partition, mode)
+
+
+def _values(backend: MemoryBackend) -> list[int]:
+    return sorted(backend.tables[TABLE]['value'])
+
+
+def test_all_frames_committed_on_close():
+    async def run():
+        backend = GatedBackend()
+        async with WriteBehind(backend, TABLE, PARTITION, maxsize=2, workers=2, batch_rows=3) as wb:
+            for i in range(10):
+                await wb.put(_frame(i))
+        return backend, wb.rows
+
+    backend, rows = asyncio.run(run())
+    assert rows == 10
+    assert _values(backend) == list(range(10))
+
+
+def test_worker_error_reaches_caller_and_keeps_partition():
+    async def run():
+        backend = GatedBackend(fail_at=2)
+        with pytest.raises(ConnectionError):
+            async with WriteBehind(backend, TABLE, PARTITION, maxsize=2, workers=1, batch_rows=1) as wb:
+                await wb.put(_frame(0))
+                await wb.put(_frame(1))
+                for _ in range(100):
+                    if wb._error is not None:
+                        break
+                    await asyncio.sleep(0.01)
+                # 写入失败后的 put 抛出同一异常；即使调用方吞掉，关闭时仍会抛出
+                with pytest.raises(ConnectionError):
+                    await wb.put(_frame(2))
+        return backend, wb
+
+    backend, wb = asyncio.run(run())
+    assert _values(backend) == [-1]
+    assert all(t.done() for t in wb._tasks)
+
+
+def test_exception_in_caller_aborts_and_keeps_partition():
+    async def run():
+        backend = GatedBackend()
+        backend.gate.clear()
+        with pytest.raises(ValueError):
+            async with WriteBehind(backend, TABLE, PARTITION, maxsize=2, workers=2, batch_rows=1) as wb:
+                await wb.put(_frame(1))
+                await wb.put(_frame(2))
+                raise ValueError('计算失败')
+        # worker 已取消，之后放行也不会再写
+        backend.gate.set()
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await wb.put(_frame(3))
+        return backend, wb
+
+    backend, wb = asyncio.run(run())
+    assert _values(backend) == [-1]
+    assert all(t.done() for t in wb._tasks)
+
+
+def test_full_queue_blocks_producer_until_worker_drains():
+    async def run():
+        backend = GatedBackend()
+        backend.gate.clear()
+        async with WriteBehind(backend, TABLE, PARTITION, maxsize=2, workers=1, batch_rows=1) as wb:
+            await wb.put(_frame(0))
+            await asyncio.sleep(0)          # worker 取走第一帧，卡在写库
+            await wb.put(_frame(1))
+            await wb.put(_frame(2))         # 队列已满
+            blocked = asyncio.create_task(wb.put(_frame(3)))
+            await asyncio.sleep(0.05)
+            waiting = not blocked.done()
+            backend.gate.set()
+            await blocked
+        return backend, waiting
+
+    backend, waiting = asyncio.run(run())
+    assert waiting
+    assert _values(backend) == [0, 1, 2, 3]
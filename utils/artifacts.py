@@ -0,0 +1,98 @@
+# utils/artifacts.py
+"""
+中间结果落盘：替代各 Service 里同步的 to_csv 调试输出。
+后台单线程写 zstd 压缩 Parquet，按日期分区保留历史：
+
+    artifacts/<名称>/<分区列>=<分区值>/part.parquet
+
+同一天重跑只覆盖当天分区，其它日期不受影响。
+"""
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from config.settings import settings
+
+
+def arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """object 列里混有数字和字符串时 Arrow 无法推断类型，统一转成字符串"""
+    out = df.copy(deep=False)
+    for col in out.columns[out.dtypes == object]:
+        out[col] = out[col].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    return out
+
+
+class ArtifactWriter:
+    def __init__(self, root: str | Path | None = None, enabled: bool | None = None,
+                 compression: str | None = None):
+        self.root = Path(root or settings.artifact_dir)
+        self.enabled = settings.artifact_enabled if enabled is None else enabled
+        self.compression = compression or settings.artifact_compression
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='artifact')
+        self._pending: list[Future] = []
+
+    def submit(self, df: pd.DataFrame, name: str, partition_col: str) -> Future | None:
+        """
+        投递到后台线程写盘，立即返回；调用方此后不应原地修改 df
+        """
+        if not self.enabled or df.empty:
+            return None
+        fut = self._pool.submit(self._write, df.copy(deep=False), name, partition_col)
+        self._pending.append(fut)
+        return fut
+
+    def _write(self, df: pd.DataFrame, name: str, partition_col: str) -> int:
+        written = 0
+        key = df[partition_col]
+        key = key.dt.strftime('%Y%m%d') if pd.api.types.is_datetime64_any_dtype(key) else key.astype(str)
+        for value, part in df.groupby(key, sort=False):
+            path = self.root / name / f"{partition_col}={value.replace('/', '-')}"
+            path.mkdir(parents=True, exist_ok=True)
+            tmp = path / f".part.{os.getpid()}.tmp"
+            part = part.drop(columns=[partition_col])
+            try:
+                part.to_parquet(tmp, index=False, compression=self.compression)
+            except (TypeError, ValueError):
+                part = arrow_safe(part)
+                part.to_parquet(tmp, index=False, compression=self.compression)
+            # 先写临时文件再替换，读方不会看到半个文件
+            os.replace(tmp, path / "part.parquet")
+            written += len(part)
+        return written
+
+    async def flush(self) -> None:
+        """等待已投递的写盘任务完成；任一失败则抛出"""
+        pending, self._pending = self._pending, []
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending))
+
+    def partitions(self, name: str) -> list[str]:
+        """已落盘的分区值（升序）"""
+        base = self.root / name
+        if not base.exists():
+            return []
+        return sorted(p.name.split('=', 1)[1] for p in base.iterdir() if (p / "part.parquet").exists())
+
+    def load(self, name: str, values: Iterable[str] | None = None,
+             columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        按分区值读回历史结果；values 为空读全部，分区列以字符串形式还原
+        """
+        base = self.root / name
+        wanted = None if values is None else set(map(str, values))
+        frames = []
+        for path in sorted(base.glob("*=*/part.parquet")) if base.exists() else []:
+            col, value = path.parent.name.split('=', 1)
+            if wanted is not None and value not in wanted:
+                continue
+            frames.append(pd.read_parquet(path, columns=columns).assign(**{col: value}))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+
+artifact_writer = ArtifactWriter()
@@ -2,6 +2,7 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from typing import Sequence
 
 def pct_int(series: pd.Series) -> int:
     """兼容 NaN / '-' / inf"""
@@ -20,3 +21,26 @@ def pct_ratio(today: pd.Series, yest: pd.Series) -> pd.Series:
     y = pd.to_numeric(yest.astype(str).str.rstrip('%'), errors='coerce').fillna(0)
     ratio = (t - y) / y.replace(0, np.nan)
     return ratio.fillna(0).round(0).astype(int).astype(str) + '%'
+
+def pct_parse(s: pd.Series) -> pd.Series:
+    """'85%' → 85.0，'-' / 空值等无法解析的记 NaN；聚合前一次性解析，避免每个分组重复处理字符串"""
+    return pd.to_numeric(s.astype(str).str.rstrip('%'), errors='coerce')
+
+def pct_format(values: pd.Series) -> pd.Series:
+    """数值 → 截断取整（同 int()）→ 补 %"""
+    return values.astype(int).astype(str) + '%'
+
+def composite_score(matrix: np.ndarray, weights: Sequence[float] | None = None) -> np.ndarray:
+    """
+    综合得分：数值矩阵（行 × 环节）逐行加权平均，忽略 NaN；整行为 NaN 或无列时为 NaN
+    :param weights: 各列权重，缺省等权
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[1] == 0:
+        return np.full(len(matrix), np.nan)
+    w = np.ones(matrix.shape[1]) if weights is None else np.asarray(weights, dtype=float)
+    valid = ~np.isnan(matrix)
+    total = np.where(valid, matrix, 0.0) @ w
+    weight = valid @ w
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight > 0, total / np.where(weight > 0, weight, 1.0), np.nan)
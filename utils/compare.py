@@ -0,0 +1,72 @@
+# utils/compare.py
+"""
+多期对比：日环比 / 周同比 / 月同比 / 年同比一次算完。
+历史数据按 (维度..., 日期) 建有序索引，各期按日期运算对齐后一次 reindex 取回。
+"""
+from datetime import datetime
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.common import pct_ratio
+
+# 对比期 -> 日期偏移（月、年按日历回退，3/31 的上月同期为 2/28）
+LAGS = {
+    'day': pd.DateOffset(days=1),
+    'week': pd.DateOffset(weeks=1),
+    'month': pd.DateOffset(months=1),
+    'year': pd.DateOffset(years=1),
+}
+
+# 对比期 -> 输出列后缀；日环比沿用原有 stability_ratio 命名
+RATIO_SUFFIX = {
+    'day': 'ratio',
+    'week': 'wow_ratio',
+    'month': 'mom_ratio',
+    'year': 'yoy_ratio',
+}
+
+
+def lag_dates(as_of: datetime, lags: Sequence[str]) -> dict[str, pd.Timestamp]:
+    """各对比期对应的历史日期"""
+    as_of = pd.Timestamp(as_of)
+    return {lag: as_of - LAGS[lag] for lag in lags}
+
+
+def multi_lag_ratios(current: pd.DataFrame, history: pd.DataFrame,
+                     keys: Sequence[str], value_cols: Sequence[str],
+                     as_of: datetime, lags: Sequence[str],
+                     date_col: str = 'date') -> pd.DataFrame:
+    """
+    :param current: 当期值，列为 keys + value_cols
+    :param history: 历史值，列为 keys + date_col + value_cols（date_col 为 datetime）
+    :return: current 追加 <value>_<后缀> 对比列，按 lags、value_cols 顺序排列
+    """
+    keys, value_cols, lags = list(keys), list(value_cols), list(lags)
+    out = current.copy()
+    if not lags:
+        return out
+
+    hist = (
+        history[keys + [date_col] + value_cols]
+        .drop_duplicates(subset=keys + [date_col], keep='last')
+        .set_index(keys + [date_col])
+        .sort_index()
+    )
+
+    # 所有对比期拼成一个目标索引：n_lags * n_rows，一次 reindex 取回
+    n = len(current)
+    targets = lag_dates(as_of, lags)
+    arrays = [np.tile(current[k].to_numpy(), len(lags)) for k in keys]
+    arrays.append(np.repeat(np.array(list(targets.values()), dtype='datetime64[ns]'), n))
+    prev = hist.reindex(pd.MultiIndex.from_arrays(arrays, names=keys + [date_col]))
+
+    for i, lag in enumerate(lags):
+        block = prev.iloc[i * n:(i + 1) * n]
+        for col in value_cols:
+            out[f"{col}_{RATIO_SUFFIX[lag]}"] = pct_ratio(
+                current[col].reset_index(drop=True),
+                block[col].reset_index(drop=True)
+            ).set_axis(out.index)
+    return out
@@ -0,0 +1,245 @@
+# utils/compute.py
+"""
+计算后端：明细表环节展开 / 透视、趋势表窗口均值、业务级分组汇总这几个核心算子的两套实现，
+由 settings.compute_backend 选择，Service 只调用算子，不关心底层用哪个库。
+
+| 后端    | 说明
+| ------ | ---------------------------------------------------------
+| pandas | 原有实现（默认）
+| polars | Polars LazyFrame：算子先建查询计划，collect 时多线程执行；未安装 polars 时不可选
+
+两套实现的输出逐列、逐行、dtype 一致（分组结果按分组键升序，维度列还原为原 category），
+可用 python main.py compute_parity <日期> 比对三张驾驶舱表。
+"""
+from abc import ABC, abstractmethod
+from typing import Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover - 未安装 polars 时只能用 pandas 后端
+    pl = None
+
+COMPUTE_BACKENDS = ('pandas', 'polars')
+
+
+class Compute(ABC):
+    """算子接口：后端须实现全部算子，缺少任一个时实例化即报错"""
+
+    name = ''
+
+    @abstractmethod
+    def expand_jobs(self, reg: pd.DataFrame, prefix_len: Mapping[str, int]) -> pd.DataFrame:
+        """
+        作业注册表按环节展开：job_stage 中逗号分隔的每个环节一行，拼出运维平台作业号
+        :param prefix_len: 平台 -> 作业号前缀长度，这些平台环节为空时缺省 01；其它平台前缀 3 位、缺省 10
+        :return: 列 new_job_id, interface_id, pt, stage_num，按注册表行序、环节序
+        """
+
+    @abstractmethod
+    def stage_flags(self, uni: pd.DataFrame) -> tuple[pd.MultiIndex, list[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (interface_id, pt) × stage_name 标志矩阵
+        :return: (接口, 平台) 索引（升序）、环节名、存在 / 失败（failure_flag）/ 延迟（delay_flag）三个 bool 矩阵
+        """
+
+    @abstractmethod
+    def group_mean(self, df: pd.DataFrame, keys: list[str], cols: list[str]) -> pd.DataFrame:
+        """按 keys 分组求各列均值（忽略空值），结果以 keys 为索引、升序"""
+
+    @abstractmethod
+    def group_sum_count(self, df: pd.DataFrame, keys: list[str],
+                        cols: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """按 keys 分组求各列之和与非空个数，两个结果以 keys 为索引、升序"""
+
+
+class PandasCompute(Compute):
+    name = 'pandas'
+
+    def expand_jobs(self, reg, prefix_len):
+        rows = []
+        for r in reg.itertuples(index=False):
+            stage_raw = str(r.job_stage).strip()
+            pt_val = r.pt
+            if stage_raw in ('', 'null', 'None'):
+                stage_raw = '01' if pt_val in prefix_len else '10'
+            else:
+                stage_raw = stage_raw.replace('null', '10')
+            for stage_num in stage_raw.split(','):
+                stage_num = stage_num.strip()
+                if not stage_num:
+                    continue
+                new_job_id = (
+                        r.job_id[:prefix_len.get(pt_val, 3)] +
+                        str(r.interface_id).zfill(4) +
+                        stage_num.zfill(2)
+                )
+                rows.append({
+                    'new_job_id': new_job_id,
+                    'interface_id': str(r.interface_id).zfill(4),
+                    'pt': pt_val,
+                    'stage_num': stage_num
+                })
+        return pd.DataFrame(rows)
+
+    def stage_flags(self, uni):
+        # (interface_id, pt) 与环节名分别因子化，一次线性扫描写入预分配矩阵
+        uni = uni.dropna(subset=['interface_id', 'pt', 'stage_name'])
+        pair_codes, pairs = pd.MultiIndex.from_frame(uni[['interface_id', 'pt']]).factorize(sort=True)
+        name_codes, names = pd.factorize(uni['stage_name'])
+
+        shape = (len(pairs), len(names))
+        present = np.zeros(shape, dtype=bool)
+        failed = np.zeros(shape, dtype=bool)
+        delayed = np.zeros(shape, dtype=bool)
+        present[pair_codes, name_codes] = True
+        np.logical_or.at(failed, (pair_codes, name_codes), uni['failure_flag'].to_numpy(dtype=bool))
+        np.logical_or.at(delayed, (pair_codes, name_codes), uni['delay_flag'].to_numpy(dtype=bool))
+        return pairs, list(names), present, failed, delayed
+
+    def group_mean(self, df, keys, cols):
+        return df.groupby(keys, observed=True)[cols].mean()
+
+    def group_sum_count(self, df, keys, cols):
+        grouped = df.groupby(keys, observed=True)
+        return grouped[cols].sum(), grouped[cols].count()
+
+
+class PolarsCompute(Compute):
+    name = 'polars'
+
+    @staticmethod
+    def _lazy(df: pd.DataFrame, keys: Sequence[str]):
+        """pandas → LazyFrame：category 分组键转为字符串（与 pandas 的字典序类别表同序），空键行不参与分组"""
+        lf = pl.from_pandas(df).lazy()
+        cats = [k for k in keys if isinstance(df[k].dtype, pd.CategoricalDtype)]
+        if cats:
+            lf = lf.with_columns(pl.col(cats).cast(pl.String))
+        return lf.drop_nulls(list(keys))
+
+    @staticmethod
+    def _keys(out: pd.DataFrame, src: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+        """分组键还原为输入列的 dtype（category 类别表不变）后设为索引"""
+        for k in keys:
+            if out[k].dtype != src[k].dtype:
+                out[k] = out[k].astype(src[k].dtype)
+        return out.set_index(list(keys))
+
+    def expand_jobs(self, reg, prefix_len):
+        if reg.empty:
+            return pd.DataFrame()
+        # 与逐行实现一致：job_stage / interface_id 先按 str() 转成字符串（None 为 'None'）
+        frame = pd.DataFrame({
+            'job_id': reg['job_id'].to_numpy(dtype=object),
+            'pt': reg['pt'].to_numpy(dtype=object),
+            'interface_id': reg['interface_id'].map(str).to_numpy(dtype=object),
+            'job_stage': reg['job_stage'].map(str).to_numpy(dtype=object),
+        })
+        hub = pl.col('pt').is_in(list(prefix_len)).fill_null(False)
+        stage = pl.col('job_stage').str.strip_chars()
+        stage = (
+            pl.when(stage.is_in(['', 'null', 'None']))
+            .then(pl.when(hub).then(pl.lit('01')).otherwise(pl.lit('10')))
+            .otherwise(stage.str.replace_all('null', '10', literal=True))
+        )
+        prefix = pl.col('pt').replace_strict(dict(prefix_len), default=3, return_dtype=pl.Int64)
+        interface_id = pl.col('interface_id').str.zfill(4)
+        out = (
+            pl.from_pandas(frame).lazy()
+            .with_columns(stage_num=stage.str.split(','), prefix=prefix)
+            .explode('stage_num')
+            .with_columns(pl.col('stage_num').str.strip_chars())
+            .filter(pl.col('stage_num') != '')
+            .select(
+                new_job_id=pl.concat_str([pl.col('job_id').str.slice(0, pl.col('prefix')),
+                                          interface_id, pl.col('stage_num').str.zfill(2)]),
+                interface_id=interface_id,
+                pt=pl.col('pt'),
+                stage_num=pl.col('stage_num'),
+            )
+            .collect()
+        )
+        return out.to_pandas()
+
+    def stage_flags(self, uni):
+        keys = ['interface_id', 'pt']
+        flags = (
+            self._lazy(uni[[*keys, 'stage_name', 'failure_flag', 'delay_flag']], [*keys, 'stage_name'])
+            .group_by([*keys, 'stage_name'])
+            .agg(pl.col('failure_flag').any(), pl.col('delay_flag').any())
+        )
+        pairs = flags.select(keys).unique().sort(keys).with_row_index('pair')
+        names = flags.select('stage_name').unique().sort('stage_name').with_row_index('name')
+        flags, pairs, names = pl.collect_all([flags.join(pairs, on=keys).join(names, on='stage_name'), pairs, names])
+
+        shape = (pairs.height, names.height)
+        pair_codes, name_codes = flags['pair'].to_numpy(), flags['name'].to_numpy()
+        present = np.zeros(shape, dtype=bool)
+        failed = np.zeros(shape, dtype=bool)
+        delayed = np.zeros(shape, dtype=bool)
+        present[pair_codes, name_codes] = True
+        failed[pair_codes, name_codes] = flags['failure_flag'].to_numpy()
+        delayed[pair_codes, name_codes] = flags['delay_flag'].to_numpy()
+        return (pd.MultiIndex.from_frame(pairs.select(keys).to_pandas()), names['stage_name'].to_list(),
+                present, failed, delayed)
+
+    def group_mean(self, df, keys, cols):
+        out = (
+            self._lazy(df[keys + cols], keys)
+            .group_by(keys).agg(pl.col(cols).mean())
+            .sort(keys)
+            .collect()
+        )
+        return self._keys(out.to_pandas(), df, keys)
+
+    def group_sum_count(self, df, keys, cols):
+        out = (
+            self._lazy(df[keys + cols], keys)
+            .group_by(keys)
+            .agg(pl.col(cols).sum(),
+                 pl.col(cols).count().cast(pl.Int64).name.suffix('__count'))
+            .sort(keys)
+            .collect()
+            .to_pandas()
+        )
+        out = self._keys(out, df, keys)
+        counts = out[[f"{c}__count" for c in cols]]
+        return out[cols], counts.set_axis(cols, axis=1)
+
+
+def get_compute(name: str | None = None) -> Compute:
+    """settings.compute_backend 对应的计算后端"""
+    name = name or settings.compute_backend
+    if name not in COMPUTE_BACKENDS:
+        raise ValueError(f"未知计算后端: {name}")
+    if name == 'polars':
+        if pl is None:
+            raise ImportError("compute_backend=polars 需要先安装 polars")
+        return PolarsCompute()
+    return PandasCompute()
+
+
+def frame_diff(left: pd.DataFrame, right: pd.DataFrame, names: Sequence[str] = COMPUTE_BACKENDS,
+               ordered: bool = False) -> pd.DataFrame:
+    """
+    两份结果统一转成字符串后按全部列外连接，返回只在一侧出现的行（_merge 列标明来自哪一侧），为空即一致
+    :param ordered: 行序也须一致（按行号一并比对）
+    列名或 dtype 不同时直接报错
+    """
+    if list(left.columns) != list(right.columns):
+        raise ValueError(f"列不一致：{names[0]} {list(left.columns)} / {names[1]} {list(right.columns)}")
+    dtypes = [c for c in left.columns if left[c].dtype != right[c].dtype]
+    if dtypes:
+        raise ValueError(f"dtype 不一致：{[(c, str(left[c].dtype), str(right[c].dtype)) for c in dtypes]}")
+    left, right = left.astype(str), right.astype(str)
+    if ordered:
+        left, right = left.assign(_row=np.arange(len(left))), right.assign(_row=np.arange(len(right)))
+    return (
+        left.merge(right, how='outer', indicator=True)
+        .query("_merge != 'both'")
+        .replace({'_merge': {'left_only': names[0], 'right_only': names[1]}})
+    )
@@ -0,0 +1,51 @@
+# utils/dimensions.py
+"""
+维度编码：部门、业务、级别、平台、统计周期等取值很少的列，读库后一次性转成 category，
+后续 groupby / merge 都在整数编码上进行，只在输出时还原成字符串。
+
+- 类别表 = 配置取值（settings.dimension_values）∪ 数据中出现的取值，按字典序排列，
+  groupby 的输出顺序与按字符串分组一致；配置取值保证骨架（如 P0-P5）在编码表中
+- 编码前先 astype(str)，空值成为 'nan'，与原先全部 astype(str) 后分组的行为一致
+"""
+from typing import Iterable, Sequence
+
+import pandas as pd
+
+from config.settings import settings
+
+DIMENSION_COLS = ('department', 'biz_name', 'level', 'pt', 'statistic_cycle')
+
+
+def categories(col: str, observed: Iterable[str] = ()) -> list[str]:
+    """某维度的类别表：配置取值与观测取值的并集，字典序"""
+    configured = settings.dimension_values.get(col, [])
+    return sorted(set(map(str, configured)) | set(map(str, observed)))
+
+
+def encode_series(s: pd.Series, col: str | None = None) -> pd.Series:
+    values = s.astype(str)
+    cats = categories(col or s.name, values.unique())
+    return values.astype(pd.CategoricalDtype(cats))
+
+
+def encode(df: pd.DataFrame, cols: Sequence[str] = DIMENSION_COLS) -> pd.DataFrame:
+    """把 df 中存在的维度列转成 category（返回新 DataFrame）"""
+    out = df.copy(deep=False)
+    for col in cols:
+        if col in out.columns and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = encode_series(out[col], col)
+    return out
+
+
+def decode(df: pd.DataFrame) -> pd.DataFrame:
+    """category 列还原为字符串（object），用于输出"""
+    out = df.copy(deep=False)
+    for col in out.columns[[isinstance(t, pd.CategoricalDtype) for t in out.dtypes]]:
+        out[col] = out[col].astype(object)
+    return out
+
+
+def constant(values: Sequence[str], like: pd.Series) -> pd.Categorical:
+    """按已编码列的类别表构造固定取值（骨架用），不在类别表中的取值会变成 NaN"""
+    return pd.Categorical(list(values), categories=like.cat.categories)
+
@@ -0,0 +1,190 @@
+# utils/file_scan.py
+"""
+接口数据文件流式扫描：按字节块读取（普通文件 mmap，.gz 流式解压），块边界对齐到换行，
+任意大小的文件内存占用只与块大小有关。
+
+每块内向量化统计：
+- 每条记录的字段数分布
+- 协议各字段非空条数（记录字段不足视为空）
+- 配置了格式正则的字段：非空值中符合格式的条数
+- 配置了主键字段时：主键指纹写入去重草图（utils.sketches），估算主键唯一率
+
+另提供按块数换行的行数统计（count_lines）和随机键蓄水池抽样（reservoir_sample）。
+函数均为模块级、参数为普通对象，可直接投递到进程池。
+"""
+import gzip
+import mmap
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from utils.hashing import hash_rows
+from utils.sketches import DEFAULT_PRECISION, DistinctCounter
+
+NULL_TOKENS = ('', 'null', 'NULL', '\\N')
+
+
+def iter_blocks(path: str | Path, chunk_bytes: int) -> Iterator[bytes]:
+    """按块读取文件，每块以完整行结束（最后一块可能没有结尾换行）"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rb') as f:
+            rest = b''
+            while chunk := f.read(chunk_bytes):
+                chunk = rest + chunk
+                cut = chunk.rfind(b'\n') + 1
+                if cut:
+                    yield chunk[:cut]
+                rest = chunk[cut:]
+            if rest:
+                yield rest
+        return
+    with open(path, 'rb') as f:
+        if path.stat().st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos, size = 0, len(mm)
+            while pos < size:
+                end = mm.find(b'\n', min(pos + chunk_bytes, size) - 1)
+                end = size if end < 0 else end + 1
+                yield mm[pos:end]
+                pos = end
+
+
+def count_lines(path: str | Path, chunk_bytes: int = 32 * 1024 * 1024) -> int:
+    """按块数换行符统计记录数，末行无换行也计一条"""
+    n, last = 0, b'\n'
+    for block in iter_blocks(path, chunk_bytes):
+        n += block.count(b'\n')
+        last = block[-1:]
+    return n + (last != b'\n')
+
+
+def reservoir_sample(path: str | Path, k: int, seed: int, chunk_bytes: int = 32 * 1024 * 1024,
+                     encoding: str = 'utf-8') -> dict:
+    """
+    一次流式扫描抽取 k 行：每行赋一个均匀随机键，始终只保留键最小的 k 行，内存与文件大小无关。
+    多个文件的结果可按键再取最小 k 个合并（merge_samples），等价于对全部行整体抽样。
+    :return: {'keys': 随机键数组, 'lines': 对应行}
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.empty(0)
+    lines: list[str] = []
+    for block in iter_blocks(path, chunk_bytes):
+        block_lines = _lines(block, encoding)
+        if block_lines.empty:
+            continue
+        block_keys = rng.random(len(block_lines))
+        # 只把可能进入蓄水池的行拿出来，大块里绝大多数行直接跳过
+        if len(keys) >= k:
+            cand = np.flatnonzero(block_keys < keys.max())
+        else:
+            cand = np.arange(len(block_lines))
+        if not len(cand):
+            continue
+        keys = np.concatenate([keys, block_keys[cand]])
+        lines = lines + block_lines.iloc[cand].tolist()
+        if len(keys) > k:
+            keep = np.argpartition(keys, k - 1)[:k]
+            keys, lines = keys[keep], [lines[i] for i in keep]
+    return {'keys': keys, 'lines': lines}
+
+
+def merge_samples(samples: list[dict], k: int) -> list[str]:
+    keys = np.concatenate([s['keys'] for s in samples]) if samples else np.empty(0)
+    lines = [line for s in samples for line in s['lines']]
+    if len(keys) > k:
+        keep = np.argpartition(keys, k - 1)[:k]
+        return [lines[i] for i in np.sort(keep)]
+    return lines
+
+
+def find_files(root: str | Path, pattern: str, date_str: str, file_name: str, interface_id: str) -> list[Path]:
+    """按 glob 模板查找某接口当天的文件；{date} 为 YYYYMMDD"""
+    date = date_str.replace('-', '')
+    glob = pattern.format(date=date, file_name=file_name, interface_id=interface_id)
+    return sorted(p for p in Path(root).glob(glob) if p.is_file())
+
+
+def _lines(block: bytes, encoding: str) -> pd.Series:
+    text = block.decode(encoding, errors='replace')
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    return pd.Series(lines, dtype=object).str.rstrip('\r')
+
+
+def profile_file(path: str, spec: dict) -> dict:
+    """
+    :param spec: n_fields 协议字段数；patterns 各字段格式正则（None 不检查）；
+                 pk 主键字段下标（可空）、exact_limit 精确去重上限；delimiter / encoding / chunk_bytes
+    :return: records、field_counts {字段数: 条数}、non_null / format_checked / format_ok（按协议字段）、
+             pk 主键去重草图（DistinctCounter.to_record，未配置主键为 None）
+    """
+    n = spec['n_fields']
+    delimiter = spec['delimiter']
+    patterns = [(i, re.compile(p)) for i, p in enumerate(spec['patterns']) if p]
+    records = 0
+    field_counts: Counter = Counter()
+    non_null = np.zeros(n, dtype=np.int64)
+    checked = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=np.int64)
+    pk = [i for i in spec.get('pk') or [] if i < n]
+    keys = DistinctCounter(spec.get('exact_limit', 0), spec.get('precision', DEFAULT_PRECISION)) if pk else None
+
+    for block in iter_blocks(path, spec['chunk_bytes']):
+        lines = _lines(block, spec['encoding'])
+        if lines.empty:
+            continue
+        records += len(lines)
+        field_counts.update((lines.str.count(re.escape(delimiter)) + 1).value_counts().to_dict())
+        if n == 0:
+            continue
+        # 最多切 n 次、得到 n + 1 列：前 n 列为协议字段，多出的字段原样留在第 n 列（下标 n，不参与统计）
+        parts = lines.str.split(delimiter, n=n, expand=True, regex=False)
+        for i in range(min(n, parts.shape[1])):
+            col = parts[i]
+            filled = col.notna() & ~col.isin(NULL_TOKENS)
+            non_null[i] += int(filled.sum())
+        for i, pattern in patterns:
+            if i >= parts.shape[1]:
+                continue
+            col = parts[i]
+            values = col[col.notna() & ~col.isin(NULL_TOKENS)]
+            checked[i] += len(values)
+            ok[i] += int(values.str.fullmatch(pattern).sum())
+        if keys is not None:
+            key_cols = parts.reindex(columns=pk)
+            keys.add_hashes(hash_rows(key_cols))
+
+    return {
+        'records': records,
+        'field_counts': dict(field_counts),
+        'non_null': non_null.tolist(),
+        'format_checked': checked.tolist(),
+        'format_ok': ok.tolist(),
+        'pk': None if keys is None else keys.to_record(),
+    }
+
+
+def merge_profiles(profiles: list[dict], exact_limit: int = 0, precision: int = DEFAULT_PRECISION) -> dict:
+    """同一接口多个文件的扫描结果合并"""
+    out = {'records': 0, 'field_counts': Counter(), 'non_null': None, 'format_checked': None, 'format_ok': None,
+           'pk': None}
+    keys = None
+    for p in profiles:
+        out['records'] += p['records']
+        out['field_counts'].update(p['field_counts'])
+        for key in ('non_null', 'format_checked', 'format_ok'):
+            arr = np.asarray(p[key], dtype=np.int64)
+            out[key] = arr if out[key] is None else out[key] + arr
+        if p.get('pk') is not None:
+            part = DistinctCounter.from_record(p['pk']['registers'], p['pk']['exact'], exact_limit, precision)
+            keys = part if keys is None else keys.merge(part)
+    out['field_counts'] = dict(out['field_counts'])
+    out['pk'] = keys
+    return out
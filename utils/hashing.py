@@ -0,0 +1,29 @@
+# utils/hashing.py
+"""
+行指纹与有序数组查找：把若干列哈希成定长 uint64，比对时只在整数数组上做二分，
+几十万行的快照比对不需要字符串哈希表。
+"""
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def hash_rows(df: pd.DataFrame, cols: Sequence[str] | None = None) -> np.ndarray:
+    """按列值计算每行 64 位指纹（与行索引无关），缺失值统一视为空串"""
+    data = df[list(cols)] if cols is not None else df
+    data = data.astype(object).where(data.notna(), '').astype(str)
+    return pd.util.hash_pandas_object(data, index=False).to_numpy(dtype=np.uint64)
+
+
+def sorted_lookup(ref_keys: np.ndarray, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    在 ref_keys 中查找 keys
+    :return: (found 布尔数组, 命中位置——对应 ref_keys 原始下标，未命中处无意义)
+    """
+    order = np.argsort(ref_keys, kind='stable')
+    ref_sorted = ref_keys[order]
+    pos = np.searchsorted(ref_sorted, keys)
+    pos_clip = np.minimum(pos, max(len(ref_sorted) - 1, 0))
+    found = (pos < len(ref_sorted)) & (ref_sorted[pos_clip] == keys) if len(ref_sorted) else np.zeros(len(keys), bool)
+    return found, order[pos_clip] if len(ref_sorted) else pos_clip
@@ -0,0 +1,55 @@
+# utils/intervals.py
+"""
+区间运算：按组合并重叠的运行区间（重跑、重试叠在一起只算一段），全部在 numpy 数组上完成，
+不按组循环。时间统一为 int64 秒。
+"""
+import numpy as np
+import pandas as pd
+
+
+def to_seconds(s: pd.Series) -> np.ndarray:
+    """时间列转 epoch 秒（float），无法解析为 NaN"""
+    ts = pd.to_datetime(s, errors='coerce')
+    out = ts.to_numpy(dtype='datetime64[s]').astype(np.int64).astype(float)
+    out[ts.isna().to_numpy()] = np.nan
+    return out
+
+
+def merge_intervals(groups: np.ndarray, start: np.ndarray, end: np.ndarray) -> pd.DataFrame:
+    """
+    :param groups: 每个区间所属组的整数编码（如因子化后的作业号）
+    :param start / end: 区间起止（秒）；缺失或 end < start 的区间丢弃
+    :return: 每组一行，按组编码升序：group、runs 区间数、busy 合并后总时长、first_start、last_end
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    ok = ~np.isnan(start) & ~np.isnan(end) & (end >= start)
+    groups, start, end = groups[ok], start[ok], end[ok]
+    if not len(groups):
+        return pd.DataFrame({'group': np.empty(0, np.int64), 'runs': np.empty(0, np.int64), 'busy': np.empty(0),
+                             'first_start': np.empty(0), 'last_end': np.empty(0)})
+
+    order = np.lexsort((start, groups))
+    g, s, e = groups[order], start[order], end[order]
+    # 组内累计最大结束时间：各组平移到互不重叠的区段后做一次全局 cummax
+    base = e.min()
+    width = e.max() - base + 1
+    rank = np.cumsum(np.r_[True, g[1:] != g[:-1]]) - 1
+    run_max = np.maximum.accumulate(rank * width + (e - base)) - rank * width + base
+    group_head = np.r_[True, g[1:] != g[:-1]]
+    # 新段：组内第一个区间，或开始时间晚于此前所有区间的最晚结束
+    seg_head = group_head | (s > np.r_[-np.inf, run_max[:-1]])
+    seg_idx = np.flatnonzero(seg_head)
+    seg_start = s[seg_idx]
+    seg_end = np.maximum.reduceat(e, seg_idx)
+
+    head_idx = np.flatnonzero(group_head)
+    seg_group = np.cumsum(group_head)[seg_idx] - 1
+    return pd.DataFrame({
+        'group': g[head_idx],
+        'runs': np.diff(np.r_[head_idx, len(g)]),
+        'busy': np.bincount(seg_group, weights=seg_end - seg_start, minlength=len(head_idx)),
+        'first_start': s[head_idx],
+        'last_end': np.maximum.reduceat(e, head_idx),
+    })
@@ -0,0 +1,124 @@
+# utils/scheduler.py
+"""
+日期区间回刷调度：把 (日期 × 阶段) 展开成依赖图，按拓扑顺序并发执行。
+
+- 依赖：deps(stage, date) 返回前置节点列表，不在本次计划内的前置节点视为已完成
+- 并发：不同日期、互不依赖的节点同时跑，总并发受信号量限制
+- 续跑：每完成一个节点即落盘，失败后重跑同一区间会跳过已完成节点；
+  失败节点的下游不执行，其它分支照常跑完
+- 输入共享：给定各节点共用的后端时，运行期间开启其 share_reads（dao.backends.SharedReads），
+  元数据、登记表、明细表等相邻日期共同读取的输入只读一次，写表后按表作废；内存 / Parquet / SQL 后端通用
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+from config.settings import settings
+
+Node = tuple[str, str]   # (阶段, YYYYMMDD)
+
+
+def date_range(start: str, end: str) -> list[str]:
+    """闭区间内的日期列表（YYYYMMDD）"""
+    d0 = datetime.strptime(start, '%Y%m%d').date()
+    d1 = datetime.strptime(end, '%Y%m%d').date()
+    return [(d0 + timedelta(days=i)).strftime('%Y%m%d') for i in range((d1 - d0).days + 1)]
+
+
+def shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, '%Y%m%d').date() + timedelta(days=days)).strftime('%Y%m%d')
+
+
+class BackfillScheduler:
+    def __init__(self, runners: dict[str, Callable[[str], Awaitable]],
+                 deps: Callable[[str, str], Iterable[Node]],
+                 concurrency: int | None = None,
+                 state_dir: str | Path | None = None,
+                 backend=None):
+        """
+        :param runners: 阶段 -> async fn(YYYYMMDD)
+        :param deps: (阶段, 日期) -> 前置节点
+        :param backend: 各节点共用的后端，运行期间在其上共享读取结果；None 时不共享
+        """
+        self.runners = runners
+        self.deps = deps
+        self.backend = backend
+        self.concurrency = concurrency or settings.backfill_concurrency
+        self.state_dir = Path(state_dir or settings.state_dir) / 'backfill'
+
+    # ---------- 计划 ----------
+    def plan(self, dates: list[str], stages: list[str]) -> dict[Node, set[Node]]:
+        nodes = {(s, d) for d in dates for s in stages}
+        unknown = set(stages) - set(self.runners)
+        if unknown:
+            raise ValueError(f"未知阶段: {sorted(unknown)}")
+        return {n: {p for p in self.deps(*n) if p in nodes and p != n} for n in nodes}
+
+    def _state_path(self, dates: list[str], stages: list[str]) -> Path:
+        key = hashlib.sha1(json.dumps([dates[0], dates[-1], sorted(stages)]).encode()).hexdigest()[:12]
+        return self.state_dir / f"{dates[0]}_{dates[-1]}_{key}.json"
+
+    @staticmethod
+    def _load_done(path: Path) -> set[Node]:
+        if not path.exists():
+            return set()
+        return {tuple(n) for n in json.loads(path.read_text()).get('done', [])}
+
+    @staticmethod
+    def _save_done(path: Path, done: set[Node]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps({'done': sorted(done)}, ensure_ascii=False))
+        os.replace(tmp, path)
+
+    # ---------- 执行 ----------
+    async def run(self, start: str, end: str, stages: list[str], fresh: bool = False) -> dict[str, list[Node]]:
+        dates = date_range(start, end)
+        graph = self.plan(dates, stages)
+        state = self._state_path(dates, stages)
+        done = set() if fresh else self._load_done(state) & set(graph)
+        if done:
+            print(f"续跑：跳过已完成节点 {len(done)} 个")
+
+        sem = asyncio.Semaphore(self.concurrency)
+        events = {n: asyncio.Event() for n in graph}
+        failed: set[Node] = set()
+        skipped: set[Node] = set()
+        for n in done:
+            events[n].set()
+
+        async def run_node(node: Node) -> None:
+            stage, d = node
+            for p in graph[node]:
+                await events[p].wait()
+            try:
+                if graph[node] & (failed | skipped):
+                    skipped.add(node)
+                    print(f"⏭ {stage}@{d} 前置失败，跳过")
+                    return
+                async with sem:
+                    t0 = time.perf_counter()
+                    print(f"▶ {stage}@{d}")
+                    await self.runners[stage](d)
+                done.add(node)
+                self._save_done(state, done)
+                print(f"✔ {stage}@{d} {time.perf_counter() - t0:.1f}s")
+            except Exception as e:
+                failed.add(node)
+                print(f"✘ {stage}@{d} 失败：{e!r}")
+            finally:
+                events[node].set()
+
+        with self.backend.share_reads() if self.backend is not None else nullcontext() as shared:
+            await asyncio.gather(*(run_node(n) for n in graph if n not in done))
+        total = len(graph)
+        print(f"回刷完成：{len(done)}/{total} 完成，{len(failed)} 失败，{len(skipped)} 跳过")
+        if shared is not None:
+            print(f"输入共享：实际读取 {shared.misses} 次，复用 {shared.hits} 次")
+        return {'done': sorted(done), 'failed': sorted(failed), 'skipped': sorted(skipped)}
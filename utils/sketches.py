@@ -0,0 +1,214 @@
+# utils/sketches.py
+"""
+去重计数草图：HyperLogLog（64 位哈希，寄存器为 uint8 数组），可合并、可序列化。
+
+- 输入是 utils.hashing.hash_rows 产生的 uint64 指纹，批量更新全部向量化
+- 去重数不超过阈值时同时保留精确指纹集合，小接口给出精确值；超过阈值后只保留草图
+- 同一接口多天的草图按寄存器取最大值合并，周 / 月窗口无需重扫文件
+
+分位数草图：DDSketch（按 log(gamma) 对数分桶计数），任意分位数相对误差不超过 alpha，
+桶计数相加即合并；用于环节耗时、到达延迟的日 / 周 / 月分位数，不保留逐次运行的原始时间。
+"""
+import numpy as np
+
+DEFAULT_PRECISION = 14   # 2^14 个寄存器，标准误差约 0.8%
+DEFAULT_ALPHA = 0.01     # 分位数相对误差 1%
+_MIN_VALUE = 1e-9        # 绝对值更小的值记入 0 值桶
+
+
+def _clz64(x: np.ndarray) -> np.ndarray:
+    """uint64 前导零个数（0 记 64）"""
+    x = x.astype(np.uint64, copy=True)
+    n = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        top_zero = x < (np.uint64(1) << np.uint64(64 - shift))
+        n[top_zero] += shift
+        x[top_zero] <<= np.uint64(shift)
+    n[x == 0] = 64
+    return n
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: np.ndarray | None = None):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers.astype(np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rank = np.minimum(_clz64(hashes << np.uint64(self.p)) + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.p != self.p:
+            raise ValueError(f"草图精度不一致: {self.p} vs {other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)   # 小基数线性计数
+        return float(raw)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, precision: int = DEFAULT_PRECISION) -> 'HyperLogLog':
+        return cls(precision, np.frombuffer(data, dtype=np.uint8).copy())
+
+
+class DistinctCounter:
+    """草图 + 阈值内的精确指纹集合"""
+
+    def __init__(self, exact_limit: int, precision: int = DEFAULT_PRECISION):
+        self.exact_limit = exact_limit
+        self.hll = HyperLogLog(precision)
+        self.exact: np.ndarray | None = np.empty(0, dtype=np.uint64) if exact_limit > 0 else None
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        self.hll.add_hashes(hashes)
+        if self.exact is not None:
+            self.exact = np.union1d(self.exact, np.asarray(hashes, dtype=np.uint64))
+            if len(self.exact) > self.exact_limit:
+                self.exact = None
+
+    def merge(self, other: 'DistinctCounter') -> 'DistinctCounter':
+        self.hll.merge(other.hll)
+        if self.exact is not None and other.exact is not None:
+            self.exact = np.union1d(self.exact, other.exact)
+            if len(self.exact) > self.exact_limit:
+                self.exact = None
+        else:
+            self.exact = None
+        return self
+
+    def count(self) -> float:
+        return float(len(self.exact)) if self.exact is not None else self.hll.estimate()
+
+    def to_record(self) -> dict:
+        return {'registers': self.hll.to_bytes(),
+                'exact': None if self.exact is None else self.exact.tobytes()}
+
+    @classmethod
+    def from_record(cls, registers: bytes, exact: bytes | None, exact_limit: int,
+                    precision: int = DEFAULT_PRECISION) -> 'DistinctCounter':
+        out = cls(exact_limit, precision)
+        out.hll = HyperLogLog.from_bytes(registers, precision)
+        out.exact = None if exact is None else np.frombuffer(exact, dtype=np.uint64).copy()
+        return out
+
+
+def _accumulate(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray,
+                new_counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """两组 (桶号, 计数) 按桶号相加，结果桶号升序"""
+    all_keys = np.concatenate([keys, new_keys])
+    if not len(all_keys):
+        return keys, counts
+    uniq, inv = np.unique(all_keys, return_inverse=True)
+    total = np.bincount(inv, weights=np.concatenate([counts, new_counts]), minlength=len(uniq))
+    return uniq.astype(np.int64), total.astype(np.int64)
+
+
+class DDSketch:
+    """
+    正值、负值（按绝对值）分别分桶，另记 0 值个数；同时保留精确的条数与总和，均值不受分桶误差影响
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.neg_keys = np.empty(0, dtype=np.int64)
+        self.neg_counts = np.empty(0, dtype=np.int64)
+        self.zeros = 0
+        self.n = 0
+        self.total = 0.0
+
+    def _key(self, values: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _value(self, keys: np.ndarray) -> np.ndarray:
+        """桶代表值：桶区间 (gamma^(k-1), gamma^k] 内相对误差最小的点"""
+        return 2 * np.power(self.gamma, keys.astype(float)) / (self.gamma + 1)
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.total += float(values.sum())
+        pos, neg = values[values > _MIN_VALUE], -values[values < -_MIN_VALUE]
+        self.zeros += len(values) - len(pos) - len(neg)
+        self.keys, self.counts = _accumulate(self.keys, self.counts, self._key(pos),
+                                             np.ones(len(pos), dtype=np.int64))
+        self.neg_keys, self.neg_counts = _accumulate(self.neg_keys, self.neg_counts, self._key(neg),
+                                                     np.ones(len(neg), dtype=np.int64))
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        if other.alpha != self.alpha:
+            raise ValueError(f"草图误差参数不一致: {self.alpha} vs {other.alpha}")
+        self.keys, self.counts = _accumulate(self.keys, self.counts, other.keys, other.counts)
+        self.neg_keys, self.neg_counts = _accumulate(self.neg_keys, self.neg_counts, other.neg_keys, other.neg_counts)
+        self.zeros += other.zeros
+        self.n += other.n
+        self.total += other.total
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches: list['DDSketch']) -> 'DDSketch':
+        """一组草图一次合并（桶号拼接后只做一次去重），窗口内多天、多接口合并用"""
+        out = cls(sketches[0].alpha if sketches else DEFAULT_ALPHA)
+        if any(s.alpha != out.alpha for s in sketches):
+            raise ValueError("草图误差参数不一致")
+        empty = np.empty(0, dtype=np.int64)
+        out.keys, out.counts = _accumulate(empty, empty, np.concatenate([empty] + [s.keys for s in sketches]),
+                                           np.concatenate([empty] + [s.counts for s in sketches]))
+        out.neg_keys, out.neg_counts = _accumulate(empty, empty,
+                                                   np.concatenate([empty] + [s.neg_keys for s in sketches]),
+                                                   np.concatenate([empty] + [s.neg_counts for s in sketches]))
+        out.zeros = sum(s.zeros for s in sketches)
+        out.n = sum(s.n for s in sketches)
+        out.total = float(sum(s.total for s in sketches))
+        return out
+
+    def mean(self) -> float:
+        return self.total / self.n if self.n else float('nan')
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        """q 取 [0, 1]，可传数组一次取多个分位数；空草图返回 NaN"""
+        q = np.asarray(q, dtype=float)
+        if not self.n:
+            return np.full(q.shape, np.nan) if q.ndim else float('nan')
+        # 从小到大：负值桶（绝对值降序）、0、正值桶（升序）
+        values = np.concatenate([-self._value(self.neg_keys[::-1]), [0.0], self._value(self.keys)])
+        counts = np.concatenate([self.neg_counts[::-1], [self.zeros], self.counts])
+        idx = np.searchsorted(np.cumsum(counts), q * (self.n - 1), side='right')
+        out = values[np.minimum(idx, len(values) - 1)]
+        return out if q.ndim else float(out)
+
+    def to_record(self) -> dict:
+        return {'alpha': self.alpha, 'count': self.n, 'sum': self.total, 'zeros': self.zeros,
+                'keys': self.keys.tobytes(), 'counts': self.counts.tobytes(),
+                'neg_keys': self.neg_keys.tobytes(), 'neg_counts': self.neg_counts.tobytes()}
+
+    @classmethod
+    def from_record(cls, alpha: float, count: int, sum: float, zeros: int, keys: bytes, counts: bytes,
+                    neg_keys: bytes, neg_counts: bytes) -> 'DDSketch':
+        out = cls(float(alpha))
+        out.n, out.total, out.zeros = int(count), float(sum), int(zeros)
+        out.keys = np.frombuffer(keys, dtype=np.int64).copy()
+        out.counts = np.frombuffer(counts, dtype=np.int64).copy()
+        out.neg_keys = np.frombuffer(neg_keys, dtype=np.int64).copy()
+        out.neg_counts = np.frombuffer(neg_counts, dtype=np.int64).copy()
+        return out